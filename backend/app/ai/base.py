@@ -2,14 +2,98 @@ from __future__ import annotations
 
 import logging
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class Usage:
+    """Token usage reported by a provider SDK (None when the SDK didn't report it)."""
+
+    prompt_tokens: int | None = None  # all input tokens, cached ones included
+    completion_tokens: int | None = None
+    cache_read_tokens: int | None = None  # input tokens served from the provider's prompt cache
+    cache_write_tokens: int | None = None  # input tokens written to it (Anthropic only)
+
+    @property
+    def total_tokens(self) -> int | None:
+        if self.prompt_tokens is None and self.completion_tokens is None:
+            return None
+        return (self.prompt_tokens or 0) + (self.completion_tokens or 0)
+
+    def __add__(self, other: Usage) -> Usage:
+        """Combined usage of two calls (a field stays None only if neither reported it)."""
+
+        def add(a: int | None, b: int | None) -> int | None:
+            return None if a is None and b is None else (a or 0) + (b or 0)
+
+        return Usage(
+            add(self.prompt_tokens, other.prompt_tokens),
+            add(self.completion_tokens, other.completion_tokens),
+            add(self.cache_read_tokens, other.cache_read_tokens),
+            add(self.cache_write_tokens, other.cache_write_tokens),
+        )
+
+    def update(self, other: Usage) -> None:
+        """Copy another report into this one (fills caller-provided Usage objects)."""
+        self.prompt_tokens = other.prompt_tokens
+        self.completion_tokens = other.completion_tokens
+        self.cache_read_tokens = other.cache_read_tokens
+        self.cache_write_tokens = other.cache_write_tokens
+
+
+@dataclass
+class Completion:
+    """A provider's text answer plus its token usage."""
+
+    text: str
+    usage: Usage = field(default_factory=Usage)
+    # Items decoded from a structured-output answer; None in text mode or if
+    # the answer didn't match the schema (callers then parse `text`)
+    structured: list | None = None
+
+
+@dataclass
+class GenerationResult:
+    """Outcome of AIClientFactory.agenerate()."""
+
+    text: str
+    provider: str
+    parsed: Any = None  # return value of the validate callback, if one was given
+    hedged: bool = False  # True if a hedge request was fired to a second provider
+    source: str = "live"  # "live", or where a stored answer came from ("cache", "catalog")
+    usage: Usage | None = None  # token usage of the winning provider call
+
+    @property
+    def cached(self) -> bool:
+        """True if served from a store without calling a provider."""
+        return self.source != "live"
+
+    @property
+    def tokens_used(self) -> int | None:
+        """Tokens spent producing this result (0 for stored answers, None if unknown)."""
+        if self.cached:
+            return 0
+        return self.usage.total_tokens if self.usage else None
+
+
 class AIProvider(ABC):
-    """Abstract base class every AI provider must implement."""
+    """
+    Abstract base class every AI provider must implement.
+
+    Providers expose both a blocking contract (generate/ping) for scripts and
+    an async contract (agenerate/aping) backed by the async SDK clients, which
+    is what the request path uses so a slow LLM call never holds a worker thread.
+    """
 
     name: str
+    model: str
+    structured: bool = False  # use the SDK's schema-constrained output when a schema is given
+    prompt_cache: bool = False  # mark the system prompt as a cacheable prefix
 
     @abstractmethod
     def generate(self, system_prompt: str, user_message: str) -> str:
@@ -21,5 +105,53 @@ class AIProvider(ABC):
         """Lightweight connectivity check (list models, etc.)."""
         ...
 
+    @abstractmethod
+    async def agenerate(self, system_prompt: str, user_message: str) -> str:
+        """Async variant of generate() — must not block the event loop."""
+        ...
+
+    @abstractmethod
+    async def aping(self) -> bool:
+        """Async variant of ping()."""
+        ...
+
+    async def acomplete(
+        self, system_prompt: str, user_message: str, schema: type[BaseModel] | None = None,
+    ) -> Completion:
+        """
+        agenerate() plus token usage. Providers override this to read their
+        SDK's usage fields; the default reports unknown usage.
+
+        With `schema` and `structured` enabled, the answer is constrained to
+        {"items": [<schema>, ...]} (see app.ai.schema) and returned decoded in
+        Completion.structured.
+        """
+        return Completion(await self.agenerate(system_prompt, user_message))
+
+    async def astream(
+        self,
+        system_prompt: str,
+        user_message: str,
+        usage: Usage | None = None,
+        schema: type[BaseModel] | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the response as text chunks. Providers override this with their
+        SDK's streaming API and fill `usage` once the stream ends; the default
+        yields the whole acomplete() answer. In structured mode the chunks are
+        the JSON text of the {"items": [...]} object.
+        """
+        completion = await self.acomplete(system_prompt, user_message, schema)
+        if usage is not None:
+            usage.update(completion.usage)
+        yield completion.text
+
+    def transport_stats(self) -> dict | None:
+        """Connection pool / reuse statistics, if the provider tracks them."""
+        return None
+
+    async def aclose(self) -> None:
+        """Release pooled connections (called at shutdown)."""
+
     def __repr__(self) -> str:
         return f"<{self.__class__.__name__} name={self.name!r}>"
@@ -0,0 +1,86 @@
+"""
+Model cascade: cheaper, faster model tiers tried before the regular
+provider fallback chain (the "primary" tier), escalating only when a tier's
+answer fails the caller's acceptance check.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+
+from app.ai.stats import RollingWindow
+
+PRIMARY = "primary"
+
+
+def parse_tiers(spec: str) -> list[tuple[str, str]]:
+    """
+    "openai:gpt-4.1-nano,gemini:gemini-2.0-flash-lite" → [(provider, model), ...]
+    in cascade order. Raises ValueError on a malformed entry.
+    """
+    tiers = []
+    for entry in (e.strip() for e in spec.split(",")):
+        if not entry:
+            continue
+        provider, sep, model = entry.partition(":")
+        if not sep or not provider.strip() or not model.strip():
+            raise ValueError(f"cascade tier {entry!r} is not 'provider:model'")
+        tiers.append((provider.strip(), model.strip()))
+    return tiers
+
+
+class CascadeStats:
+    """Per-tier attempts, acceptances and latency, plus the overall escalation rate."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.escalated = 0  # requests that fell through to the primary tier
+        self._attempts: defaultdict[str, int] = defaultdict(int)
+        self._accepted: defaultdict[str, int] = defaultdict(int)
+        self._latency: defaultdict[str, RollingWindow] = defaultdict(RollingWindow)
+
+    def begin(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def escalate(self) -> None:
+        with self._lock:
+            self.escalated += 1
+
+    def record(self, tier: str, accepted: bool, latency_s: float) -> None:
+        with self._lock:
+            self._attempts[tier] += 1
+            if accepted:
+                self._accepted[tier] += 1
+        self._latency[tier].record(latency_s)
+
+    def stats(self, tiers: list[str]) -> dict:
+        """Report for `tiers` (cascade order, primary last)."""
+
+        def ms(value: float | None) -> int | None:
+            return round(value * 1000) if value is not None else None
+
+        with self._lock:
+            requests, escalated = self.requests, self.escalated
+            counts = {t: (self._attempts[t], self._accepted[t]) for t in tiers}
+        report = []
+        for tier in tiers:
+            attempts, accepted = counts[tier]
+            window = self._latency[tier]
+            report.append({
+                "tier": tier,
+                "attempts": attempts,
+                "accepted": accepted,
+                "escalated": attempts - accepted,
+                "escalation_rate": round(1 - accepted / attempts, 3) if attempts else None,
+                "latency_ms_p50": ms(window.percentile(50)),
+                "latency_ms_p95": ms(window.percentile(95)),
+            })
+        return {
+            "requests": requests,
+            "escalated_to_primary": escalated,
+            "escalation_rate": round(escalated / requests, 3) if requests else None,
+            "tiers": report,
+        }
@@ -0,0 +1,104 @@
+"""Per-provider circuit breaker (closed → open → half-open) for the AI fallback chain."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from enum import Enum
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Tracks the last `window` call outcomes for one provider. A call counts as
+    bad if it raised or took longer than `slow_call_s`. Once at least
+    `min_calls` outcomes are recorded and the bad ratio reaches
+    `error_threshold`, the breaker opens and the provider is skipped for
+    `open_seconds`. After that a single probe call is let through (half-open):
+    success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 5,
+        error_threshold: float = 0.5,
+        slow_call_s: float = 15.0,
+        open_seconds: float = 30.0,
+    ) -> None:
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._min_calls = min_calls
+        self._error_threshold = error_threshold
+        self._slow_call_s = slow_call_s
+        self._open_seconds = open_seconds
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> CircuitState:
+        if self._state is CircuitState.OPEN and time.monotonic() - self._opened_at >= self._open_seconds:
+            self._state = CircuitState.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return sum(1 for ok in self._outcomes if not ok) / len(self._outcomes)
+
+    def allow(self) -> bool:
+        """Return True if a call may go through now (claims the probe slot when half-open)."""
+        with self._lock:
+            state = self._current_state()
+            if state is CircuitState.CLOSED:
+                return True
+            if state is CircuitState.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release(self) -> None:
+        """Give back a claimed probe slot without recording an outcome (e.g. cancelled call)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self, latency_s: float) -> None:
+        if latency_s > self._slow_call_s:
+            self.record_failure()
+            return
+        with self._lock:
+            if self._current_state() is CircuitState.HALF_OPEN:
+                self._state = CircuitState.CLOSED
+                self._outcomes.clear()
+                self._probe_in_flight = False
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            state = self._current_state()
+            self._outcomes.append(False)
+            if state is CircuitState.HALF_OPEN:
+                self._trip()
+                return
+            bad = sum(1 for ok in self._outcomes if not ok)
+            if len(self._outcomes) >= self._min_calls and bad / len(self._outcomes) >= self._error_threshold:
+                self._trip()
+
+    def _trip(self) -> None:
+        self._state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
@@ -0,0 +1,202 @@
+"""Per-provider adaptive concurrency limits (AIMD) for the AI request path."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+
+from app.ai.stats import RollingWindow
+
+# Congestion signals passed to AdaptiveLimit.release()
+OK = "ok"  # answered: may grow the limit, or shrink it gently if latency climbed
+OVERLOAD = "overload"  # 429, 5xx or a timeout: multiplicative decrease
+IGNORE = "ignore"  # cancelled, invalid answer, ...: says nothing about capacity
+
+# Recent latency is the mean of this many answers; the baseline is the median
+# of the longer window, trusted once it holds _MIN_BASELINE_SAMPLES
+_RECENT_SAMPLES = 10
+_BASELINE_SAMPLES = 200
+_MIN_BASELINE_SAMPLES = 20
+
+
+def overload_status(exc: BaseException) -> int | None:
+    """
+    HTTP status of a provider error that signals overload (429 or 5xx), else
+    None. The OpenAI / Anthropic SDKs expose `status_code`, google-genai `code`.
+    """
+    for attr in ("status_code", "code"):
+        status = getattr(exc, attr, None)
+        if isinstance(status, int) and (status == 429 or 500 <= status < 600):
+            return status
+    return None
+
+
+class AtCapacity(Exception):
+    """No concurrency slot freed up in time; the caller moves on to the next provider."""
+
+
+@dataclass
+class Slot:
+    """A held concurrency slot; hand it back to AdaptiveLimit.release()."""
+
+    epoch: int
+    waited_s: float
+
+
+class AdaptiveLimit:
+    """
+    AIMD concurrency limit for one provider. Every answered call adds
+    1/limit (about +1 per round of `limit` calls) while the provider is busy
+    enough for the limit to matter; a 429 / 5xx / timeout multiplies the limit
+    by `backoff`, and once the mean of the last few answer latencies exceeds
+    `latency_tolerance` × the long-run median (queueing upstream), each
+    answer takes 1 off it instead. Only one decrease is applied per epoch:
+    calls started before a decrease can't shrink the limit again.
+
+    acquire() waits up to `wait_s` for a free slot (FIFO, no barging past
+    waiters) and returns None when there is none, so callers can move on to
+    another provider. Meant for one event loop; no locking.
+    """
+
+    def __init__(
+        self,
+        initial: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+    ) -> None:
+        self._min = max(1, min_limit)
+        self._max = max(self._min, max_limit)
+        self._limit = float(min(max(initial, self._min), self._max))
+        self._backoff = backoff
+        self._tolerance = latency_tolerance
+        self._epoch = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._recent = RollingWindow(size=_RECENT_SAMPLES)
+        self._baseline_window = RollingWindow(size=_BASELINE_SAMPLES)
+        self._queue_wait = RollingWindow()
+        self.in_flight = 0
+        self.acquired = 0
+        self.queued = 0  # acquisitions that had to wait
+        self.rejected = 0  # no slot within the wait: caller moved on
+        self.overloads = 0
+        self.slow = 0
+        self.decreases = 0
+        self.peak_in_flight = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _take(self, waited: float) -> Slot:
+        self.in_flight += 1
+        self.acquired += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self._queue_wait.record(waited)
+        return Slot(self._epoch, waited)
+
+    def _wake(self) -> None:
+        """Wake the oldest live waiter if a slot is free."""
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    async def acquire(self, wait_s: float) -> Slot | None:
+        """A slot, waiting at most `wait_s` seconds for one; None if none freed up."""
+        if self.in_flight < self.limit and not self._waiters:
+            return self._take(0.0)
+        if wait_s <= 0:
+            self.rejected += 1
+            return None
+        self.queued += 1
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        while True:
+            remaining = wait_s - (loop.time() - start)
+            if remaining <= 0:
+                self.rejected += 1
+                self._wake()
+                return None
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()  # pass on the wake-up we were given
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            if self.in_flight < self.limit:
+                return self._take(loop.time() - start)
+
+    def release(self, slot: Slot, signal: str = IGNORE, latency_s: float | None = None) -> None:
+        """
+        Return `slot` and adjust the limit by what the call showed (OK /
+        OVERLOAD / IGNORE). `latency_s` feeds the congestion check; OK without
+        it (e.g. streams) can only grow the limit.
+        """
+        self.in_flight -= 1
+        if signal == OVERLOAD:
+            self.overloads += 1
+            self._decrease(slot, self._limit * self._backoff)
+        elif signal == OK:
+            if latency_s is not None:
+                self._recent.record(latency_s)
+                self._baseline_window.record(latency_s)
+            if self._congested():
+                self.slow += 1
+                self._decrease(slot, self._limit - 1)
+            elif self.in_flight + 1 >= self._limit / 2:
+                # Only grow while the limit is actually constraining traffic
+                self._limit = min(self._max, self._limit + 1 / self._limit)
+        self._wake()
+
+    def _decrease(self, slot: Slot, target: float) -> None:
+        if slot.epoch != self._epoch:
+            return
+        self._epoch += 1
+        self.decreases += 1
+        self._limit = max(self._min, target)
+
+    def _baseline(self) -> float | None:
+        if len(self._baseline_window) < _MIN_BASELINE_SAMPLES:
+            return None
+        return self._baseline_window.percentile(50)
+
+    def _congested(self) -> bool:
+        baseline, recent = self._baseline(), self._recent.mean()
+        return baseline is not None and recent is not None and recent > baseline * self._tolerance
+
+    def has_capacity(self) -> bool:
+        return self.in_flight < self.limit and not self._waiters
+
+    def stats(self) -> dict:
+        def ms(p: float) -> float | None:
+            value = self._queue_wait.percentile(p)
+            return round(value * 1000, 1) if value is not None else None
+
+        baseline, recent = self._baseline(), self._recent.mean()
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": sum(1 for w in self._waiters if not w.done()),
+            "peak_in_flight": self.peak_in_flight,
+            "acquired": self.acquired,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "overloads": self.overloads,
+            "slow": self.slow,
+            "decreases": self.decreases,
+            "latency_baseline_ms": round(baseline * 1000, 1) if baseline is not None else None,
+            "latency_recent_ms": round(recent * 1000, 1) if recent is not None else None,
+            "queue_wait_p50_ms": ms(50),
+            "queue_wait_p95_ms": ms(95),
+        }
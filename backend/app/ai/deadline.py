@@ -0,0 +1,35 @@
+"""Request deadlines split across the AI fallback chain."""
+
+from __future__ import annotations
+
+import time
+
+
+class Deadline:
+    """
+    An absolute point in time a request must finish by. `Deadline(None)` is
+    unbounded: remaining() is infinite and budget() returns None (no timeout).
+    """
+
+    def __init__(self, seconds: float | None) -> None:
+        self.seconds = seconds
+        self._expires_at = time.monotonic() + seconds if seconds is not None else None
+
+    @property
+    def bounded(self) -> bool:
+        return self._expires_at is not None
+
+    def remaining(self) -> float:
+        if self._expires_at is None:
+            return float("inf")
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def fits(self, needed_s: float) -> bool:
+        """True if at least `needed_s` seconds are left."""
+        return self.remaining() >= needed_s
+
+    def budget(self, cap_s: float) -> float | None:
+        """Timeout for the next attempt: min(remaining, cap), or None if unbounded."""
+        if self._expires_at is None:
+            return None
+        return min(self.remaining(), cap_s)
@@ -1,115 +1,795 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Optional
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional
 
 from fastapi import HTTPException
+from pydantic import BaseModel
 
-from app.ai.base import AIProvider
+from app.ai.base import AIProvider, Completion, GenerationResult, Usage
+from app.ai.cascade import PRIMARY, CascadeStats, parse_tiers
+from app.ai.circuit import CircuitBreaker, CircuitState
+from app.ai.concurrency import IGNORE, OK, OVERLOAD, AdaptiveLimit, AtCapacity, overload_status
+from app.ai.deadline import Deadline
+from app.ai.ratelimit import ProviderRateLimit
+from app.ai.singleflight import SingleFlight
+from app.ai.stats import RollingWindow
+from app.ai.usage import CANCELLED, EMPTY, ERROR, INVALID, SUCCESS, TIMEOUT, UsageAggregator
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# A provider's rolling p95 is only trusted as a hedge delay after this many samples
+_MIN_P95_SAMPLES = 20
+# Providers are only reordered by latency once they have this many successful calls
+_MIN_ORDER_SAMPLES = 5
+# Coalesced callers wait this much past their own deadline, so the leader's
+# (more detailed) 504 normally wins the race
+_DEADLINE_GRACE_S = 0.25
+
+
+def _new_breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        window=settings.ai_breaker_window,
+        min_calls=settings.ai_breaker_min_calls,
+        error_threshold=settings.ai_breaker_error_threshold,
+        slow_call_s=settings.ai_breaker_slow_call_ms / 1000,
+        open_seconds=settings.ai_breaker_open_seconds,
+    )
+
+
+def _new_concurrency_limit() -> AdaptiveLimit:
+    return AdaptiveLimit(
+        initial=settings.ai_concurrency_initial,
+        min_limit=settings.ai_concurrency_min,
+        max_limit=settings.ai_concurrency_max,
+        backoff=settings.ai_concurrency_backoff,
+        latency_tolerance=settings.ai_concurrency_latency_tolerance,
+    )
+
 
 class AIClientFactory:
     """
     Manages an ordered list of AI providers.
-    On generate(), tries each provider in order — if one fails, falls back
+    On agenerate(), tries each provider in order — if one fails, falls back
     to the next. Logs every attempt so you know exactly what happened.
+
+    The registration order is only the starting priority: every provider has
+    a circuit breaker, open providers are skipped, and providers with enough
+    history are reordered by their recent success latency (see effective_order).
+    Async calls also hold a slot of the provider's adaptive concurrency limit;
+    a provider that stays full for AI_CONCURRENCY_WAIT_MS is skipped like an
+    open one, so overload spills over to providers with spare capacity.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self, providers: Iterable[AIProvider] | None = None, tiers: Iterable[AIProvider] = (),
+    ) -> None:
+        """
+        Providers (and cascade tiers) come from Settings unless `providers` is
+        given, e.g. stubs in tests or a one-off factory in a script.
+        """
         self._providers: list[AIProvider] = []
-        self._init_providers()
+        self._latency: defaultdict[str, RollingWindow] = defaultdict(RollingWindow)
+        self._breakers: defaultdict[str, CircuitBreaker] = defaultdict(_new_breaker)
+        self._concurrency: defaultdict[str, AdaptiveLimit] = defaultdict(_new_concurrency_limit)
+        self._singleflight = SingleFlight()
+        self._usage = UsageAggregator()
+        self._rate_limits: dict[str, ProviderRateLimit] = {}
+        self._tiers: list[AIProvider] = []
+        self._cascade = CascadeStats()
+        if providers is None:
+            self._init_providers()
+        else:
+            self._providers = list(providers)
+            self._tiers = list(tiers)
 
     def _init_providers(self) -> None:
         """Register all configured providers in priority order."""
 
-        if settings.openai_api_key and "placeholder" not in settings.openai_api_key:
-            try:
+        if settings.fake_providers:
+            self._init_fake_providers()
+        else:
+            for vendor, model in (
+                ("openai", settings.openai_model),
+                ("anthropic", settings.anthropic_model),
+                ("gemini", settings.gemini_model),
+            ):
+                provider = self._make_provider(vendor, model)
+                if provider is not None:
+                    self._providers.append(provider)
+            if not self._providers:
+                logger.error("No AI providers configured! Set at least one API key in .env")
+
+        if settings.ai_cascade_tiers:
+            self._init_cascade()
+
+    def _make_provider(self, vendor: str, model: str) -> AIProvider | None:
+        """A real provider for `vendor` with `model`, or None if it has no API key (or fails to init)."""
+        try:
+            if vendor == "openai":
+                if not settings.openai_api_key or "placeholder" in settings.openai_api_key:
+                    return None
                 from app.ai.providers.openai_provider import OpenAIProvider
-                self._providers.append(OpenAIProvider(
+                provider = OpenAIProvider(
                     api_key=settings.openai_api_key,
-                    model=settings.openai_model,
-                ))
-                logger.info("Registered AI provider: OpenAI (%s)", settings.openai_model)
-            except Exception as exc:
-                logger.warning("Failed to init OpenAI provider: %s", exc)
-
-        if settings.anthropic_api_key and "placeholder" not in settings.anthropic_api_key:
-            try:
+                    model=model,
+                    structured=settings.openai_structured_output,
+                    prompt_cache=settings.openai_prompt_cache,
+                )
+                logger.info("Registered AI provider: OpenAI (%s)", model)
+            elif vendor == "anthropic":
+                if not settings.anthropic_api_key or "placeholder" in settings.anthropic_api_key:
+                    return None
                 from app.ai.providers.anthropic_provider import AnthropicProvider
-                self._providers.append(AnthropicProvider(
+                provider = AnthropicProvider(
                     api_key=settings.anthropic_api_key,
-                    model=settings.anthropic_model,
-                ))
-                logger.info("Registered AI provider: Anthropic (%s)", settings.anthropic_model)
-            except Exception as exc:
-                logger.warning("Failed to init Anthropic provider: %s", exc)
-
-        if settings.gemini_api_key and "placeholder" not in settings.gemini_api_key:
-            try:
+                    model=model,
+                    structured=settings.anthropic_structured_output,
+                    prompt_cache=settings.anthropic_prompt_cache,
+                )
+                logger.info("Registered AI provider: Anthropic (%s)", model)
+            elif vendor == "gemini":
+                if not settings.gemini_api_key or "placeholder" in settings.gemini_api_key:
+                    return None
                 from app.ai.providers.gemini_provider import GeminiProvider
-                self._providers.append(GeminiProvider(
+                provider = GeminiProvider(
                     api_key=settings.gemini_api_key,
-                    model=settings.gemini_model,
-                ))
-                logger.info("Registered AI provider: Gemini (%s)", settings.gemini_model)
-            except Exception as exc:
-                logger.warning("Failed to init Gemini provider: %s", exc)
+                    model=model,
+                    structured=settings.gemini_structured_output,
+                )
+                logger.info("Registered AI provider: Gemini (%s)", model)
+            else:
+                logger.warning("Unknown AI provider %r", vendor)
+                return None
+        except Exception as exc:
+            logger.warning("Failed to init %s provider: %s", vendor, exc)
+            return None
+        return provider
 
-        if not self._providers:
-            logger.error("No AI providers configured! Set at least one API key in .env")
+    def _make_fake_provider(self, name: str) -> AIProvider:
+        import random
+
+        from app.ai.providers.fake_provider import FakeProvider, LatencyModel
+
+        rng = random.Random(f"{settings.fake_seed}:{name}:latency")
+        return FakeProvider(
+            name=name,
+            latency=LatencyModel(
+                settings.fake_latency, settings.fake_latency_ms, settings.fake_latency_sigma,
+                settings.fake_latency_histogram, rng=rng,
+            ),
+            error_rate=settings.fake_error_rate,
+            empty_rate=settings.fake_empty_rate,
+            malformed_rate=settings.fake_malformed_rate,
+            seed=settings.fake_seed,
+        )
+
+    def _init_fake_providers(self) -> None:
+        """Register offline FakeProviders (FAKE_PROVIDERS) instead of the real ones."""
+        for name in (n.strip() for n in settings.fake_providers.split(",")):
+            if not name:
+                continue
+            self._providers.append(self._make_fake_provider(name))
+            logger.warning("Registered FAKE AI provider: %s (%s latency)", name, settings.fake_latency)
+
+    def _init_cascade(self) -> None:
+        """
+        Register the cascade tiers (AI_CASCADE_TIERS). Each tier is its own
+        provider instance named "vendor/model", so its breaker, latency and
+        usage stats stay separate from the same vendor's primary model.
+        """
+        try:
+            tiers = parse_tiers(settings.ai_cascade_tiers)
+        except ValueError as exc:
+            logger.error("Ignoring AI_CASCADE_TIERS: %s", exc)
+            return
+        for vendor, model in tiers:
+            name = f"{vendor}/{model}"
+            provider = self._make_fake_provider(name) if settings.fake_providers else self._make_provider(vendor, model)
+            if provider is None:
+                logger.warning("Skipping cascade tier %s: provider not configured", name)
+                continue
+            provider.name = name
+            self._tiers.append(provider)
+        logger.info("AI cascade tiers: %s", ", ".join(p.name for p in self._tiers) or "none")
 
     @property
     def providers(self) -> list[AIProvider]:
         return list(self._providers)
 
+    @property
+    def tiers(self) -> list[AIProvider]:
+        return list(self._tiers)
+
     @property
     def available(self) -> bool:
         return len(self._providers) > 0
 
-    def generate(self, system_prompt: str, user_message: str) -> tuple[str, str]:
+    @property
+    def signature(self) -> str:
+        """Identifies the configured provider/model chain (and cascade tiers), e.g. for cache keys."""
+        chain = ",".join(f"{p.name}:{p.model}" for p in self._providers)
+        if self.cascading:
+            chain = ">".join([*(p.name for p in self._tiers), chain])
+        return chain
+
+    @property
+    def cascading(self) -> bool:
+        """True if calls that pass an acceptance check try the cascade tiers first."""
+        return settings.ai_cascade_enabled and bool(self._tiers)
+
+    def effective_order(self) -> list[AIProvider]:
         """
-        Try each provider in order. Return (response_text, provider_name).
-        If all fail, raise HTTP 502.
+        Providers in the order they will be tried right now: open breakers are
+        dropped, providers with latency history come first (fastest median
+        success latency first), the rest keep their configured priority.
+        """
+        candidates = [p for p in self._providers if self._breakers[p.name].state is not CircuitState.OPEN]
+        measured = [p for p in candidates if len(self._latency[p.name]) >= _MIN_ORDER_SAMPLES]
+        unmeasured = [p for p in candidates if p not in measured]
+        measured.sort(key=lambda p: self._latency[p.name].percentile(50) or 0.0)
+        return measured + unmeasured
+
+    def fallback_order(self) -> list[dict]:
+        """Effective order plus breaker state for every provider (open ones last)."""
+        ordered = self.effective_order()
+        ordered += [p for p in self._providers if p not in ordered]
+        result = []
+        for provider in ordered:
+            breaker = self._breakers[provider.name]
+            p50 = self._latency[provider.name].percentile(50)
+            result.append({
+                "name": provider.name,
+                "breaker": breaker.state.value,
+                "error_rate": round(breaker.error_rate, 3),
+                "latency_p50_ms": round(p50 * 1000) if p50 is not None else None,
+            })
+        return result
+
+    async def agenerate(
+        self,
+        system_prompt: str,
+        user_message: str,
+        validate: Callable[[str | list], Any] | None = None,
+        deadline_s: float | None = None,
+        schema: type[BaseModel] | None = None,
+        cascade: Callable[[str | list], Any] | None = None,
+    ) -> GenerationResult:
+        """
+        Providers are tried in order; a response
+        only wins if it is non-empty and `validate(text)` (when given) does not
+        raise — otherwise the next provider is tried.
+
+        With `schema`, providers in structured-output mode constrain the
+        answer to a list of `schema` objects and `validate` receives the
+        decoded item list instead of the text.
+
+        With hedging enabled, if the provider(s) in flight haven't answered
+        within the hedge delay, the same prompt is also sent to the next
+        provider (up to ai_hedge_max_fanout in flight). The first valid answer
+        wins and the rest are cancelled.
+
+        Concurrent calls with the same prompt, model chain and validator are
+        coalesced into one upstream generation (see SingleFlight) and all
+        receive the same result or error.
+
+        With `deadline_s`, the whole call is bounded: each provider attempt
+        gets min(remaining, ai_provider_cap_s), providers that no longer fit
+        are skipped, and running out of time raises HTTP 504 listing the
+        attempts made.
+
+        With `cascade` (an acceptance check used instead of `validate`) and
+        the cascade enabled, the cheaper AI_CASCADE_TIERS models are tried
+        first, one at a time; the regular fallback chain only runs when every
+        tier's answer was rejected (see _acascade).
         """
+        if cascade is not None and self.cascading:
+            def generate() -> Awaitable[GenerationResult]:
+                return self._acascade(system_prompt, user_message, validate, cascade, deadline_s, schema)
+        else:
+            def generate() -> Awaitable[GenerationResult]:
+                return self._agenerate(system_prompt, user_message, validate, deadline_s, schema)
+
+        if not settings.ai_coalesce_enabled:
+            return await generate()
+        key = (system_prompt, user_message, self.signature, validate, schema, cascade if self.cascading else None)
+        flight = self._singleflight.do(key, generate)
+        if deadline_s is None:
+            return await flight
+        try:
+            return await asyncio.wait_for(flight, deadline_s + _DEADLINE_GRACE_S)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"AI deadline of {deadline_s:g}s exceeded")
+
+    @property
+    def coalescing(self) -> SingleFlight:
+        return self._singleflight
+
+    async def _agenerate(
+        self,
+        system_prompt: str,
+        user_message: str,
+        validate: Callable[[str | list], Any] | None,
+        deadline_s: float | None = None,
+        schema: type[BaseModel] | None = None,
+    ) -> GenerationResult:
         if not self._providers:
             raise HTTPException(
                 status_code=503,
                 detail="No AI providers configured. Add at least one API key to .env",
             )
 
+        hedge = settings.ai_hedge_enabled and len(self._providers) > 1
+        fanout = max(1, settings.ai_hedge_max_fanout) if hedge else 1
+
+        deadline = Deadline(deadline_s)
+        queue = list(enumerate(self.effective_order(), start=1))
+        pending: dict[asyncio.Task, AIProvider] = {}
         errors: list[str] = []
+        deferred: set[str] = set()
+        hedged = False
+        out_of_time = False
+        at_capacity = 0
 
-        for provider in self._providers:
-            try:
+        def launch() -> None:
+            nonlocal out_of_time
+            while queue:
+                position, provider = queue.pop(0)
+                if not deadline.fits(self._min_attempt(provider)):
+                    out_of_time = True
+                    errors.append(f"{provider.name}: skipped, {deadline.remaining():.1f}s left")
+                    continue
+                if (
+                    provider.name not in deferred
+                    and not self._has_capacity(provider)
+                    and any(self._has_capacity(p) for _, p in queue)
+                ):
+                    # Full: try it only after the providers that have room
+                    deferred.add(provider.name)
+                    queue.append((position, provider))
+                    continue
+                if not self._breakers[provider.name].allow():
+                    errors.append(f"{provider.name}: circuit open")
+                    continue
                 logger.info("Trying AI provider: %s", provider.name)
-                result = provider.generate(system_prompt, user_message)
-                if result.strip():
-                    logger.info("Success with provider: %s", provider.name)
-                    return result, provider.name
-                else:
+                task = asyncio.create_task(self._call_provider(
+                    provider, system_prompt, user_message, validate, position,
+                    timeout=deadline.budget(settings.ai_provider_cap_s), schema=schema,
+                ))
+                pending[task] = provider
+                return
+
+        launch()
+        try:
+            while pending:
+                timeout = self._hedge_delay(pending.values()) if hedge and queue and len(pending) < fanout else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    in_flight = len(pending)
+                    launch()
+                    if len(pending) > in_flight:
+                        hedged = True
+                        logger.info("Hedging: no answer after %.0f ms, also trying next provider", timeout * 1000)
+                    continue
+
+                failed = 0
+                for task in done:
+                    provider = pending.pop(task)
+                    try:
+                        completion, parsed = task.result()
+                    except Exception as exc:
+                        out_of_time = out_of_time or isinstance(exc, asyncio.TimeoutError)
+                        at_capacity += isinstance(exc, AtCapacity)
+                        failed += 1
+                        errors.append(f"{provider.name}: {exc}")
+                        logger.warning("Provider %s failed: %s — falling back", provider.name, exc)
+                        continue
+                    logger.info("Success with provider: %s%s", provider.name, " (hedged)" if hedged else "")
+                    return GenerationResult(
+                        text=completion.text,
+                        provider=provider.name,
+                        parsed=parsed,
+                        hedged=hedged,
+                        usage=completion.usage,
+                    )
+
+                # One replacement per failed attempt; more parallelism only via the hedge timer
+                for _ in range(failed):
+                    if not queue or len(pending) >= fanout:
+                        break
+                    launch()
+                hedged = hedged or len(pending) > 1
+        finally:
+            for task in pending:
+                task.cancel()
+
+        self._raise_exhausted(errors, deadline if out_of_time else None, busy=bool(errors) and at_capacity == len(errors))
+
+    async def _acascade(
+        self,
+        system_prompt: str,
+        user_message: str,
+        validate: Callable[[str | list], Any] | None,
+        cascade: Callable[[str | list], Any],
+        deadline_s: float | None = None,
+        schema: type[BaseModel] | None = None,
+    ) -> GenerationResult:
+        """
+        Try each cascade tier in order and return the first answer `cascade`
+        accepts; a tier that errors, times out or is rejected escalates to the
+        next. Tiers share the deadline with the primary chain, which gets
+        whatever is left.
+        """
+        deadline = Deadline(deadline_s)
+        self._cascade.begin()
+        for position, provider in enumerate(self._tiers, start=1):
+            if not deadline.fits(self._min_attempt(provider)) or not self._breakers[provider.name].allow():
+                continue
+            start = time.perf_counter()
+            try:
+                completion, parsed = await self._call_provider(
+                    provider, system_prompt, user_message, cascade, position,
+                    timeout=deadline.budget(settings.ai_provider_cap_s), schema=schema,
+                )
+            except Exception as exc:
+                self._cascade.record(provider.name, False, time.perf_counter() - start)
+                logger.info("Cascade tier %s rejected: %s — escalating", provider.name, exc)
+                continue
+            self._cascade.record(provider.name, True, time.perf_counter() - start)
+            return GenerationResult(text=completion.text, provider=provider.name, parsed=parsed, usage=completion.usage)
+
+        self._cascade.escalate()
+        start = time.perf_counter()
+        try:
+            result = await self._agenerate(
+                system_prompt, user_message, validate, deadline.remaining() if deadline.bounded else None, schema,
+            )
+        except Exception:
+            self._cascade.record(PRIMARY, False, time.perf_counter() - start)
+            raise
+        self._cascade.record(PRIMARY, True, time.perf_counter() - start)
+        return result
+
+    def cascade_stats(self) -> dict:
+        """Escalation rate and per-tier acceptance / latency (primary = the fallback chain)."""
+        return {
+            "enabled": self.cascading,
+            **self._cascade.stats([*(p.name for p in self._tiers), PRIMARY]),
+        }
+
+    async def astream(
+        self,
+        system_prompt: str,
+        user_message: str,
+        usage: Usage | None = None,
+        deadline_s: float | None = None,
+        schema: type[BaseModel] | None = None,
+    ) -> AsyncIterator[tuple[str, str]]:
+        """
+        Stream a response as (provider_name, text_chunk) pairs from the first
+        available provider. A provider that fails before producing any text is
+        skipped like in agenerate(); once chunks have been yielded a failure
+        is raised as HTTP 502, since the caller has already consumed output.
+        `usage`, when given, is filled with the winning call's token usage.
+
+        `deadline_s` bounds the time until the first chunk, split across
+        providers like in agenerate(); once text flows only the SDK read
+        timeout applies. `schema` enables structured output as in agenerate()
+        (chunks are then the JSON text of the {"items": [...]} object).
+        Streams skip the cascade tiers: chunks can't be checked before they
+        are yielded.
+        """
+        if not self._providers:
+            raise HTTPException(
+                status_code=503,
+                detail="No AI providers configured. Add at least one API key to .env",
+            )
+
+        deadline = Deadline(deadline_s)
+        errors: list[str] = []
+        out_of_time = False
+        at_capacity = 0
+        # Providers with spare concurrency first (stable: otherwise in effective order)
+        order = sorted(self.effective_order(), key=lambda p: not self._has_capacity(p))
+
+        for position, provider in enumerate(order, start=1):
+            if not deadline.fits(self._min_attempt(provider)):
+                out_of_time = True
+                errors.append(f"{provider.name}: skipped, {deadline.remaining():.1f}s left")
+                continue
+            breaker = self._breakers[provider.name]
+            if not breaker.allow():
+                errors.append(f"{provider.name}: circuit open")
+                continue
+            slot = None
+            if settings.ai_concurrency_enabled:
+                concurrency = self._concurrency[provider.name]
+                try:
+                    slot = await concurrency.acquire(settings.ai_concurrency_wait_ms / 1000)
+                except asyncio.CancelledError:
+                    breaker.release()
+                    raise
+                if slot is None:
+                    breaker.release()
+                    at_capacity += 1
+                    errors.append(f"{provider.name}: at its concurrency limit ({concurrency.limit} in flight)")
+                    continue
+
+            logger.info("Streaming from AI provider: %s", provider.name)
+            budget = deadline.budget(settings.ai_provider_cap_s)
+            start = time.perf_counter()
+            ttft: float | None = None
+            call_usage = Usage()
+            signal = IGNORE
+            try:
+                stream = provider.astream(system_prompt, user_message, call_usage, schema)
+                try:
+                    while ttft is None:
+                        wait = budget - (time.perf_counter() - start) if budget is not None else None
+                        try:
+                            chunk = await asyncio.wait_for(anext(stream), wait)
+                        except StopAsyncIteration:
+                            break
+                        if chunk:
+                            ttft = time.perf_counter() - start
+                            yield provider.name, chunk
+                    if ttft is not None:
+                        async for chunk in stream:
+                            if chunk:
+                                yield provider.name, chunk
+                except (asyncio.CancelledError, GeneratorExit):
+                    breaker.release()
+                    self._record(provider, CANCELLED, position, start, ttft, call_usage)
+                    raise
+                except asyncio.TimeoutError:
+                    await stream.aclose()
+                    if budget is not None and budget >= settings.ai_provider_cap_s:
+                        signal = OVERLOAD
+                    out_of_time = True
+                    self._timed_out(provider, position, start, budget)
+                    errors.append(f"{provider.name}: no first chunk within {budget:.1f}s")
+                    logger.warning("Provider %s timed out — falling back", provider.name)
+                    continue
+                except Exception as exc:
+                    if overload_status(exc) is not None:
+                        signal = OVERLOAD
+                    breaker.record_failure()
+                    self._record(provider, ERROR, position, start, ttft, call_usage)
+                    if ttft is not None:
+                        raise HTTPException(status_code=502, detail=f"{provider.name} stream failed: {exc}")
+                    errors.append(f"{provider.name}: {exc}")
+                    logger.warning("Provider %s failed: %s — falling back", provider.name, exc)
+                    continue
+
+                if ttft is None:
+                    breaker.record_failure()
+                    self._record(provider, EMPTY, position, start, usage=call_usage)
                     errors.append(f"{provider.name}: empty response")
                     logger.warning("Empty response from %s, trying next", provider.name)
+                    continue
+
+                signal = OK
+                elapsed = time.perf_counter() - start
+                breaker.record_success(elapsed)
+                self._latency[provider.name].record(elapsed)
+                self._record(provider, SUCCESS, position, start, ttft, call_usage)
+                if usage is not None:
+                    usage.update(call_usage)
+                logger.info("Stream complete from provider: %s", provider.name)
+                return
+            finally:
+                if slot is not None:
+                    # No latency sample: time to first chunk isn't comparable with whole answers
+                    self._concurrency[provider.name].release(slot, signal)
+
+        self._raise_exhausted(errors, deadline if out_of_time else None, busy=bool(errors) and at_capacity == len(errors))
+
+    async def _call_provider(
+        self,
+        provider: AIProvider,
+        system_prompt: str,
+        user_message: str,
+        validate: Callable[[str | list], Any] | None,
+        position: int = 1,
+        timeout: float | None = None,
+        schema: type[BaseModel] | None = None,
+    ) -> tuple[Completion, Any]:
+        """
+        Run one provider call (bounded by `timeout`), validate the answer, and
+        feed its breaker, latency window, concurrency limit and the usage
+        aggregator. Raises AtCapacity when no concurrency slot frees up within
+        AI_CONCURRENCY_WAIT_MS (the wait comes out of `timeout`).
+        """
+        breaker = self._breakers[provider.name]
+        concurrency = self._concurrency[provider.name] if settings.ai_concurrency_enabled else None
+        slot = None
+        if concurrency is not None:
+            wait = settings.ai_concurrency_wait_ms / 1000
+            try:
+                slot = await concurrency.acquire(min(wait, timeout) if timeout is not None else wait)
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            if slot is None:
+                breaker.release()
+                raise AtCapacity(f"at its concurrency limit ({concurrency.limit} in flight)")
+            if timeout is not None:
+                timeout = max(0.0, timeout - slot.waited_s)
+        limit = self._rate_limits.get(provider.name)
+        reserved = 0
+        if limit is not None:
+            try:
+                reserved = await limit.acquire()
+            except asyncio.CancelledError:
+                breaker.release()
+                if slot is not None:
+                    concurrency.release(slot)
+                raise
+        start = time.perf_counter()
+        completion: Completion | None = None
+        outcome = ERROR
+        signal = IGNORE
+        try:
+            try:
+                completion = await asyncio.wait_for(provider.acomplete(system_prompt, user_message, schema), timeout)
+            except asyncio.TimeoutError:
+                if timeout is not None and timeout >= settings.ai_provider_cap_s:
+                    signal = OVERLOAD
+                self._timed_out(provider, position, start, timeout)
+                raise asyncio.TimeoutError(f"no answer within {timeout:.1f}s") from None
             except Exception as exc:
-                errors.append(f"{provider.name}: {exc}")
-                logger.warning("Provider %s failed: %s — falling back", provider.name, exc)
+                if overload_status(exc) is not None:
+                    signal = OVERLOAD
+                raise
+            signal = OK  # answered; a bad answer below is not a capacity problem
+            if not completion.text.strip():
+                outcome = EMPTY
+                raise ValueError("empty response")
+            outcome = INVALID
+            answer = completion.structured if completion.structured is not None else completion.text
+            parsed = validate(answer) if validate else None
+        except asyncio.CancelledError:
+            breaker.release()
+            self._record(provider, CANCELLED, position, start)
+            raise
+        except asyncio.TimeoutError:
+            raise
+        except Exception:
+            if outcome == INVALID:
+                # It answered: a rejected answer (e.g. during pick repair) is
+                # counted as INVALID in usage, not against the provider's health
+                breaker.release()
+            else:
+                breaker.record_failure()
+            self._record(provider, outcome, position, start, usage=completion.usage if completion else None)
+            raise
+        finally:
+            if limit is not None and completion is not None:
+                limit.settle(reserved, completion.usage.total_tokens)
+            if slot is not None:
+                concurrency.release(slot, signal, time.perf_counter() - start)
+        elapsed = time.perf_counter() - start
+        breaker.record_success(elapsed)
+        self._latency[provider.name].record(elapsed)
+        self._record(provider, SUCCESS, position, start, usage=completion.usage)
+        return completion, parsed
 
-        detail = "All AI providers failed:\n" + "\n".join(f"  - {e}" for e in errors)
+    def _timed_out(self, provider: AIProvider, position: int, start: float, budget: float | None) -> None:
+        """
+        Account for an attempt that ran out of its deadline share. It only
+        counts against the breaker if the provider had the full per-provider
+        cap; a short leftover budget says nothing about its health.
+        """
+        breaker = self._breakers[provider.name]
+        if budget is not None and budget >= settings.ai_provider_cap_s:
+            breaker.record_failure()
+        else:
+            breaker.release()
+        self._record(provider, TIMEOUT, position, start)
+
+    def _min_attempt(self, provider: AIProvider) -> float:
+        """Least remaining budget worth starting `provider` with (floor, or its median latency)."""
+        window = self._latency[provider.name]
+        p50 = window.percentile(50) if len(window) >= _MIN_ORDER_SAMPLES else None
+        return max(settings.ai_min_attempt_s, p50 or 0.0)
+
+    def _has_capacity(self, provider: AIProvider) -> bool:
+        return not settings.ai_concurrency_enabled or self._concurrency[provider.name].has_capacity()
+
+    @staticmethod
+    def _raise_exhausted(errors: list[str], deadline: Deadline | None = None, busy: bool = False) -> None:
+        """
+        Raise 502 (every provider failed), 504 (the deadline ran out) or 503
+        (`busy`: every provider was at its concurrency limit) listing the attempts.
+        """
+        if not errors:
+            errors.append("every provider's circuit breaker is open")
+        attempts = "\n".join(f"  - {e}" for e in errors)
+        if deadline is not None:
+            detail = f"AI deadline of {deadline.seconds:g}s exhausted:\n{attempts}"
+            logger.error(detail)
+            raise HTTPException(status_code=504, detail=detail)
+        if busy:
+            detail = "All AI providers are at capacity:\n" + attempts
+            logger.warning(detail)
+            raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "1"})
+        detail = "All AI providers failed:\n" + attempts
         logger.error(detail)
         raise HTTPException(status_code=502, detail=detail)
 
-    def health(self) -> list[dict]:
-        """Return health status for every registered provider."""
-        results = []
-        for provider in self._providers:
+    def _record(
+        self,
+        provider: AIProvider,
+        outcome: str,
+        position: int,
+        start: float,
+        ttft: float | None = None,
+        usage: Usage | None = None,
+    ) -> None:
+        self._usage.record(
+            provider.name, provider.model, outcome, position, structured=provider.structured,
+            latency_s=time.perf_counter() - start, ttft_s=ttft, usage=usage,
+        )
+
+    def set_rate_limits(self, limits: dict[str, ProviderRateLimit]) -> None:
+        """
+        Throttle async calls per provider name (used by bulk jobs; the request
+        path relies on route rate limits instead).
+        """
+        self._rate_limits = dict(limits)
+
+    def rate_limit_stats(self) -> dict[str, dict]:
+        return {name: limit.stats() for name, limit in self._rate_limits.items()}
+
+    def concurrency_stats(self) -> dict:
+        """Per-provider adaptive concurrency: current limit, in-flight / waiting calls, queue wait percentiles."""
+        names = [p.name for p in [*self._tiers, *self._providers]]
+        return {
+            "enabled": settings.ai_concurrency_enabled,
+            "providers": [{"name": name, **self._concurrency[name].stats()} for name in names],
+        }
+
+    def usage_stats(self) -> list[dict]:
+        """Token / latency / outcome aggregates per provider (see UsageAggregator)."""
+        return self._usage.stats()
+
+    def _hedge_delay(self, in_flight: Iterable[AIProvider]) -> float:
+        """Seconds to wait on the in-flight providers before hedging."""
+        delay = settings.ai_hedge_delay_ms / 1000
+        if settings.ai_hedge_use_p95:
+            p95s = [
+                self._latency[p.name].percentile(95)
+                for p in in_flight
+                if len(self._latency[p.name]) >= _MIN_P95_SAMPLES
+            ]
+            if p95s:
+                delay = min(p for p in p95s if p is not None)
+        return delay
+
+    def transport_stats(self) -> list[dict]:
+        """Connection reuse / client cache statistics per provider."""
+        return [{"name": p.name, **(p.transport_stats() or {})} for p in self._providers]
+
+    async def aclose(self) -> None:
+        """Close every provider's pooled connections."""
+        await asyncio.gather(*(p.aclose() for p in [*self._providers, *self._tiers]), return_exceptions=True)
+
+    async def ahealth(self) -> list[dict]:
+        """Return health status for every registered provider (pinged concurrently)."""
+
+        async def _one(provider: AIProvider) -> dict:
             try:
-                ok = provider.ping()
-                results.append({"name": provider.name, "status": "connected" if ok else "error"})
+                ok = await provider.aping()
+                return {"name": provider.name, "status": "connected" if ok else "error"}
             except Exception as exc:
-                results.append({"name": provider.name, "status": "error", "detail": str(exc)})
-        return results
+                return {"name": provider.name, "status": "error", "detail": str(exc)}
+
+        return list(await asyncio.gather(*(_one(p) for p in self._providers)))
 
 
 # Singleton — created once at startup
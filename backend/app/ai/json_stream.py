@@ -0,0 +1,221 @@
+"""
+Push-style incremental parser for the JSON array of objects an LLM returns.
+
+Feed text chunks as they arrive; every object is yielded (validated against an
+optional Pydantic model) as soon as its closing brace is seen. In positional
+mode, elements may also be compact rows (`["Seiko", "40mm", ...]`) whose
+values map onto the model's fields in declaration order. Leading prose,
+code fences and anything after the closing ']' are ignored, and every problem
+is recorded with the item index so failures can be reported precisely.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+
+from pydantic import BaseModel, ValidationError
+
+# '[' followed by the start of an object, a row or an empty array — skips "[4 picks]" in prose
+_ARRAY_START = re.compile(r"\[\s*([{\[\]])")
+_NEXT_TOKEN = re.compile(r"[^\s,]")
+# A complete string literal (skipped in one step), or a single structural char
+_STRUCTURAL = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|["{}\[\]]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r"[,\]]")
+
+_SEEK, _ARRAY, _DONE = "seek", "array", "done"
+_DECODER = json.JSONDecoder()
+
+
+class ArrayParseError(ValueError):
+    """Raised by IncrementalArrayParser.close() when no usable item was parsed."""
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc']) or 'object'}: {err['msg']}" for err in exc.errors()
+    )
+
+
+class IncrementalArrayParser:
+    """
+    Incremental parser for `[ {...}, {...}, ... ]` (or `[ [...], [...] ]`
+    rows when `positional`, which requires a model).
+
+    feed(chunk) returns the items completed by that chunk; close() returns all
+    valid items or raises ArrayParseError with the reasons. Invalid items are
+    skipped and described in `errors`.
+    """
+
+    def __init__(self, model: type[BaseModel] | None = None, positional: bool = False) -> None:
+        if positional and model is None:
+            raise ValueError("positional parsing needs a model to name the fields")
+        self._model = model
+        self._fields = tuple(model.model_fields) if positional else None
+        self._buf = ""
+        self._pos = 0
+        self._state = _SEEK
+        self._depth = 0
+        self._obj_start = 0
+        self._in_string = False
+        self._index = 0  # index of the next array element
+        self.items: list[dict] = []
+        self.positions: list[int] = []  # array index each of `items` came from
+        self.errors: list[str] = []
+
+    @property
+    def done(self) -> bool:
+        """True once the closing ']' has been seen."""
+        return self._state == _DONE
+
+    def feed(self, chunk: str) -> list[dict]:
+        if self._state == _DONE or not chunk:
+            return []
+        self._buf += chunk
+        found: list[dict] = []
+        if self._state == _SEEK:
+            self._seek()
+        if self._state == _ARRAY:
+            self._scan(found)
+        return found
+
+    def feed_items(self, items: list) -> list[dict]:
+        """
+        Accept an already-decoded array (structured output) instead of text:
+        each element is validated like a scanned one and the array is done.
+        """
+        found = []
+        for obj in items:
+            accepted = self._accept(obj)
+            if accepted is not None:
+                found.append(accepted)
+        self._state = _DONE
+        return found
+
+    def close(self) -> list[dict]:
+        """Finish parsing. Returns the valid items or raises ArrayParseError."""
+        if self._state == _SEEK:
+            raise ArrayParseError("no JSON array found in response")
+        if self._state == _ARRAY:
+            if self._depth > 0:
+                self.errors.append(f"item {self._index}: truncated (response ended mid-object)")
+            self.errors.append("array not terminated (missing ']')")
+        if not self.items:
+            raise ArrayParseError("; ".join(self.errors) if self.errors else "empty array")
+        return self.items
+
+    def _seek(self) -> None:
+        match = _ARRAY_START.search(self._buf, self._pos)
+        if match is None:
+            # Keep a trailing '[' (plus whitespace) around: its next char may still arrive
+            tail = self._buf.rfind("[")
+            start = tail if tail != -1 and not self._buf[tail + 1:].strip() else len(self._buf)
+            self._buf, self._pos = self._buf[start:], 0
+            return
+        self._state = _ARRAY
+        self._buf, self._pos = self._buf[match.start(1):], 0
+
+    def _scan(self, found: list[dict]) -> None:
+        buf = self._buf
+        pos = self._pos
+        end = len(buf)
+        while pos < end:
+            if self._depth == 0:
+                match = _NEXT_TOKEN.search(buf, pos)
+                if match is None:
+                    pos = end
+                    break
+                pos = match.start()
+                c = buf[pos]
+                if c == "{" or (c == "[" and self._fields):
+                    # Fast path: a complete, well-formed object decodes in one C call
+                    try:
+                        obj, obj_end = _DECODER.raw_decode(buf, pos)
+                    except json.JSONDecodeError:
+                        self._obj_start = pos
+                        self._depth = 1
+                        pos += 1
+                    else:
+                        item = self._accept(obj)
+                        if item is not None:
+                            found.append(item)
+                        pos = obj_end
+                elif c == "]":
+                    self._state = _DONE
+                    pos = end
+                    break
+                else:
+                    sep = _SCALAR_END.search(buf, pos)
+                    if sep is None:
+                        break  # wait for the rest of this element
+                    self.errors.append(f"item {self._index}: expected an object, got {buf[pos:sep.start()].strip()[:40]!r}")
+                    self._index += 1
+                    pos = sep.start()
+                    if buf[pos] == ",":
+                        pos += 1
+            elif self._in_string:
+                match = _STRING_SPECIAL.search(buf, pos)
+                if match is None:
+                    pos = end
+                    break
+                if buf[match.start()] == "\\":
+                    if match.start() + 1 >= end:
+                        pos = match.start()
+                        break  # escape split across chunks
+                    pos = match.start() + 2
+                else:
+                    self._in_string = False
+                    pos = match.end()
+            else:
+                match = _STRUCTURAL.search(buf, pos)
+                if match is None:
+                    pos = end
+                    break
+                c = buf[match.start()]
+                pos = match.end()
+                if c == '"':
+                    # Only a lone quote (string continues past this chunk) starts string mode
+                    self._in_string = pos - match.start() == 1
+                elif c in "{[":
+                    self._depth += 1
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        item = self._finish_item(buf[self._obj_start:pos])
+                        if item is not None:
+                            found.append(item)
+        # Drop consumed text, keeping the start of an unfinished object
+        keep = self._obj_start if self._depth > 0 else pos
+        self._buf, self._pos = buf[keep:], pos - keep
+        self._obj_start -= keep
+
+    def _finish_item(self, text: str) -> dict | None:
+        try:
+            obj = json.loads(text)
+        except json.JSONDecodeError as exc:
+            self.errors.append(f"item {self._index}: invalid JSON ({exc.msg} at char {exc.pos})")
+            self._index += 1
+            return None
+        return self._accept(obj)
+
+    def _accept(self, obj: object) -> dict | None:
+        index = self._index
+        self._index += 1
+        if self._fields is not None and isinstance(obj, list):
+            if len(obj) != len(self._fields):
+                self.errors.append(f"item {index}: expected {len(self._fields)} values, got {len(obj)}")
+                return None
+            obj = dict(zip(self._fields, obj))
+        if not isinstance(obj, dict):
+            self.errors.append(f"item {index}: expected an object, got {type(obj).__name__}")
+            return None
+        if self._model is not None:
+            try:
+                obj = self._model.model_validate(obj).model_dump()
+            except ValidationError as exc:
+                self.errors.append(f"item {index}: {_format_validation_error(exc)}")
+                return None
+        self.items.append(obj)
+        self.positions.append(index)
+        return obj
@@ -1,38 +1,148 @@
 from __future__ import annotations
 
+import json
 import logging
+from typing import AsyncIterator
 
 import anthropic
+from pydantic import BaseModel
 
-from app.ai.base import AIProvider
+from app.ai.base import AIProvider, Completion, Usage
+from app.ai.schema import extract_items, items_schema
+from app.ai.transport import ConnectionStats, pooled_async_client, sdk_timeout
 
 logger = logging.getLogger(__name__)
 
 
+def _usage(usage) -> Usage:
+    if usage is None:
+        return Usage()
+    # input_tokens only counts the uncached part of the prompt
+    cache_read = getattr(usage, "cache_read_input_tokens", None)
+    cache_write = getattr(usage, "cache_creation_input_tokens", None)
+    return Usage(
+        prompt_tokens=usage.input_tokens + (cache_read or 0) + (cache_write or 0),
+        completion_tokens=usage.output_tokens,
+        cache_read_tokens=cache_read,
+        cache_write_tokens=cache_write,
+    )
+
+
+# Structured answers are requested as a forced call of this tool
+_TOOL_NAME = "record_items"
+
+
+def _tool_options(schema: type[BaseModel]) -> dict:
+    return {
+        "tools": [{
+            "name": _TOOL_NAME,
+            "description": f"Record the answer as a list of {schema.__name__} objects.",
+            "input_schema": items_schema(schema),
+        }],
+        "tool_choice": {"type": "tool", "name": _TOOL_NAME},
+    }
+
+
 class AnthropicProvider(AIProvider):
     name = "anthropic"
 
-    def __init__(self, api_key: str, model: str = "claude-3-5-haiku-latest"):
-        self._client = anthropic.Anthropic(api_key=api_key)
-        self._model = model
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "claude-3-5-haiku-latest",
+        structured: bool = False,
+        prompt_cache: bool = False,
+    ):
+        self._stats = ConnectionStats()
+        self._client = anthropic.Anthropic(api_key=api_key, timeout=sdk_timeout(anthropic))
+        self._async_client = anthropic.AsyncAnthropic(
+            api_key=api_key, http_client=pooled_async_client(anthropic, self._stats),
+        )
+        self.model = model
+        self.structured = structured
+        self.prompt_cache = prompt_cache
+
+    def _system(self, system_prompt: str) -> str | list[dict]:
+        """
+        The system block, with a cache breakpoint at its end when prompt caching
+        is on: tools (structured mode) and the system prompt form the cached
+        prefix, the user turn after it varies per request. Prefixes shorter
+        than the model's minimum (1024–2048 tokens) are simply not cached.
+        """
+        if not self.prompt_cache:
+            return system_prompt
+        return [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+
+    def _tool_options(self, schema: type[BaseModel] | None) -> dict:
+        return _tool_options(schema) if schema is not None and self.structured else {}
 
     def generate(self, system_prompt: str, user_message: str) -> str:
         message = self._client.messages.create(
-            model=self._model,
+            model=self.model,
             max_tokens=2048,
-            system=system_prompt,
+            system=self._system(system_prompt),
             messages=[{"role": "user", "content": user_message}],
         )
         return message.content[0].text if message.content else ""
 
     def ping(self) -> bool:
         try:
-            self._client.messages.create(
-                model=self._model,
-                max_tokens=5,
-                messages=[{"role": "user", "content": "hi"}],
-            )
+            self._client.models.retrieve(self.model)
             return True
         except Exception as exc:
             logger.warning("Anthropic ping failed: %s", exc)
             return False
+
+    async def agenerate(self, system_prompt: str, user_message: str) -> str:
+        return (await self.acomplete(system_prompt, user_message)).text
+
+    async def acomplete(
+        self, system_prompt: str, user_message: str, schema: type[BaseModel] | None = None,
+    ) -> Completion:
+        message = await self._async_client.messages.create(
+            model=self.model,
+            max_tokens=2048,
+            system=self._system(system_prompt),
+            messages=[{"role": "user", "content": user_message}],
+            **self._tool_options(schema),
+        )
+        for block in message.content:
+            if block.type == "tool_use":
+                return Completion(json.dumps(block.input), _usage(message.usage), extract_items(block.input))
+        return Completion(message.content[0].text if message.content else "", _usage(message.usage))
+
+    async def astream(
+        self,
+        system_prompt: str,
+        user_message: str,
+        usage: Usage | None = None,
+        schema: type[BaseModel] | None = None,
+    ) -> AsyncIterator[str]:
+        async with self._async_client.messages.stream(
+            model=self.model,
+            max_tokens=2048,
+            system=self._system(system_prompt),
+            messages=[{"role": "user", "content": user_message}],
+            **self._tool_options(schema),
+        ) as stream:
+            async for event in stream:
+                if event.type == "text":
+                    yield event.text
+                elif event.type == "input_json":
+                    yield event.partial_json
+            if usage is not None:
+                usage.update(_usage((await stream.get_final_message()).usage))
+
+    async def aping(self) -> bool:
+        try:
+            await self._async_client.models.retrieve(self.model)
+            return True
+        except Exception as exc:
+            logger.warning("Anthropic ping failed: %s", exc)
+            return False
+
+    def transport_stats(self) -> dict | None:
+        return self._stats.stats()
+
+    async def aclose(self) -> None:
+        await self._async_client.close()
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from typing import AsyncIterator
+from urllib.parse import quote
+
+from pydantic import BaseModel
+
+from app.ai.base import AIProvider, Completion, Usage
+from app.schemas.picks import WatchPick
+
+_BRANDS = {
+    "Seiko": ["Presage", "Prospex", "5 Sports"],
+    "Tissot": ["PRX", "Gentleman", "Seastar"],
+    "Orient": ["Bambino", "Kamasu", "Star"],
+    "Hamilton": ["Khaki Field", "Jazzmaster", "Ventura"],
+    "Citizen": ["Tsuyosa", "Promaster", "Eco-Drive One"],
+    "Casio": ["G-Shock", "Oceanus", "Edifice"],
+}
+_PRICES = ["$150–$250", "$250–$400", "$400–$600", "$600–$900", "$900–$1,500"]
+_SIZES = ["36mm", "38mm", "39.5mm", "40mm", "40.8mm", "42mm", "44mm"]
+
+# Rough chars-per-token ratio used to report plausible usage
+_CHARS_PER_TOKEN = 4
+
+# "[id] name | ..." lines of a watch-catalog shortlist prompt
+_SHORTLIST_ID = re.compile(r"^\[([^\]]+)\]", re.MULTILINE)
+
+
+def fake_watches(user_message: str, count: int = 4) -> list[dict]:
+    """Valid WatchResult dicts derived deterministically from the user message."""
+    digest = hashlib.sha256(user_message.encode()).digest()
+    brands = list(_BRANDS)
+    watches = []
+    for i in range(count):
+        brand = brands[(digest[i] + i) % len(brands)]
+        line = _BRANDS[brand][digest[i + 8] % len(_BRANDS[brand])]
+        name = f"{brand} {line} {digest[i + 16]:03d}"
+        watches.append({
+            "name": name,
+            "brand": brand,
+            "price_range": _PRICES[digest[i + 24] % len(_PRICES)],
+            "case_size": _SIZES[digest[i + 4] % len(_SIZES)],
+            "reason": f"A deterministic stand-in pick #{i + 1}. Generated by the fake provider for load tests.",
+            "chrono24_url": "https://www.chrono24.com/search/index.htm?query=" + quote(name),
+            "amazon_url": "https://www.amazon.com/s?k=" + quote(name),
+        })
+    return watches
+
+
+def fake_rows(user_message: str, count: int = 4) -> list[list[str]]:
+    """
+    The compact answer rows a model would write: [id, reason] choices for a
+    shortlist prompt (its first `count` candidates), else WatchPick rows.
+    """
+    ids = _SHORTLIST_ID.findall(user_message)
+    if ids:
+        return [
+            [watch_id, f"A deterministic stand-in choice #{i + 1}. Picked by the fake provider for load tests."]
+            for i, watch_id in enumerate(ids[:count])
+        ]
+    return [[watch[field] for field in WatchPick.model_fields] for watch in fake_watches(user_message, count)]
+
+
+def parse_histogram(spec: str) -> list[tuple[float, float]]:
+    """'200:10,500:60,1500:30' → [(ms, weight), ...]."""
+    buckets = []
+    for part in spec.split(","):
+        if part.strip():
+            ms, _, weight = part.partition(":")
+            buckets.append((float(ms), float(weight or 1)))
+    if not buckets:
+        raise ValueError("latency histogram is empty")
+    return buckets
+
+
+class LatencyModel:
+    """
+    Samples call latency in seconds: "fixed" (always `ms`), "lognormal"
+    (median `ms`, shape `sigma`) or "histogram" (replays the weighted
+    buckets of a recorded latency histogram).
+    """
+
+    def __init__(
+        self, kind: str = "fixed", ms: float = 0.0, sigma: float = 0.5, histogram: str = "",
+        rng: random.Random | None = None,
+    ) -> None:
+        if kind not in ("fixed", "lognormal", "histogram"):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.kind = kind
+        self._ms = ms
+        self._sigma = sigma
+        self._rng = rng or random.Random()
+        if kind == "histogram":
+            buckets = parse_histogram(histogram)
+            self._values = [ms for ms, _ in buckets]
+            self._weights = [w for _, w in buckets]
+
+    def sample(self) -> float:
+        if self.kind == "lognormal":
+            return self._rng.lognormvariate(math.log(max(self._ms, 1e-3)), self._sigma) / 1000
+        if self.kind == "histogram":
+            return self._rng.choices(self._values, self._weights)[0] / 1000
+        return self._ms / 1000
+
+
+class FakeProvider(AIProvider):
+    """
+    Offline stand-in for load tests and benchmarks: answers with four compact
+    rows derived from the user message (or the first four shortlist ids, for
+    watch-catalog prompts) after a sampled latency, and
+    injects errors, empty responses and malformed JSON at the given rates.
+    Randomness comes from a seeded RNG, so runs are reproducible.
+    """
+
+    def __init__(
+        self,
+        name: str = "fake",
+        latency: LatencyModel | None = None,
+        error_rate: float = 0.0,
+        empty_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        seed: int = 0,
+        structured: bool = False,
+    ):
+        self.name = name
+        self.model = "fake"
+        self.structured = structured
+        self._rng = random.Random(f"{seed}:{name}")
+        self._latency = latency or LatencyModel(rng=self._rng)
+        self._error_rate = error_rate
+        self._empty_rate = empty_rate
+        self._malformed_rate = malformed_rate
+        self.calls = 0
+
+    def _answer(self, user_message: str, schema: type[BaseModel] | None = None) -> Completion:
+        """Pick this call's fault (if any) and build the answer."""
+        self.calls += 1
+        roll = self._rng.random()
+        if roll < self._error_rate:
+            raise RuntimeError(f"{self.name}: injected error")
+        roll -= self._error_rate
+        rows = fake_rows(user_message)
+        structured = self.structured and schema is not None
+        text = json.dumps({"items": rows} if structured else rows, ensure_ascii=False)
+        if roll < self._empty_rate:
+            text, structured = "", False
+        elif roll - self._empty_rate < self._malformed_rate:
+            text, structured = text[: len(text) // 8], False  # cut off inside the first watch
+        usage = Usage(
+            prompt_tokens=len(user_message) // _CHARS_PER_TOKEN + 250,
+            completion_tokens=len(text) // _CHARS_PER_TOKEN,
+        )
+        return Completion(text, usage, rows if structured else None)
+
+    def generate(self, system_prompt: str, user_message: str) -> str:
+        time.sleep(self._latency.sample())
+        return self._answer(user_message).text
+
+    def ping(self) -> bool:
+        return True
+
+    async def agenerate(self, system_prompt: str, user_message: str) -> str:
+        return (await self.acomplete(system_prompt, user_message)).text
+
+    async def acomplete(
+        self, system_prompt: str, user_message: str, schema: type[BaseModel] | None = None,
+    ) -> Completion:
+        await asyncio.sleep(self._latency.sample())
+        return self._answer(user_message, schema)
+
+    async def astream(
+        self,
+        system_prompt: str,
+        user_message: str,
+        usage: Usage | None = None,
+        schema: type[BaseModel] | None = None,
+    ) -> AsyncIterator[str]:
+        # The sampled latency is the time to first chunk; the rest trickles in
+        await asyncio.sleep(self._latency.sample())
+        completion = self._answer(user_message, schema)
+        for i in range(0, len(completion.text), 64):
+            yield completion.text[i:i + 64]
+            await asyncio.sleep(0)
+        if usage is not None:
+            usage.update(completion.usage)
+
+    async def aping(self) -> bool:
+        return True
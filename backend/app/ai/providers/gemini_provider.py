@@ -1,34 +1,131 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+from typing import AsyncIterator
 
 import google.generativeai as genai
+from pydantic import BaseModel
 
-from app.ai.base import AIProvider
+from app.ai.base import AIProvider, Completion, Usage
+from app.ai.schema import gemini_schema, items_schema, loads_items
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+def _usage(metadata) -> Usage:
+    if not metadata:
+        return Usage()
+    return Usage(
+        prompt_tokens=metadata.prompt_token_count,
+        completion_tokens=metadata.candidates_token_count,
+        # Gemini caches repeated prefixes implicitly; this reports the hits
+        cache_read_tokens=getattr(metadata, "cached_content_token_count", None) or None,
+    )
+
+
+# Distinct system prompts are few (the picks prompt plus variants), so this stays tiny
+_MAX_CACHED_MODELS = 16
+
+
 class GeminiProvider(AIProvider):
+    """
+    Gemini talks gRPC through google-generativeai, so there is no HTTP client
+    to pool; instead GenerativeModel objects are built once per system prompt
+    and reused, and every call carries the configured timeout.
+    """
+
     name = "gemini"
 
-    def __init__(self, api_key: str, model: str = "gemini-2.0-flash"):
+    def __init__(self, api_key: str, model: str = "gemini-2.0-flash", structured: bool = False):
         genai.configure(api_key=api_key)
-        self._model_name = model
+        self.model = model
+        self.structured = structured
+        self._models: dict[str | None, genai.GenerativeModel] = {}
+        self._requests = 0
+        self._model_builds = 0
+
+    def _get_model(self, system_prompt: str | None) -> genai.GenerativeModel:
+        model = self._models.get(system_prompt)
+        if model is None:
+            if len(self._models) >= _MAX_CACHED_MODELS:
+                self._models.pop(next(iter(self._models)))
+            model = genai.GenerativeModel(model_name=self.model, system_instruction=system_prompt)
+            self._models[system_prompt] = model
+            self._model_builds += 1
+        self._requests += 1
+        return model
+
+    @property
+    def _request_options(self) -> dict:
+        return {"timeout": settings.ai_read_timeout_s}
+
+    def _generation_options(self, schema: type[BaseModel] | None) -> dict:
+        if schema is None or not self.structured:
+            return {}
+        return {"generation_config": {
+            "response_mime_type": "application/json",
+            "response_schema": gemini_schema(items_schema(schema)),
+        }}
 
     def generate(self, system_prompt: str, user_message: str) -> str:
-        model = genai.GenerativeModel(
-            model_name=self._model_name,
-            system_instruction=system_prompt,
+        response = self._get_model(system_prompt).generate_content(
+            user_message, request_options=self._request_options,
         )
-        response = model.generate_content(user_message)
         return response.text or ""
 
     def ping(self) -> bool:
         try:
-            model = genai.GenerativeModel(model_name=self._model_name)
-            model.generate_content("hi")
+            genai.get_model(f"models/{self.model}")
+            return True
+        except Exception as exc:
+            logger.warning("Gemini ping failed: %s", exc)
+            return False
+
+    async def agenerate(self, system_prompt: str, user_message: str) -> str:
+        return (await self.acomplete(system_prompt, user_message)).text
+
+    async def acomplete(
+        self, system_prompt: str, user_message: str, schema: type[BaseModel] | None = None,
+    ) -> Completion:
+        options = self._generation_options(schema)
+        response = await self._get_model(system_prompt).generate_content_async(
+            user_message, request_options=self._request_options, **options,
+        )
+        text = response.text or ""
+        structured = loads_items(text) if options and text else None
+        return Completion(text, _usage(getattr(response, "usage_metadata", None)), structured)
+
+    async def astream(
+        self,
+        system_prompt: str,
+        user_message: str,
+        usage: Usage | None = None,
+        schema: type[BaseModel] | None = None,
+    ) -> AsyncIterator[str]:
+        response = await self._get_model(system_prompt).generate_content_async(
+            user_message, stream=True, request_options=self._request_options, **self._generation_options(schema),
+        )
+        async for chunk in response:
+            if chunk.parts:
+                yield chunk.text
+            metadata = getattr(chunk, "usage_metadata", None)
+            if metadata and usage is not None:
+                usage.update(_usage(metadata))
+
+    async def aping(self) -> bool:
+        try:
+            await asyncio.to_thread(genai.get_model, f"models/{self.model}")
             return True
         except Exception as exc:
             logger.warning("Gemini ping failed: %s", exc)
             return False
+
+    def transport_stats(self) -> dict | None:
+        return {
+            "transport": "grpc",
+            "requests": self._requests,
+            "cached_models": len(self._models),
+            "model_builds": self._model_builds,
+        }
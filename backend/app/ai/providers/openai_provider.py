@@ -1,35 +1,142 @@
 from __future__ import annotations
 
+import hashlib
 import logging
+from functools import lru_cache
+from typing import AsyncIterator
 
-from openai import OpenAI
+import openai
+from openai import AsyncOpenAI, OpenAI
+from pydantic import BaseModel
 
-from app.ai.base import AIProvider
+from app.ai.base import AIProvider, Completion, Usage
+from app.ai.schema import items_schema, loads_items
+from app.ai.transport import ConnectionStats, pooled_async_client, sdk_timeout
 
 logger = logging.getLogger(__name__)
 
 
+def _usage(usage) -> Usage:
+    if usage is None:
+        return Usage()
+    details = getattr(usage, "prompt_tokens_details", None)
+    return Usage(
+        prompt_tokens=usage.prompt_tokens,
+        completion_tokens=usage.completion_tokens,
+        cache_read_tokens=details.cached_tokens if details else None,
+    )
+
+
+@lru_cache(maxsize=32)
+def _prompt_cache_key(system_prompt: str) -> str:
+    """Routing hint so requests sharing the system prompt land on the same prefix cache."""
+    return hashlib.sha256(system_prompt.encode()).hexdigest()[:32]
+
+
+def _response_format(schema: type[BaseModel]) -> dict:
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": f"{schema.__name__}_items", "schema": items_schema(schema), "strict": True},
+    }
+
+
 class OpenAIProvider(AIProvider):
     name = "openai"
 
-    def __init__(self, api_key: str, model: str = "gpt-4o-mini"):
-        self._client = OpenAI(api_key=api_key)
-        self._model = model
+    def __init__(
+        self, api_key: str, model: str = "gpt-4o-mini", structured: bool = False, prompt_cache: bool = False,
+    ):
+        self._stats = ConnectionStats()
+        self._client = OpenAI(api_key=api_key, timeout=sdk_timeout(openai))
+        self._async_client = AsyncOpenAI(api_key=api_key, http_client=pooled_async_client(openai, self._stats))
+        self.model = model
+        self.structured = structured
+        self.prompt_cache = prompt_cache
+
+    def _options(self, system_prompt: str, schema: type[BaseModel] | None = None) -> dict:
+        """
+        Extra request options. OpenAI caches prompt prefixes automatically; the
+        system message (and response schema) always come first and are
+        byte-identical, and prompt_cache_key keeps them on the same cache.
+        """
+        options = {}
+        if self.prompt_cache:
+            options["prompt_cache_key"] = _prompt_cache_key(system_prompt)
+        if schema is not None and self.structured:
+            options["response_format"] = _response_format(schema)
+        return options
 
     def generate(self, system_prompt: str, user_message: str) -> str:
         completion = self._client.chat.completions.create(
-            model=self._model,
+            model=self.model,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_message},
             ],
+            **self._options(system_prompt),
         )
         return completion.choices[0].message.content or ""
 
     def ping(self) -> bool:
         try:
-            self._client.models.retrieve(self._model)
+            self._client.models.retrieve(self.model)
+            return True
+        except Exception as exc:
+            logger.warning("OpenAI ping failed: %s", exc)
+            return False
+
+    async def agenerate(self, system_prompt: str, user_message: str) -> str:
+        return (await self.acomplete(system_prompt, user_message)).text
+
+    async def acomplete(
+        self, system_prompt: str, user_message: str, schema: type[BaseModel] | None = None,
+    ) -> Completion:
+        options = self._options(system_prompt, schema)
+        completion = await self._async_client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message},
+            ],
+            **options,
+        )
+        text = completion.choices[0].message.content or ""
+        structured = loads_items(text) if "response_format" in options and text else None
+        return Completion(text, _usage(completion.usage), structured)
+
+    async def astream(
+        self,
+        system_prompt: str,
+        user_message: str,
+        usage: Usage | None = None,
+        schema: type[BaseModel] | None = None,
+    ) -> AsyncIterator[str]:
+        stream = await self._async_client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message},
+            ],
+            stream=True,
+            stream_options={"include_usage": True},
+            **self._options(system_prompt, schema),
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            if chunk.usage and usage is not None:
+                usage.update(_usage(chunk.usage))
+
+    async def aping(self) -> bool:
+        try:
+            await self._async_client.models.retrieve(self.model)
             return True
         except Exception as exc:
             logger.warning("OpenAI ping failed: %s", exc)
             return False
+
+    def transport_stats(self) -> dict | None:
+        return self._stats.stats()
+
+    async def aclose(self) -> None:
+        await self._async_client.close()
@@ -0,0 +1,103 @@
+"""Per-provider request/token buckets for bulk AI workloads."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from app.ai.stats import RollingWindow
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at `per_minute` / 60 per second,
+    holding at most one minute's worth. Waiters are served in FIFO order.
+    The balance may go negative after adjust(), which delays later takers.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self._rate = per_minute / 60
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    async def take(self, amount: float = 1) -> float:
+        """Wait until `amount` is available and take it. Returns seconds waited."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self._rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+    def adjust(self, delta: float) -> None:
+        """Take `delta` more (or give back, if negative) without waiting."""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - delta)
+
+
+class ProviderRateLimit:
+    """
+    Requests-per-minute and tokens-per-minute limits for one provider (0 = no
+    limit). Token cost isn't known before a call, so acquire() reserves the
+    recent mean tokens per call (or `default_tokens`) and settle() corrects
+    the bucket with the actual usage afterwards.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, default_tokens: int = 1500) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = TokenBucket(rpm) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._default_tokens = default_tokens
+        self._observed = RollingWindow(size=50)
+        self.acquired = 0
+        self.throttled = 0  # acquisitions that had to wait
+        self.wait_s = 0.0
+
+    def _estimate(self) -> int:
+        mean = self._observed.mean()
+        return round(mean) if mean is not None else self._default_tokens
+
+    async def acquire(self) -> int:
+        """Wait for a request slot and token budget. Returns the tokens reserved."""
+        reserved = self._estimate() if self._tokens is not None else 0
+        waited = 0.0
+        if self._requests is not None:
+            waited += await self._requests.take(1)
+        if self._tokens is not None:
+            waited += await self._tokens.take(reserved)
+        self.acquired += 1
+        if waited > 0:
+            self.throttled += 1
+            self.wait_s += waited
+        return reserved
+
+    def settle(self, reserved: int, actual: int | None) -> None:
+        """Correct the token bucket once the call's real usage is known."""
+        if actual is None:
+            return
+        self._observed.record(actual)
+        if self._tokens is not None:
+            self._tokens.adjust(actual - reserved)
+
+    def stats(self) -> dict:
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "wait_s": round(self.wait_s, 1),
+            "tokens_per_call_estimate": self._estimate(),
+        }
@@ -0,0 +1,67 @@
+"""JSON schemas for structured-output generation, derived from Pydantic models."""
+
+from __future__ import annotations
+
+import json
+from functools import lru_cache
+from typing import Any
+
+from pydantic import BaseModel
+
+# Structured answers are wrapped in {"items": [...]}: OpenAI's json_schema mode
+# and Anthropic tool inputs both require an object at the top level.
+ITEMS_KEY = "items"
+
+# Keywords the Gemini response_schema (an OpenAPI subset) accepts
+_GEMINI_KEYS = {"type", "format", "description", "nullable", "enum", "properties", "required", "items"}
+
+
+def _strict(schema: dict[str, Any]) -> dict[str, Any]:
+    """Drop titles/defaults, forbid extra keys and require every property (OpenAI strict mode rules)."""
+    schema = {k: v for k, v in schema.items() if k not in ("title", "default")}
+    if "properties" in schema:
+        schema["properties"] = {k: _strict(v) for k, v in schema["properties"].items()}
+        schema["required"] = list(schema["properties"])
+        schema["additionalProperties"] = False
+    if "items" in schema:
+        schema["items"] = _strict(schema["items"])
+    return schema
+
+
+@lru_cache(maxsize=None)
+def _items_schema_json(model: type[BaseModel]) -> str:
+    envelope = {
+        "type": "object",
+        "properties": {ITEMS_KEY: {"type": "array", "items": model.model_json_schema()}},
+    }
+    return json.dumps(_strict(envelope))
+
+
+def items_schema(model: type[BaseModel]) -> dict[str, Any]:
+    """Schema of {"items": [<model>, ...]} in the strict JSON-schema dialect."""
+    return json.loads(_items_schema_json(model))
+
+
+def gemini_schema(schema: dict[str, Any]) -> dict[str, Any]:
+    """Reduce a JSON schema to the keywords Gemini's response_schema understands."""
+    reduced = {k: v for k, v in schema.items() if k in _GEMINI_KEYS}
+    if "properties" in reduced:
+        reduced["properties"] = {k: gemini_schema(v) for k, v in reduced["properties"].items()}
+    if "items" in reduced:
+        reduced["items"] = gemini_schema(reduced["items"])
+    return reduced
+
+
+def extract_items(payload: Any) -> list | None:
+    """The item list from a decoded structured answer, or None if it doesn't have one."""
+    if isinstance(payload, dict) and isinstance(payload.get(ITEMS_KEY), list):
+        return payload[ITEMS_KEY]
+    return None
+
+
+def loads_items(text: str) -> list | None:
+    """Decode a structured JSON answer; None if it isn't valid JSON of the expected shape."""
+    try:
+        return extract_items(json.loads(text))
+    except ValueError:
+        return None
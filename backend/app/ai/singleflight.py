@@ -0,0 +1,72 @@
+"""Single-flight: collapse concurrent identical async calls into one execution."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    The first caller for a key starts `fn()` as a task; callers arriving while
+    it runs await the same task and receive the same result or exception.
+    Each caller is shielded from the others' cancellation: the shared task is
+    only cancelled once every caller waiting on it has gone away.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[Hashable, _Flight] = {}
+        self.leaders = 0  # calls that started an upstream execution
+        self.collapsed = 0  # calls that joined one already in flight
+        self.failures = 0
+        self.cancelled = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task, k=key, f=flight: self._finish(k, f, task))
+            self.leaders += 1
+        else:
+            self.collapsed += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Forget the key now: a new caller must start afresh, not join a dying task
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    def _finish(self, key: Hashable, flight: _Flight, task: asyncio.Future) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if task.cancelled():
+            self.cancelled += 1
+        elif task.exception() is not None:
+            self.failures += 1
+
+    def stats(self) -> dict:
+        calls = self.leaders + self.collapsed
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "collapsed": self.collapsed,
+            "collapse_rate": round(self.collapsed / calls, 4) if calls else 0.0,
+            "failures": self.failures,
+            "cancelled": self.cancelled,
+        }
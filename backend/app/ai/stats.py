@@ -0,0 +1,37 @@
+"""Small rolling-window statistics used by the AI layer (latency percentiles etc.)."""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import deque
+
+
+class RollingWindow:
+    """Fixed-size window of float samples with percentile queries."""
+
+    def __init__(self, size: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, value: float) -> None:
+        with self._lock:
+            self._samples.append(value)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> float | None:
+        """Nearest-rank percentile (0–100). None if the window is empty."""
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        rank = max(1, math.ceil(pct / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+    def mean(self) -> float | None:
+        with self._lock:
+            if not self._samples:
+                return None
+            return sum(self._samples) / len(self._samples)
@@ -0,0 +1,68 @@
+"""
+Pooled HTTP transport for the SDK-based AI providers.
+
+Each provider gets one long-lived async HTTP client (built from its SDK's
+DefaultAsyncHttpxClient, so it matches whatever httpx flavour the SDK uses)
+with explicit timeouts, pool limits and keep-alive. A trace hook counts
+requests vs. new TCP/TLS connections so connection reuse is observable.
+"""
+
+from __future__ import annotations
+
+import logging
+from types import ModuleType
+from typing import Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionStats:
+    """Counts requests and connection setups seen by one HTTP client."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+
+    async def on_request(self, request: Any) -> None:
+        self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.new_connections += 1
+        elif event == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    def stats(self) -> dict:
+        reused = max(0, self.requests - self.new_connections)
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "tls_handshakes": self.tls_handshakes,
+            "reused_connections": reused,
+            "reuse_rate": round(reused / self.requests, 4) if self.requests else 0.0,
+        }
+
+
+def sdk_timeout(sdk: ModuleType) -> Any:
+    """Connect/read timeouts from Settings as the SDK's Timeout type."""
+    return sdk.Timeout(settings.ai_read_timeout_s, connect=settings.ai_connect_timeout_s)
+
+
+def pooled_async_client(sdk: ModuleType, stats: ConnectionStats) -> Any:
+    """Build a pooled async HTTP client for an SDK module (openai / anthropic)."""
+    limits = type(sdk.DEFAULT_CONNECTION_LIMITS)(
+        max_connections=settings.ai_pool_max_connections,
+        max_keepalive_connections=settings.ai_pool_max_keepalive,
+        keepalive_expiry=settings.ai_keepalive_expiry_s,
+    )
+    kwargs = dict(limits=limits, timeout=sdk_timeout(sdk), event_hooks={"request": [stats.on_request]})
+    if settings.ai_http2:
+        try:
+            return sdk.DefaultAsyncHttpxClient(http2=True, **kwargs)
+        except ImportError:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed — using HTTP/1.1")
+    return sdk.DefaultAsyncHttpxClient(**kwargs)
@@ -0,0 +1,130 @@
+"""Per-provider token and latency accounting for AI calls."""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter, defaultdict
+
+from app.ai.base import Usage
+from app.ai.stats import RollingWindow
+
+# Outcomes a provider call can end with
+SUCCESS = "success"
+ERROR = "error"
+EMPTY = "empty"
+INVALID = "invalid"  # answered, but the caller's validator rejected it
+CANCELLED = "cancelled"  # lost a hedge race or the caller went away
+TIMEOUT = "timeout"  # ran out of its share of the request deadline
+
+
+def _ms(seconds: float | None) -> int | None:
+    return round(seconds * 1000) if seconds is not None else None
+
+
+class _ProviderUsage:
+    def __init__(self) -> None:
+        self.model = ""
+        self.structured = False
+        self.outcomes: Counter[str] = Counter()
+        self.positions: Counter[int] = Counter()  # fallback position of successful calls
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+        self.latency = RollingWindow()
+        # Success latency split by whether the prompt prefix was served from cache
+        self.latency_cache_hit = RollingWindow()
+        self.latency_cache_miss = RollingWindow()
+        self.ttft = RollingWindow()
+        self.tokens = RollingWindow()
+
+
+class UsageAggregator:
+    """
+    In-process aggregate of every provider call: outcome counts, fallback
+    position of the winning call, token totals and rolling latency /
+    time-to-first-token / tokens-per-call percentiles.
+    """
+
+    def __init__(self) -> None:
+        self._providers: defaultdict[str, _ProviderUsage] = defaultdict(_ProviderUsage)
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        outcome: str,
+        position: int,
+        latency_s: float,
+        ttft_s: float | None = None,
+        usage: Usage | None = None,
+        structured: bool = False,
+    ) -> None:
+        """
+        Record one call. `position` is the 1-based place the provider held in
+        the fallback order; `ttft_s` defaults to the full latency for
+        non-streaming calls; `structured` is the provider's output mode.
+        """
+        with self._lock:
+            entry = self._providers[provider]
+            entry.model = model
+            entry.structured = structured
+            entry.outcomes[outcome] += 1
+            if outcome == SUCCESS:
+                entry.positions[position] += 1
+            if usage is not None:
+                entry.prompt_tokens += usage.prompt_tokens or 0
+                entry.completion_tokens += usage.completion_tokens or 0
+                entry.cache_read_tokens += usage.cache_read_tokens or 0
+                entry.cache_write_tokens += usage.cache_write_tokens or 0
+        if outcome == CANCELLED:
+            return
+        entry.latency.record(latency_s)
+        if outcome == SUCCESS:
+            entry.ttft.record(ttft_s if ttft_s is not None else latency_s)
+            if usage is not None and usage.total_tokens is not None:
+                entry.tokens.record(usage.total_tokens)
+                window = entry.latency_cache_hit if usage.cache_read_tokens else entry.latency_cache_miss
+                window.record(latency_s)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._providers.clear()
+
+    def stats(self) -> list[dict]:
+        """One summary dict per provider that has been called."""
+        with self._lock:
+            items = list(self._providers.items())
+        result = []
+        for name, entry in items:
+            calls = sum(entry.outcomes.values())
+            successes = entry.outcomes[SUCCESS]
+            answered = successes + entry.outcomes[INVALID]
+            result.append({
+                "name": name,
+                "model": entry.model,
+                "output_mode": "structured" if entry.structured else "text",
+                "calls": calls,
+                "outcomes": dict(entry.outcomes),
+                "success_rate": round(successes / calls, 3) if calls else None,
+                "parse_failure_rate": round(entry.outcomes[INVALID] / answered, 3) if answered else None,
+                "fallback_positions": {str(k): v for k, v in sorted(entry.positions.items())},
+                "prompt_tokens": entry.prompt_tokens,
+                "completion_tokens": entry.completion_tokens,
+                "cache_read_tokens": entry.cache_read_tokens,
+                "cache_write_tokens": entry.cache_write_tokens,
+                "cache_read_ratio": (
+                    round(entry.cache_read_tokens / entry.prompt_tokens, 3) if entry.prompt_tokens else None
+                ),
+                "tokens_per_call_p50": entry.tokens.percentile(50),
+                "tokens_per_call_p95": entry.tokens.percentile(95),
+                "latency_p50_ms": _ms(entry.latency.percentile(50)),
+                "latency_p95_ms": _ms(entry.latency.percentile(95)),
+                "latency_p99_ms": _ms(entry.latency.percentile(99)),
+                "ttft_p50_ms": _ms(entry.ttft.percentile(50)),
+                "ttft_p95_ms": _ms(entry.ttft.percentile(95)),
+                "latency_p50_ms_cache_hit": _ms(entry.latency_cache_hit.percentile(50)),
+                "latency_p50_ms_cache_miss": _ms(entry.latency_cache_miss.percentile(50)),
+            })
+        return result
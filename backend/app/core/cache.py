@@ -0,0 +1,103 @@
+"""In-process LRU cache with TTL, entry-count and byte-size bounds."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+def _sizeof(value: Any) -> int:
+    """Approximate size of a JSON-serialisable value in bytes."""
+    try:
+        return len(json.dumps(value, default=str).encode())
+    except (TypeError, ValueError):
+        return len(repr(value).encode())
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache. Entries expire after `ttl_seconds`; the least
+    recently used entries are evicted once either `max_entries` or
+    `max_bytes` would be exceeded. Keeps hit/miss/eviction counters.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 16 * 1024 * 1024, ttl_seconds: float = 3600) -> None:
+        self._data: OrderedDict[Hashable, tuple[float, int, Any]] = OrderedDict()
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._ttl = ttl_seconds
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, record: bool = True) -> Any | None:
+        """The live value for `key`. `record=False` peeks: no hit/miss counts, no LRU refresh."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += record
+                return None
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += record
+                return None
+            if record:
+                self._data.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: float | None = None) -> None:
+        size = _sizeof(value)
+        if size > self._max_bytes:
+            return
+        expires_at = time.monotonic() + (self._ttl if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._data and (len(self._data) > self._max_entries or self._bytes > self._max_bytes):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self._max_entries,
+                "max_bytes": self._max_bytes,
+                "ttl_seconds": self._ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
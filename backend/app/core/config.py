@@ -30,10 +30,131 @@ class Settings(BaseSettings):
     # AI Providers (fallback order: OpenAI → Anthropic → Gemini)
     openai_api_key: str = ""
     openai_model: str = "gpt-4o-mini"
+    openai_structured_output: bool = False  # json_schema response format
+    openai_prompt_cache: bool = True  # prompt_cache_key for the automatic prefix cache
     anthropic_api_key: str = ""
     anthropic_model: str = "claude-3-5-haiku-latest"
+    anthropic_structured_output: bool = False  # forced tool call with an input schema
+    anthropic_prompt_cache: bool = True  # cache_control breakpoint after the system prompt
     gemini_api_key: str = ""
     gemini_model: str = "gemini-2.0-flash"
+    gemini_structured_output: bool = False  # response_schema + application/json
+
+    # Fake AI providers for load tests / benchmarks — when set, they replace the real ones
+    fake_providers: str = ""  # comma-separated names, e.g. "fake-a,fake-b" (fallback order)
+    fake_latency: str = "lognormal"  # fixed | lognormal | histogram
+    fake_latency_ms: float = 800  # fixed value, or the lognormal median
+    fake_latency_sigma: float = 0.5  # lognormal shape
+    fake_latency_histogram: str = ""  # replayed buckets "ms:weight,...", e.g. "300:20,800:60,4000:20"
+    fake_error_rate: float = 0.0
+    fake_empty_rate: float = 0.0
+    fake_malformed_rate: float = 0.0
+    fake_seed: int = 0
+
+    # AI transport — one pooled HTTP client per provider
+    ai_connect_timeout_s: float = 5.0
+    ai_read_timeout_s: float = 30.0
+    ai_pool_max_connections: int = 100
+    ai_pool_max_keepalive: int = 20
+    ai_keepalive_expiry_s: float = 60.0
+    ai_http2: bool = False  # requires the 'h2' package
+
+    # AI hedging — if the provider in flight is slow, race the next one
+    ai_hedge_enabled: bool = False
+    ai_hedge_delay_ms: int = 3000  # fixed delay, used until a provider has enough samples for a p95
+    ai_hedge_use_p95: bool = True  # hedge after the provider's rolling p95 latency instead
+    ai_hedge_max_fanout: int = 2  # max providers in flight for one request
+
+    # AI circuit breakers — skip providers with a high rolling error/slow-call rate
+    ai_breaker_window: int = 20  # recent calls considered per provider
+    ai_breaker_min_calls: int = 5  # don't trip before this many calls are recorded
+    ai_breaker_error_threshold: float = 0.5  # bad-call ratio that opens the breaker
+    ai_breaker_slow_call_ms: int = 15000  # successful calls slower than this count as bad
+    ai_breaker_open_seconds: int = 30  # how long an open provider is skipped before a probe
+
+    # AI adaptive concurrency — per-provider AIMD limit on in-flight calls: grows while answers
+    # come back at the provider's usual latency, shrinks on 429 / 5xx / timeouts (x backoff)
+    # and on slow answers (-1). A call waits briefly for a slot, then moves on to the next provider
+    ai_concurrency_enabled: bool = True
+    ai_concurrency_initial: int = 20
+    ai_concurrency_min: int = 2
+    ai_concurrency_max: int = 200
+    ai_concurrency_backoff: float = 0.5  # multiplicative decrease on overload
+    ai_concurrency_latency_tolerance: float = 2.0  # recent mean latency above this x the long-run median = congestion
+    ai_concurrency_wait_ms: int = 250  # max wait for a slot before trying the next provider
+
+    # AI deadlines — end-to-end budget per route, split across the fallback chain
+    ai_deadline_generate_s: float = 25.0  # POST /picks/generate
+    ai_deadline_stream_s: float = 15.0  # POST /picks/generate/stream, until the first chunk arrives
+    ai_provider_cap_s: float = 12.0  # most of the budget a single provider attempt may use
+    ai_min_attempt_s: float = 1.0  # skip providers when less than this (or their p50) is left
+
+    # Model cascade — cheaper "provider:model" tiers tried in order before the fallback chain
+    # above; an answer that fails the pick sanity checks escalates to the next tier
+    ai_cascade_enabled: bool = False
+    ai_cascade_tiers: str = ""  # e.g. "openai:gpt-4.1-nano,gemini:gemini-2.0-flash-lite"
+
+    # Coalesce concurrent identical generations into one upstream call
+    ai_coalesce_enabled: bool = True
+
+    # Pick cache — exact-match results for identical quiz answers
+    pick_cache_enabled: bool = True
+    pick_cache_ttl_seconds: int = 6 * 3600
+    pick_cache_max_entries: int = 5000
+    pick_cache_max_mb: int = 32
+
+    # Approximate pick cache — answers within a weighted distance of earlier ones reuse their picks
+    near_cache_enabled: bool = False  # changes user-visible answers: enable once the weights are tuned
+    near_cache_max_distance: float = 1.0  # sum of the weights of the fields that differ
+    near_cache_weights: str = (
+        "budget:10,occasion:3,style:3,movementType:1.5,wristSize:1.5,gender:1,brandOpenness:1"
+    )
+    near_cache_max_entries: int = 20_000
+    near_cache_ttl_hours: int = 7 * 24
+    near_cache_warm_limit: int = 5000  # recent picks loaded from the picks table at start-up (0 = none)
+
+    # Precomputed pick catalog (built by `python -m app.jobs.precompute_picks`)
+    pick_catalog_enabled: bool = True
+    pick_catalog_path: str = "data/pick_catalog.sqlite3"  # relative to backend/
+
+    # Local watch catalog (built by `python -m app.jobs.build_watch_catalog`): when present,
+    # prompts carry a shortlist of real watches and the model only chooses and explains
+    watch_catalog_enabled: bool = True
+    watch_catalog_path: str = "data/watch_catalog"  # relative to backend/
+    watch_catalog_shortlist: int = 12
+
+    # Speculative pre-generation (POST /picks/speculate): likely completions of a
+    # half-answered quiz are generated early; /picks/generate then claims them
+    speculation_enabled: bool = True
+    speculation_completions: int = 3  # most likely completions started per call
+    speculation_min_probability: float = 0.05  # ... skipping completions less likely than this
+    speculation_max_inflight: int = 16  # global cap on concurrent speculative generations
+    speculation_budget_per_hour: int = 300  # global cap on speculative generations started per hour
+    speculation_ttl_s: int = 300  # unclaimed results are dropped after this
+    speculation_history: int = 5000  # recent picks the answer frequencies come from
+    speculation_refresh_s: int = 3600  # how often those frequencies are reloaded
+
+    # Idempotency-Key on POST /picks/generate — per-user keys, replayed until they expire
+    idempotency_ttl_s: int = 24 * 3600
+    idempotency_max_entries: int = 10_000
+
+    # Bulk AI jobs (`python -m app.jobs.batch_generate`) — per-provider limits, 0 = unlimited
+    ai_batch_concurrency: int = 8
+    openai_rpm: int = 500
+    openai_tpm: int = 200_000
+    anthropic_rpm: int = 50
+    anthropic_tpm: int = 50_000
+    gemini_rpm: int = 1000
+    gemini_tpm: int = 1_000_000
+    ai_batch_default_rpm: int = 60  # any other provider (fake providers, new vendors)
+    ai_batch_default_tpm: int = 100_000
+
+    # Async pick jobs (POST /picks/jobs) — in-process workers over a local SQLite queue
+    pick_jobs_workers: int = 4
+    pick_jobs_max_queued: int = 1000  # 503 beyond this many waiting jobs
+    pick_jobs_deadline_s: float = 60.0  # no client is waiting on the socket, so allow more than /generate
+    pick_jobs_retention_hours: int = 24  # finished jobs older than this are pruned on start-up
+    pick_jobs_path: str = "data/pick_jobs.sqlite3"  # relative to backend/
 
     # Email (Resend)
     resend_api_key: str = ""
@@ -47,6 +168,12 @@ class Settings(BaseSettings):
     max_request_body_mb: int = 2
     rate_limit_default: str = "60/minute"
     rate_limit_ai: str = "5/minute"
+    rate_limit_speculate: str = "30/minute"
+
+    # Background health monitor (GET /health serves its cached snapshot)
+    health_probe_interval_s: int = 30
+    health_ai_probe_interval_s: int = 120
+    health_probe_timeout_s: float = 5.0
 
     @property
     def allowed_origins(self) -> list[str]:
@@ -0,0 +1,98 @@
+"""Background dependency health monitor with a cached status snapshot."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# A check returns a status dict, e.g. {"status": "connected"} or {"status": "error", "detail": "..."}
+Check = Callable[[], Awaitable[dict]]
+
+
+@dataclass
+class _Probe:
+    name: str
+    check: Check
+    interval_s: float
+    timeout_s: float
+    result: dict = field(default_factory=lambda: {"status": "unknown"})
+    latency_ms: float | None = None
+    last_checked: str | None = None
+    last_success: str | None = None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class HealthMonitor:
+    """
+    Runs every registered check on its own interval in a background task, each
+    bounded by a timeout, and keeps the latest result. snapshot() only reads
+    that state, so health endpoints never wait on a dependency.
+    """
+
+    def __init__(self) -> None:
+        self._probes: dict[str, _Probe] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def register(self, name: str, check: Check, interval_s: float, timeout_s: float) -> None:
+        self._probes[name] = _Probe(name, check, interval_s, timeout_s)
+
+    @property
+    def running(self) -> bool:
+        return any(not t.done() for t in self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._tasks = [asyncio.create_task(self._loop(p), name=f"health:{p.name}") for p in self._probes.values()]
+        logger.info("Health monitor started (%d probes)", len(self._tasks))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run_once(self) -> None:
+        """Probe everything once, in parallel."""
+        await asyncio.gather(*(self._probe(p) for p in self._probes.values()))
+
+    async def _loop(self, probe: _Probe) -> None:
+        while True:
+            await self._probe(probe)
+            await asyncio.sleep(probe.interval_s)
+
+    async def _probe(self, probe: _Probe) -> None:
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(probe.check(), timeout=probe.timeout_s)
+        except asyncio.TimeoutError:
+            result = {"status": "error", "detail": f"timed out after {probe.timeout_s:g}s"}
+        except Exception as exc:
+            result = {"status": "error", "detail": str(exc)}
+        probe.latency_ms = round((time.perf_counter() - start) * 1000, 1)
+        probe.last_checked = _now()
+        if result.get("status") == "connected":
+            probe.last_success = probe.last_checked
+        elif result.get("status") == "error":
+            logger.warning("Health probe %s failed: %s", probe.name, result.get("detail"))
+        probe.result = result
+
+    def snapshot(self, name: str) -> dict:
+        probe = self._probes.get(name)
+        if probe is None:
+            return {"status": "unknown"}
+        return {
+            **probe.result,
+            "latency_ms": probe.latency_ms,
+            "last_checked": probe.last_checked,
+            "last_success": probe.last_success,
+        }
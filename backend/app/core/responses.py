@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 from typing import Any
 
 from pydantic import BaseModel
@@ -20,3 +21,8 @@ def ok(data: Any = None) -> dict:
 def fail(error: str) -> dict:
     """Return an error response."""
     return {"success": False, "data": None, "error": error}
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -0,0 +1,217 @@
+"""
+Offline job: run a JSONL file of PickRequests through the AI factory.
+
+    python -m app.jobs.batch_generate inputs.jsonl results.jsonl
+    python -m app.jobs.batch_generate inputs.jsonl results.jsonl --concurrency 16 --catalog
+
+Each input line is a PickRequest object, optionally with an "id" field (the
+canonical quiz answers are used otherwise). Every result line is appended and
+flushed as soon as its generation finishes, so after a crash the same command
+skips the ids that already succeeded and carries on. Partial answers are
+repaired like on the request path; one still short of a full set of picks
+is written as an error, so a rerun retries it. Calls are throttled per
+provider by the requests/tokens-per-minute limits in Settings (*_RPM / *_TPM,
+AI_BATCH_DEFAULT_* for providers without their own).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Iterator
+
+from pydantic import ValidationError
+
+from app.ai import ai_factory
+from app.ai.factory import AIClientFactory
+from app.ai.ratelimit import ProviderRateLimit
+from app.core.config import settings
+from app.core.logging_config import setup_logging
+from app.schemas.picks import PickRequest
+from app.services.ai_service import agenerate_complete_picks, prompt_fingerprint
+from app.services.pick_catalog import catalog_key, pick_catalog
+
+logger = logging.getLogger("watchpick.jobs.batch")
+
+PROGRESS_EVERY = 50
+
+
+def provider_limits(factory: AIClientFactory) -> dict[str, ProviderRateLimit]:
+    """
+    RPM/TPM limits for every provider and cascade tier of `factory`. Names are
+    matched by vendor, so "openai/gpt-4.1-nano" shares the "openai" limit (one
+    account quota); any other provider gets its own default-sized limit.
+    """
+    configured = {
+        "openai": (settings.openai_rpm, settings.openai_tpm),
+        "anthropic": (settings.anthropic_rpm, settings.anthropic_tpm),
+        "gemini": (settings.gemini_rpm, settings.gemini_tpm),
+    }
+    default = (settings.ai_batch_default_rpm, settings.ai_batch_default_tpm)
+    shared: dict[str, ProviderRateLimit] = {}
+    limits: dict[str, ProviderRateLimit] = {}
+    for provider in [*factory.providers, *factory.tiers]:
+        vendor = provider.name.split("/", 1)[0]
+        quota = vendor if vendor in configured else provider.name
+        if quota not in shared:
+            shared[quota] = ProviderRateLimit(*configured.get(quota, default))
+        limits[provider.name] = shared[quota]
+    return limits
+
+
+def read_inputs(path: Path) -> Iterator[tuple[str, PickRequest]]:
+    """(id, PickRequest) per input line; blank and invalid lines are logged and skipped."""
+    with path.open(encoding="utf-8") as fh:
+        for lineno, line in enumerate(fh, start=1):
+            if not line.strip():
+                continue
+            try:
+                raw = json.loads(line)
+                body = PickRequest.model_validate(raw)
+            except (ValueError, ValidationError) as exc:
+                logger.warning("Skipping input line %d: %s", lineno, exc)
+                continue
+            yield str(raw.get("id") or catalog_key(body)), body
+
+
+def completed_ids(path: Path) -> set[str]:
+    """Ids already written with status "ok" (a torn last line from a crash is ignored)."""
+    done: set[str] = set()
+    if not path.exists():
+        return done
+    with path.open(encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def _ends_mid_line(path: Path) -> bool:
+    if not path.exists() or path.stat().st_size == 0:
+        return False
+    with path.open("rb") as fh:
+        fh.seek(-1, 2)
+        return fh.read(1) != b"\n"
+
+
+async def run_batch(
+    inputs: Path,
+    output: Path,
+    factory: AIClientFactory = ai_factory,
+    concurrency: int = 8,
+    store_in_catalog: bool = False,
+) -> dict:
+    """Generate picks for every input id not yet in `output`; returns throughput counters."""
+    skip = completed_ids(output)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    counts: Counter[str] = Counter()
+    providers: Counter[str] = Counter()
+    fingerprint = prompt_fingerprint()
+    start = time.perf_counter()
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    torn = _ends_mid_line(output)
+    out = output.open("a", encoding="utf-8")
+    if torn:
+        out.write("\n")  # terminate the line a crash left half-written
+
+    def write(record: dict) -> None:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+    def progress() -> None:
+        elapsed = time.perf_counter() - start
+        logger.info(
+            "%d done (%d ok, %d failed) — %.1f picks/min, %.0f tokens/min",
+            counts["ok"] + counts["failed"], counts["ok"], counts["failed"],
+            counts["ok"] / elapsed * 60, counts["tokens"] / elapsed * 60,
+        )
+
+    async def worker() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            item_id, body = item
+            call_start = time.perf_counter()
+            record = {"id": item_id, "inputs": body.model_dump()}
+            try:
+                generation = await agenerate_complete_picks(body, factory)
+                if store_in_catalog:
+                    pick_catalog.put(body, generation.parsed, generation.provider, fingerprint)
+            except Exception as exc:
+                counts["failed"] += 1
+                record.update(status="error", error=str(getattr(exc, "detail", exc)))
+            else:
+                counts["ok"] += 1
+                counts["tokens"] += generation.tokens_used or 0
+                providers[generation.provider] += 1
+                record.update(
+                    status="ok",
+                    watches=generation.parsed,
+                    provider=generation.provider,
+                    tokens_used=generation.tokens_used,
+                )
+            record["latency_ms"] = round((time.perf_counter() - call_start) * 1000)
+            try:
+                write(record)
+            except Exception:
+                # Keep the worker alive: the producer would block on a full queue otherwise
+                logger.exception("Could not write the result for %s", item_id)
+            if (counts["ok"] + counts["failed"]) % PROGRESS_EVERY == 0:
+                progress()
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        for item_id, body in read_inputs(inputs):
+            if item_id in skip:
+                counts["skipped"] += 1
+                continue
+            skip.add(item_id)  # duplicate ids within the file run once
+            await queue.put((item_id, body))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        out.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        **{k: counts[k] for k in ("ok", "failed", "skipped", "tokens")},
+        "elapsed_s": round(elapsed, 1),
+        "picks_per_min": round(counts["ok"] / elapsed * 60, 1) if elapsed else None,
+        "tokens_per_min": round(counts["tokens"] / elapsed * 60) if elapsed else None,
+        "providers": dict(providers),
+        "rate_limits": factory.rate_limit_stats(),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate picks for a JSONL file of quiz answers.")
+    parser.add_argument("inputs", type=Path, help="JSONL file, one PickRequest per line (optional \"id\")")
+    parser.add_argument("output", type=Path, help="JSONL results file (appended; existing ok ids are skipped)")
+    parser.add_argument("--concurrency", type=int, default=settings.ai_batch_concurrency)
+    parser.add_argument("--catalog", action="store_true", help="also store results in the pick catalog")
+    args = parser.parse_args(argv)
+
+    setup_logging(debug=False)
+    ai_factory.set_rate_limits(provider_limits(ai_factory))
+    counts = asyncio.run(run_batch(
+        args.inputs, args.output, concurrency=args.concurrency, store_in_catalog=args.catalog,
+    ))
+    logger.info("Batch finished: %s", counts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Offline job: build the watch catalog used for shortlist-grounded prompts.
+
+    python -m app.jobs.build_watch_catalog                       # catalog/watches.json → WATCH_CATALOG_PATH
+    python -m app.jobs.build_watch_catalog my_watches.json --out data/watch_catalog
+
+The source is a JSON array of watch records (id, brand, model, price_min,
+price_max in USD, case_mm, movement, styles, tier, gender). The build writes
+the records, their NumPy feature matrix and a manifest with the content
+version; reload a running server with POST /api/v1/admin/ai/watch-catalog/reload.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.logging_config import setup_logging
+from app.services.watch_catalog import build
+
+logger = logging.getLogger("watchpick.jobs.watch_catalog")
+
+_BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+DEFAULT_SOURCE = _BACKEND_DIR / "catalog" / "watches.json"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the watch catalog from a JSON array of watch records.")
+    parser.add_argument("source", type=Path, nargs="?", default=DEFAULT_SOURCE)
+    parser.add_argument("--out", type=Path, default=Path(settings.watch_catalog_path))
+    args = parser.parse_args(argv)
+
+    setup_logging(debug=False)
+    out = args.out if args.out.is_absolute() else _BACKEND_DIR / args.out
+    records = json.loads(args.source.read_text(encoding="utf-8"))
+    manifest = build(records, out)
+    logger.info("Watch catalog built: %d watches, version %s → %s", manifest["count"], manifest["version"], out)
+
+
+if __name__ == "__main__":
+    main()
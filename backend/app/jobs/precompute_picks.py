@@ -0,0 +1,143 @@
+"""
+Offline job: precompute picks for the quiz option space into the pick catalog.
+
+    python -m app.jobs.precompute_picks                 # whole space, skip fresh entries
+    python -m app.jobs.precompute_picks --top 500       # 500 most likely answer combinations
+    python -m app.jobs.precompute_picks --dry-run       # just report missing / stale counts
+    python -m app.jobs.precompute_picks --prune         # also drop combos no longer in the quiz
+
+Every result is committed as soon as it is validated, so an interrupted run
+simply resumes on the next invocation. Answers short of a full set of picks
+(even after repair) are counted as failures and never stored. Entries built with an older
+prompt (see prompt_fingerprint) are treated as stale and regenerated.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import logging
+import math
+import time
+from collections import Counter
+from typing import Iterable, Iterator
+
+from app.core.logging_config import setup_logging
+from app.schemas.picks import PickRequest
+from app.services.ai_service import agenerate_complete_picks, prompt_fingerprint
+from app.services.pick_catalog import PickCatalog, pick_catalog
+from app.services.picks_service import PicksService
+from app.services.quiz_service import get_quiz_content
+
+logger = logging.getLogger("watchpick.jobs.precompute")
+
+QUIZ_FIELDS = tuple(PickRequest.model_fields)
+
+
+def option_space(steps: list[dict]) -> dict[str, list[str]]:
+    """Map each PickRequest field to its quiz option api_values (from get_quiz_content)."""
+    space = {s["key"]: [o["api_value"] for o in s["options"]] for s in steps if s["key"] in QUIZ_FIELDS}
+    missing = [f for f in QUIZ_FIELDS if not space.get(f)]
+    if missing:
+        raise ValueError(f"Quiz has no options for: {', '.join(missing)}")
+    return space
+
+
+def enumerate_inputs(space: dict[str, list[str]]) -> Iterator[PickRequest]:
+    """Every combination of quiz answers."""
+    fields = list(space)
+    for values in itertools.product(*(space[f] for f in fields)):
+        yield PickRequest(**dict(zip(fields, values)))
+
+
+def weighted_inputs(space: dict[str, list[str]], history: Iterable[dict], top: int) -> list[PickRequest]:
+    """
+    The `top` most likely combinations, scoring each as the product of its
+    per-field answer frequencies in `history` (add-one smoothed).
+    """
+    counts = {f: Counter() for f in space}
+    total = 0
+    for inputs in history:
+        total += 1
+        for f in space:
+            counts[f][inputs.get(f)] += 1
+
+    log_p = {
+        f: {v: math.log((counts[f][v] + 1) / (total + len(values))) for v in values}
+        for f, values in space.items()
+    }
+    fields = list(space)
+    scored = (
+        (sum(log_p[f][v] for f, v in zip(fields, values)), values)
+        for values in itertools.product(*(space[f] for f in fields))
+    )
+    best = sorted(scored, key=lambda item: item[0], reverse=True)[:top]
+    return [PickRequest(**dict(zip(fields, values))) for _, values in best]
+
+
+async def precompute(
+    inputs: list[PickRequest],
+    catalog: PickCatalog,
+    concurrency: int = 4,
+    force: bool = False,
+) -> dict:
+    """Generate and store picks for every input that has no fresh catalog entry."""
+    fingerprint = prompt_fingerprint()
+    todo = inputs if force else [b for b in inputs if not catalog.is_fresh(b, fingerprint)]
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"total": len(inputs), "todo": len(todo), "generated": 0, "failed": 0}
+    start = time.perf_counter()
+
+    async def one(body: PickRequest) -> None:
+        async with semaphore:
+            try:
+                generation = await agenerate_complete_picks(body)
+            except Exception as exc:
+                counts["failed"] += 1
+                logger.warning("Failed %s: %s", body.model_dump(), exc)
+                return
+            catalog.put(body, generation.parsed, generation.provider, fingerprint)
+            counts["generated"] += 1
+            done = counts["generated"] + counts["failed"]
+            if done % 25 == 0:
+                logger.info("%d/%d done (%.1f/min)", done, len(todo), done / (time.perf_counter() - start) * 60)
+
+    await asyncio.gather(*(one(b) for b in todo))
+    counts["elapsed_s"] = round(time.perf_counter() - start, 1)
+    return counts
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Precompute picks into the local pick catalog.")
+    parser.add_argument("--top", type=int, default=0, help="only the N most likely combinations (by pick history)")
+    parser.add_argument("--history", type=int, default=5000, help="recent picks used to weight --top")
+    parser.add_argument("--concurrency", type=int, default=4, help="max generations in flight")
+    parser.add_argument("--force", action="store_true", help="regenerate entries even if fresh")
+    parser.add_argument("--prune", action="store_true", help="delete entries no longer in the option space")
+    parser.add_argument("--dry-run", action="store_true", help="report missing/stale counts and exit")
+    args = parser.parse_args(argv)
+
+    setup_logging(debug=False)
+    space = option_space(get_quiz_content())
+    if args.top:
+        inputs = weighted_inputs(space, PicksService().recent_quiz_inputs(limit=args.history), args.top)
+    else:
+        inputs = list(enumerate_inputs(space))
+
+    if args.prune:
+        removed = pick_catalog.prune(enumerate_inputs(space))
+        logger.info("Pruned %d entries no longer in the quiz option space", removed)
+
+    if args.dry_run:
+        fingerprint = prompt_fingerprint()
+        stale = sum(1 for b in inputs if not pick_catalog.is_fresh(b, fingerprint))
+        logger.info("%d combinations selected, %d missing or stale", len(inputs), stale)
+        return
+
+    counts = asyncio.run(precompute(inputs, pick_catalog, concurrency=args.concurrency, force=args.force))
+    logger.info("Precompute finished: %s", counts)
+
+
+if __name__ == "__main__":
+    main()
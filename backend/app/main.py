@@ -1,4 +1,7 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException, Request, WebSocket
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, RedirectResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -6,7 +9,9 @@ from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 import asyncio
 
+from app.ai import ai_factory
 from app.core.config import settings
+from app.core.dependencies import get_current_user_id
 from app.core.exceptions import generic_exception_handler, http_exception_handler
 from app.core.logging_config import setup_logging
 from app.core.middleware import (
@@ -15,11 +20,30 @@ from app.core.middleware import (
     SecurityHeadersMiddleware,
 )
 from app.routers import admin, auth, health, hero, payments, picks, pricing, quiz, users
+from app.services.ai_service import cache_namespace
+from app.services.health_service import health_monitor
+from app.services.near_cache import near_pick_cache
+from app.services.pick_jobs import FINISHED, pick_jobs, public_job
+from app.services.pick_speculation import pick_speculator
 
 # Rate limiter (in-memory; swap to Redis for multi-process)
 limiter = Limiter(key_func=get_remote_address, default_limits=[settings.rate_limit_default])
 
 
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    await health_monitor.start()
+    await pick_jobs.start()
+    await near_pick_cache.awarm_from_history(cache_namespace())
+    try:
+        yield
+    finally:
+        await pick_jobs.stop()
+        await pick_speculator.stop()
+        await health_monitor.stop()
+        await ai_factory.aclose()
+
+
 def create_app() -> FastAPI:
     setup_logging(debug=settings.debug)
 
@@ -30,6 +54,7 @@ def create_app() -> FastAPI:
         docs_url="/docs",
         redoc_url="/redoc",
         debug=settings.debug,
+        lifespan=lifespan,
     )
 
     # Rate limiter
@@ -96,6 +121,37 @@ def create_app() -> FastAPI:
             # Client disconnected or server shutting down — nothing to do.
             pass
 
+    @application.websocket("/ws/picks/jobs/{job_id}")
+    async def pick_job_ws(websocket: WebSocket, job_id: str, token: str = ""):
+        """
+        Push a pick job's status as it changes. Browsers can't set headers on
+        a websocket, so the Supabase access token comes as `?token=`. Sends the
+        current state first and closes once the job is done or failed.
+        """
+        try:
+            user_id = await run_in_threadpool(get_current_user_id, f"Bearer {token}")
+        except HTTPException:
+            await websocket.close(code=4401)
+            return
+        updates = pick_jobs.subscribe(job_id)
+        try:
+            job = await pick_jobs.get(job_id, user_id)
+            if job is None:
+                await websocket.close(code=4404)
+                return
+            await websocket.accept()
+            state = public_job(job)
+            await websocket.send_json(state)
+            while state["status"] not in FINISHED:
+                state = await updates.get()
+                await websocket.send_json(state)
+            await websocket.close()
+        except Exception:
+            # Client disconnected or server shutting down — the job carries on.
+            pass
+        finally:
+            pick_jobs.unsubscribe(job_id, updates)
+
     return application
 
 
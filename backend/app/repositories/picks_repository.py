@@ -9,13 +9,21 @@ class PicksRepository:
     """Handles all database operations for picks."""
 
     @staticmethod
-    def create(user_id: str, quiz_inputs: dict, results: list[dict]) -> dict | None:
+    def create(
+        user_id: str,
+        quiz_inputs: dict,
+        results: list[dict],
+        tokens_used: int | None = None,
+        cache_namespace: str | None = None,
+    ) -> dict | None:
         """Insert a picks record. Returns the created record."""
         sb = get_supabase()
         payload = {
             "user_id": user_id,
             "quiz_inputs": quiz_inputs,
             "results": results,
+            "tokens_used": tokens_used,
+            "cache_namespace": cache_namespace,
             "created_by": user_id,
         }
         resp = sb.table("picks").insert(payload).execute()
@@ -62,3 +70,30 @@ class PicksRepository:
         sb = get_supabase()
         resp = sb.table("picks").select("id", count="exact").execute()
         return resp.count or 0
+
+    @staticmethod
+    def list_quiz_inputs(limit: int = 5000) -> list[dict]:
+        """Fetch the most recent quiz_inputs across all users (for answer statistics)."""
+        sb = get_supabase()
+        resp = (
+            sb.table("picks")
+            .select("quiz_inputs")
+            .order("created_at", desc=True)
+            .limit(limit)
+            .execute()
+        )
+        return [row["quiz_inputs"] for row in resp.data or [] if row.get("quiz_inputs")]
+
+    @staticmethod
+    def list_recent_results(cache_namespace: str, limit: int = 5000) -> list[dict]:
+        """Fetch the most recent quiz_inputs + results pairs generated under `cache_namespace` (newest first)."""
+        sb = get_supabase()
+        resp = (
+            sb.table("picks")
+            .select("quiz_inputs, results")
+            .eq("cache_namespace", cache_namespace)
+            .order("created_at", desc=True)
+            .limit(limit)
+            .execute()
+        )
+        return [row for row in resp.data or [] if row.get("quiz_inputs") and row.get("results")]
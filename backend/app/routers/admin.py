@@ -2,10 +2,17 @@ import logging
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
 
+from app.ai import ai_factory
 from app.core.dependencies import require_admin
 from app.core.responses import ok
 from app.schemas.pricing import PricingFeatureCreate, PricingFeatureUpdate, PricingPlanCreate, PricingPlanUpdate
 from app.schemas.quiz import QuizOptionContentUpdate, QuizStepContentUpdate
+from app.services.ai_service import prompt_fingerprint, repair_stats
+from app.services.near_cache import near_pick_cache
+from app.services.pick_cache import pick_cache
+from app.services.pick_catalog import pick_catalog
+from app.services.pick_jobs import pick_jobs
+from app.services.pick_speculation import pick_speculator
 from app.services.profile_service import ProfileService
 from app.services.picks_service import PicksService
 from app.services.pricing_service import (
@@ -18,6 +25,7 @@ from app.services.pricing_service import (
     update_plan,
 )
 from app.services.quiz_service import get_quiz_content, upsert_option_content, upsert_step_content
+from app.services.watch_catalog import watch_catalog
 
 logger = logging.getLogger("watchpick.admin")
 
@@ -189,3 +197,104 @@ def analytics():
     svc = ProfileService()
     data = svc.get_analytics()
     return ok(data)
+
+
+@router.get("/analytics/ai")
+def ai_analytics():
+    """Per-provider AI calls (outcomes, fallback position, tokens, latency / TTFT percentiles), cascade escalations and partial-answer repairs."""
+    return ok({
+        "providers": ai_factory.usage_stats(),
+        "cascade": ai_factory.cascade_stats(),
+        "repair": repair_stats.stats(),
+    })
+
+
+# ---------------------------------------------------------------------------
+# AI (admin)
+# ---------------------------------------------------------------------------
+
+
+@router.get("/ai/cache")
+def ai_cache_stats():
+    """Pick cache size, hit/miss counters and evictions."""
+    return ok(pick_cache.stats())
+
+
+@router.delete("/ai/cache")
+def ai_cache_clear():
+    """Drop every cached pick (e.g. after a prompt change)."""
+    pick_cache.clear()
+    return ok({"cleared": True})
+
+
+@router.get("/ai/near-cache")
+def ai_near_cache_stats():
+    """Approximate pick cache: entries, weights / threshold, exact vs. near hit rates, nearest-distance percentiles."""
+    return ok(near_pick_cache.stats())
+
+
+@router.delete("/ai/near-cache")
+def ai_near_cache_clear():
+    """Drop every near-cache entry."""
+    near_pick_cache.clear()
+    return ok({"cleared": True})
+
+
+@router.get("/ai/catalog")
+def ai_catalog_stats():
+    """Precomputed pick catalog size, freshness and hit/miss counters."""
+    return ok(pick_catalog.stats(fingerprint=prompt_fingerprint()))
+
+
+@router.post("/ai/catalog/reload")
+def ai_catalog_reload():
+    """Reload the catalog file from disk (after a precompute run)."""
+    pick_catalog.load()
+    return ok(pick_catalog.stats(fingerprint=prompt_fingerprint()))
+
+
+@router.get("/ai/watch-catalog")
+def ai_watch_catalog_stats():
+    """Watch catalog build version, size and shortlist lookups."""
+    return ok(watch_catalog.stats())
+
+
+@router.post("/ai/watch-catalog/reload")
+def ai_watch_catalog_reload():
+    """Reload the watch catalog from disk (after `python -m app.jobs.build_watch_catalog`)."""
+    watch_catalog.load()
+    return ok(watch_catalog.stats())
+
+
+@router.get("/ai/coalescing")
+async def ai_coalescing_stats():
+    """How many identical in-flight generations were collapsed into one."""
+    # async: the single-flight table belongs to the event loop
+    return ok(ai_factory.coalescing.stats())
+
+
+@router.get("/ai/concurrency")
+async def ai_concurrency_stats():
+    """Per-provider adaptive concurrency: current limit, in-flight / waiting calls, queue wait p50 / p95, overload backoffs."""
+    # async: the limiters' waiter queues belong to the event loop
+    return ok(ai_factory.concurrency_stats())
+
+
+@router.get("/ai/transport")
+def ai_transport_stats():
+    """Per-provider HTTP connection reuse (requests vs. new connections / TLS handshakes)."""
+    return ok({"providers": ai_factory.transport_stats()})
+
+
+@router.get("/ai/jobs")
+async def ai_jobs_stats():
+    """Pick job queue: depth, jobs in progress, enqueue→start wait and run time percentiles."""
+    # async: the queue and WebSocket subscribers belong to the event loop
+    return ok(pick_jobs.stats())
+
+
+@router.get("/ai/speculation")
+async def ai_speculation_stats():
+    """Speculative pre-generation: budget use, hit rate (claimed / started), coverage of /generate and tokens spent."""
+    # async: stats() expires entries, which belong to the event loop
+    return ok(pick_speculator.stats())
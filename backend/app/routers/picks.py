@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+from starlette.concurrency import run_in_threadpool
 
+from app.ai.deadline import Deadline
 from app.core.config import settings
 from app.core.dependencies import get_current_user_id
-from app.core.responses import ok
-from app.schemas.picks import PickRequest
-from app.services.ai_service import generate_watch_picks
+from app.core.responses import ok, sse_event
+from app.schemas.picks import PartialPickRequest, PickRequest
+from app.services.ai_service import agenerate_watch_picks, astream_watch_picks, history_namespace
+from app.services.idempotency import idempotency_store, request_fingerprint
+from app.services.pick_jobs import pick_jobs, public_job
+from app.services.pick_speculation import pick_speculator
 from app.services.profile_service import ProfileService
 from app.services.picks_service import PicksService
 
@@ -16,12 +22,157 @@ limiter = Limiter(key_func=get_remote_address)
 
 @router.post("/generate")
 @limiter.limit(settings.rate_limit_ai)
-def generate(request: Request, body: PickRequest, user_id: str = Depends(get_current_user_id)):
-    """Generate AI watch picks from quiz answers. Saves result to DB. Rate-limited."""
-    watches, provider = generate_watch_picks(body)
+async def generate(
+    request: Request,
+    response: Response,
+    body: PickRequest,
+    user_id: str = Depends(get_current_user_id),
+    fresh: bool = Query(default=False, description="Pro/Lifetime only: skip the pick cache"),
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
+):
+    """
+    Generate AI watch picks from quiz answers. Saves result to DB. Rate-limited.
+
+    Runs as a coroutine so the LLM round trip is awaited on the event loop;
+    only the (blocking) Supabase calls are pushed to the threadpool.
+    A matching speculative generation (see /speculate) is used when there is one.
+
+    With an Idempotency-Key header, retries of the same request (same user,
+    key and body) wait for the first one or get its response replayed
+    (marked Idempotent-Replayed: true) instead of generating and saving again.
+    """
+    if idempotency_key is None:
+        return ok(await _generate_and_save(body, user_id, fresh))
+
+    data, replayed = await idempotency_store.run(
+        user_id,
+        idempotency_key,
+        request_fingerprint(body.model_dump_json(), str(fresh)),
+        lambda: _generate_and_save(body, user_id, fresh),
+        wait_timeout=settings.ai_deadline_generate_s + 5,
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return ok(data)
+
+
+async def _generate_and_save(body: PickRequest, user_id: str, fresh: bool) -> dict:
+    fresh = fresh and await _can_skip_cache(user_id)
+    deadline = Deadline(settings.ai_deadline_generate_s)
+    speculated = None if fresh else await pick_speculator.claim(body, deadline)
+    if speculated is not None:
+        watches, generation = speculated
+    else:
+        watches, generation = await agenerate_watch_picks(body, fresh=fresh, deadline_s=deadline.remaining())
     picks_svc = PicksService()
-    record = picks_svc.save_picks(user_id, body.model_dump(), watches)
-    return ok({"watches": watches, "provider": provider, "pick_id": record.get("id") if record else None})
+    record = await run_in_threadpool(
+        picks_svc.save_picks, user_id, body.model_dump(), watches, generation.tokens_used,
+        history_namespace(generation),
+    )
+    return {
+        "watches": watches,
+        "provider": generation.provider,
+        "hedged": generation.hedged,
+        "cached": generation.cached,
+        "source": generation.source,
+        "approximate": generation.source == "near",
+        "speculative": speculated is not None,
+        "tokens_used": generation.tokens_used,
+        "pick_id": record.get("id") if record else None,
+    }
+
+
+@router.post("/speculate", status_code=202)
+@limiter.limit(settings.rate_limit_speculate)
+async def speculate(
+    request: Request,
+    body: PartialPickRequest,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Pre-generate picks from a half-answered quiz: the most likely completions
+    of the missing steps are generated in the background (within a global
+    budget), so the final /generate can return straight away.
+    """
+    return ok(await pick_speculator.speculate(body.model_dump(exclude_none=True)))
+
+
+@router.post("/generate/stream")
+@limiter.limit(settings.rate_limit_ai)
+async def generate_stream(
+    request: Request,
+    body: PickRequest,
+    user_id: str = Depends(get_current_user_id),
+    fresh: bool = Query(default=False, description="Pro/Lifetime only: skip the pick cache"),
+):
+    """
+    Streaming variant of /generate (Server-Sent Events). Emits a `watch` event
+    for each watch as soon as the model has finished writing it, then a `done`
+    event with pick_id and provider once the record is saved. Failures are
+    reported as an `error` event.
+    """
+    fresh = fresh and await _can_skip_cache(user_id)
+
+    async def events():
+        try:
+            async for kind, payload in astream_watch_picks(body, fresh=fresh, deadline_s=settings.ai_deadline_stream_s):
+                if kind == "watch":
+                    yield sse_event("watch", payload)
+                    continue
+                watches, generation = payload
+                record = await run_in_threadpool(
+                    PicksService().save_picks, user_id, body.model_dump(), watches, generation.tokens_used,
+                    history_namespace(generation),
+                )
+                yield sse_event("done", {
+                    "pick_id": record.get("id") if record else None,
+                    "provider": generation.provider,
+                    "hedged": generation.hedged,
+                    "cached": generation.cached,
+                    "source": generation.source,
+                    "approximate": generation.source == "near",
+                    "tokens_used": generation.tokens_used,
+                })
+        except HTTPException as exc:
+            yield sse_event("error", {"status": exc.status_code, "error": exc.detail})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _can_skip_cache(user_id: str) -> bool:
+    """Only Pro/Lifetime users may ask for fresh (uncached) picks."""
+    profile = await run_in_threadpool(ProfileService().get_profile, user_id, "subscription_status")
+    return (profile or {}).get("subscription_status", "free") in ("pro", "lifetime")
+
+
+@router.post("/jobs", status_code=202)
+@limiter.limit(settings.rate_limit_ai)
+async def create_job(
+    request: Request,
+    body: PickRequest,
+    user_id: str = Depends(get_current_user_id),
+    fresh: bool = Query(default=False, description="Pro/Lifetime only: skip the pick cache"),
+):
+    """
+    Queue a pick generation and return its job id straight away. Poll
+    GET /jobs/{job_id} or connect to /ws/picks/jobs/{job_id} for the result,
+    which is saved to pick history like /generate.
+    """
+    fresh = fresh and await _can_skip_cache(user_id)
+    return ok(await pick_jobs.submit(user_id, body, fresh=fresh))
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, user_id: str = Depends(get_current_user_id)):
+    """Status of a queued pick job; `result` is set once it is done."""
+    job = await pick_jobs.get(job_id, user_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return ok(public_job(job))
 
 
 @router.get("/history")
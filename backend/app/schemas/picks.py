@@ -1,6 +1,6 @@
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, RootModel
 
 
 class PickRequest(BaseModel):
@@ -13,6 +13,32 @@ class PickRequest(BaseModel):
     movementType: Optional[str] = "No preference"
 
 
+class PartialPickRequest(BaseModel):
+    """Quiz answers given so far (POST /picks/speculate); unanswered steps are left out."""
+
+    budget: Optional[str] = None
+    occasion: Optional[str] = None
+    style: Optional[str] = None
+    wristSize: Optional[str] = None
+    gender: Optional[str] = None
+    brandOpenness: Optional[str] = None
+    movementType: Optional[str] = None
+
+
+class WatchPick(BaseModel):
+    """What the model writes per watch (as a positional row); links are built server-side."""
+
+    name: str
+    brand: str
+    price_range: str
+    case_size: str
+    reason: str
+
+
+# Structured-output item: one positional row of WatchPick / ShortlistPick values
+CompactRow = RootModel[list[str]]
+
+
 class WatchResult(BaseModel):
     name: str
     brand: str
@@ -23,5 +49,12 @@ class WatchResult(BaseModel):
     amazon_url: str
 
 
+class ShortlistPick(BaseModel):
+    """A model's choice from the catalog shortlist; the rest of the watch comes from the catalog."""
+
+    id: str
+    reason: str
+
+
 class PickResponse(BaseModel):
     watches: list[WatchResult]
@@ -1,33 +1,64 @@
-import json
+import logging
 import re
+from dataclasses import dataclass, replace
+from typing import Any, AsyncIterator
+from urllib.parse import quote
 
 from fastapi import HTTPException
+from pydantic import BaseModel
 
 from app.ai import ai_factory
-from app.schemas.picks import PickRequest
+from app.ai.base import GenerationResult, Usage
+from app.ai.deadline import Deadline
+from app.ai.json_stream import ArrayParseError, IncrementalArrayParser
+from app.core.config import settings
+from app.schemas.picks import CompactRow, PickRequest, ShortlistPick, WatchPick
+from app.services.near_cache import near_pick_cache
+from app.services.pick_cache import pick_cache, pick_cache_key, prompt_hash
+from app.services.pick_catalog import pick_catalog
+from app.services.watch_catalog import format_price, watch_catalog, watch_name, watch_pick
 
+logger = logging.getLogger(__name__)
+
+# Static instructions only: this is the cached prompt prefix (provider prompt
+# caches match on exact leading bytes), so anything that varies per request
+# belongs in build_user_message(), which is always sent after it.
+# Answers are compact positional rows (see WatchPick); purchase links are
+# built server-side by expand_watch(), never spelled out by the model.
 SYSTEM_PROMPT = (
     "You are an expert watch advisor and horologist. Given a person's preferences, "
-    "pick exactly 4 watches as a JSON array. The first 3 are main picks. The 4th is "
+    "pick exactly 4 watches. The first 3 are main picks. The 4th is "
     'a "hidden gem" — a lesser-known but excellent alternative.\n\n'
-    "Each watch object must have these exact fields:\n"
-    '- "name": full model name (e.g. "Seiko Presage SPB167")\n'
-    '- "brand": brand name\n'
-    '- "price_range": price range string (e.g. "$400–$500")\n'
-    '- "case_size": case diameter in mm (e.g. "40.8mm")\n'
-    '- "reason": 2 sentences explaining why this watch matches the user\'s preferences\n'
-    '- "chrono24_url": "https://www.chrono24.com/search/index.htm?query=" + URL-encoded watch name\n'
-    '- "amazon_url": "https://www.amazon.com/s?k=" + URL-encoded watch name\n\n'
+    "Answer with a JSON array of 4 rows, each an array of 5 strings in this order:\n"
+    "1. name: full model name (e.g. Seiko Presage SPB167)\n"
+    "2. brand: brand name\n"
+    "3. price_range: price range (e.g. $400–$500)\n"
+    "4. case_size: case diameter in mm (e.g. 40.8mm)\n"
+    "5. reason: 2 sentences explaining why this watch matches the user's preferences\n\n"
+    'Example row: ["Seiko Presage SPB167", "Seiko", "$400–$500", "40.8mm", "..."]\n'
     "Return ONLY the JSON array, no markdown, no explanation, no code fences."
 )
 
+# Used instead of SYSTEM_PROMPT while a watch catalog is loaded: the user
+# message then ends with a shortlist, and the model only chooses and explains.
+SHORTLIST_SYSTEM_PROMPT = (
+    "You are an expert watch advisor and horologist. Given a person's preferences and "
+    "a shortlist of real watches, choose exactly 4 different watches from the shortlist "
+    'as a JSON array. The first 3 are main picks. The 4th is a "hidden gem" — a '
+    "lesser-known but excellent alternative.\n\n"
+    "Answer with a JSON array of 4 rows, each an array of 2 strings in this order:\n"
+    "1. id: the shortlist id of the watch (the text in square brackets)\n"
+    "2. reason: 2 sentences explaining why this watch matches the user's preferences\n\n"
+    "Never choose a watch that is not on the shortlist. "
+    "Return ONLY the JSON array, no markdown, no explanation, no code fences."
+)
 
-def generate_watch_picks(body: PickRequest) -> tuple[list[dict], str]:
-    """
-    Generate watch picks using the AI factory (with automatic fallback).
-    Returns (watches, provider_name).
-    """
-    user_message = (
+PICK_COUNT = 4
+
+
+def build_user_message(body: PickRequest) -> str:
+    """Render quiz answers into the user message sent to the model."""
+    return (
         f"Budget: {body.budget}\n"
         f"Occasion: {body.occasion}\n"
         f"Style preference: {body.style}\n"
@@ -37,18 +68,448 @@ def generate_watch_picks(body: PickRequest) -> tuple[list[dict], str]:
         f"Movement type: {body.movementType}"
     )
 
-    raw_text, provider_name = ai_factory.generate(SYSTEM_PROMPT, user_message)
 
-    match = re.search(r"\[[\s\S]*\]", raw_text)
-    if not match:
-        raise HTTPException(status_code=500, detail="AI returned unparseable response")
+def render_shortlist(records: list[dict]) -> str:
+    """One compact line per candidate: [id] name | price | case | movement | styles."""
+    lines = [
+        f"[{r['id']}] {watch_name(r)} | {format_price(r['price_min'], r['price_max'])} | "
+        f"{r['case_mm']:g}mm | {r['movement']} | {', '.join(r.get('styles', ()))}"
+        for r in records
+    ]
+    return "Shortlist:\n" + "\n".join(lines)
+
+
+def _shortlisting() -> bool:
+    return settings.watch_catalog_enabled and len(watch_catalog) >= PICK_COUNT
+
+
+def prompt_fingerprint() -> str:
+    """
+    Identifies the active prompt (system prompt, plus the watch catalog build
+    when shortlisting), so cached and precomputed picks from another prompt
+    are not served.
+    """
+    if _shortlisting():
+        return prompt_hash(SHORTLIST_SYSTEM_PROMPT + watch_catalog.version)
+    return prompt_hash(SYSTEM_PROMPT)
 
+
+def _close_parser(parser: IncrementalArrayParser) -> list[dict]:
+    """Finish a watch parser, turning parse failures into HTTP 500."""
     try:
-        watches: list[dict] = json.loads(match.group(0))
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="AI returned invalid JSON")
+        watches = parser.close()
+    except ArrayParseError as exc:
+        raise HTTPException(status_code=500, detail=f"AI returned unparseable response: {exc}")
+    if parser.errors:
+        logger.warning("Dropped invalid watches from AI response: %s", "; ".join(parser.errors))
+    return watches
+
+
+def expand_watch(pick: dict) -> dict:
+    """Full WatchResult dict for a model pick: adds the purchase links built from the name."""
+    name = quote(pick["name"])
+    return {
+        **pick,
+        "chrono24_url": f"https://www.chrono24.com/search/index.htm?query={name}",
+        "amazon_url": f"https://www.amazon.com/s?k={name}",
+    }
+
+
+# "40mm", "40.5 mm" — the case-size format the cascade accepts
+_CASE_MM = re.compile(r"\d+(?:\.\d+)?\s*mm", re.IGNORECASE)
+
+
+class Picks(list):
+    """Parsed watches, plus the answer slot (array index) and dedupe key of each."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.slots: list[int] = []
+        self.keys: list[str] = []
+
+
+@dataclass(frozen=True)
+class PicksParser:
+    """
+    `validate` for generated picks: parses the model's compact rows (or
+    objects) and expands them into WatchResult dicts. With a shortlist, rows
+    are [id, reason] choices filled in from the watch catalog. Unknown ids,
+    repeats and anything in `exclude` are dropped; `complete` also rejects
+    answers with fewer than PICK_COUNT watches, and `strict` (the cascade's
+    acceptance check) additionally rejects any dropped row or a case size
+    that isn't in mm. Compares by value, so identical requests still
+    coalesce in the factory.
+    """
+
+    shortlist: tuple[str, ...] = ()
+    exclude: tuple[str, ...] = ()  # keys of watches picked earlier (see repair_prompt)
+    complete: bool = False
+    strict: bool = False
+
+    def stream_parser(self) -> IncrementalArrayParser:
+        return IncrementalArrayParser(ShortlistPick if self.shortlist else WatchPick, positional=True)
+
+    def _key(self, item: dict) -> str:
+        return item["id"] if self.shortlist else " ".join(item["name"].casefold().split())
+
+    def collect(self, parser: IncrementalArrayParser, items: list[dict], picks: Picks) -> list[dict]:
+        """Expand `items` (the parser's latest) into `picks` and return the watches added."""
+        slots = parser.positions[len(parser.positions) - len(items):]
+        added = []
+        for item, slot in zip(items, slots):
+            key = self._key(item)
+            if key in picks.keys or key in self.exclude:
+                logger.warning("Dropped repeated AI pick %r", key)
+                continue
+            if self.shortlist:
+                record = watch_catalog.get(key) if key in self.shortlist else None
+                if record is None:
+                    logger.warning("Dropped AI choice %r: not on the shortlist", key)
+                    continue
+                item = watch_pick(record, item["reason"])
+            watch = expand_watch(item)
+            picks.append(watch)
+            picks.slots.append(slot)
+            picks.keys.append(key)
+            added.append(watch)
+        return added
+
+    def __call__(self, raw: str | list) -> Picks:
+        parser = self.stream_parser()
+        if isinstance(raw, list):
+            parser.feed_items(raw)
+        else:
+            parser.feed(raw)
+        picks = Picks()
+        self.collect(parser, _close_parser(parser), picks)
+        if not picks:
+            raise HTTPException(status_code=500, detail="AI returned no usable watches")
+        if (self.complete or self.strict) and len(picks) < PICK_COUNT:
+            raise HTTPException(status_code=500, detail=f"AI returned {len(picks)} of {PICK_COUNT} watches")
+        if self.strict:
+            if parser.errors or len(parser.positions) != PICK_COUNT:
+                raise HTTPException(status_code=500, detail="AI returned malformed or repeated watches")
+            bad = [w["case_size"] for w in picks if not _CASE_MM.fullmatch(w["case_size"].strip())]
+            if bad:
+                raise HTTPException(status_code=500, detail=f"AI returned case sizes not in mm: {bad}")
+        return picks
+
+
+def parse_watches(raw: str | list) -> list[dict]:
+    """
+    Extract the watches from a raw free-form model response (or the items of
+    a structured-output answer) as WatchResult dicts.
+    """
+    return PicksParser()(raw)
+
+
+@dataclass(frozen=True)
+class PickPrompt:
+    """Everything a generation needs: the prompt pair, its validator and the structured-output item schema."""
+
+    system: str
+    user: str
+    validate: PicksParser
+    schema: type[BaseModel] = CompactRow
+
+
+def build_prompt(body: PickRequest) -> PickPrompt:
+    """
+    The prompt for these answers: shortlist-grounded while a watch catalog is
+    loaded (smaller prompt and output, no invented models), free-form otherwise.
+    """
+    user_message = build_user_message(body)
+    if _shortlisting():
+        shortlist = watch_catalog.shortlist(body, max(settings.watch_catalog_shortlist, PICK_COUNT))
+        return PickPrompt(
+            SHORTLIST_SYSTEM_PROMPT,
+            f"{user_message}\n\n{render_shortlist(shortlist)}",
+            PicksParser(tuple(r["id"] for r in shortlist)),
+        )
+    return PickPrompt(SYSTEM_PROMPT, user_message, PicksParser())
+
+
+class RepairStats:
+    """Counters for partial-answer repair, reported in /admin/analytics/ai."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.generations = 0  # live generations checked
+        self.partial = 0  # ... that came back with missing or invalid slots
+        self.repaired = 0  # completed by a targeted follow-up
+        self.regenerated = 0  # needed the full regeneration (last resort)
+        self.unrepaired = 0  # served short
+        self.slots_repaired = 0
+        self.repair_tokens = 0
+        self.tokens_saved = 0  # what a full regeneration would have cost, minus the follow-ups
+
+    def stats(self) -> dict:
+        return {
+            "generations": self.generations,
+            "partial": self.partial,
+            "repaired": self.repaired,
+            "regenerated": self.regenerated,
+            "unrepaired": self.unrepaired,
+            "partial_rate": round(self.partial / self.generations, 3) if self.generations else None,
+            "repair_rate": round(self.repaired / self.partial, 3) if self.partial else None,
+            "slots_repaired": self.slots_repaired,
+            "repair_tokens": self.repair_tokens,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+repair_stats = RepairStats()
+
 
-    if not watches:
-        raise HTTPException(status_code=500, detail="No picks generated")
+def missing_slots(picks: Picks) -> list[int]:
+    """Answer slots (0 … PICK_COUNT-1) a repair has to fill, lowest first."""
+    need = PICK_COUNT - len(picks)
+    if need <= 0:
+        return []
+    return [slot for slot in range(PICK_COUNT) if slot not in picks.slots][:need]
+
+
+def repair_prompt(prompt: PickPrompt, picks: Picks, slots: list[int]) -> PickPrompt:
+    """
+    Follow-up asking only for the missing slots (e.g. "the hidden gem"),
+    excluding the watches already picked. Same system prompt, so the
+    provider's prompt cache still applies.
+    """
+    main = sum(1 for slot in slots if slot != PICK_COUNT - 1)
+    wanted = [f"{main} main pick{'s' if main > 1 else ''}"] if main else []
+    if PICK_COUNT - 1 in slots:
+        wanted.append("the hidden gem")
+    rows = f"{len(slots)} row{'s' if len(slots) > 1 else ''}"
+    user = (
+        f"{prompt.user}\n\nYou already picked: {', '.join(w['name'] for w in picks)}. "
+        f"Reply with only {' and '.join(wanted)} ({rows}), excluding those watches, in the same format."
+    )
+    validate = replace(prompt.validate, exclude=tuple(picks.keys), complete=False)
+    return replace(prompt, user=user, validate=validate)
+
+
+def _merge(picks: Picks, extra: list[dict], slots: list[int]) -> Picks:
+    """`picks` plus repaired watches, in answer-slot order."""
+    merged = Picks()
+    placed = [*zip(picks.slots, picks.keys, picks), *zip(slots, [""] * len(extra), extra)]
+    for slot, key, watch in sorted(placed, key=lambda p: p[0]):
+        merged.append(watch)
+        merged.slots.append(slot)
+        merged.keys.append(key)
+    return merged
+
+
+async def _complete_picks(
+    prompt: PickPrompt, generation: GenerationResult, deadline: Deadline, factory: Any = None,
+) -> GenerationResult:
+    """
+    Fill the slots missing from a partial answer: first with a small
+    follow-up for just those slots, then, as a last resort, with a full
+    regeneration that must return every pick (so the factory falls back
+    across providers). If both fail, the partial answer is served as before.
+    """
+    factory = factory or ai_factory
+    picks: Picks = generation.parsed
+    repair_stats.generations += 1
+    slots = missing_slots(picks)
+    if not slots:
+        return generation
+    repair_stats.partial += 1
+    usage = generation.usage or Usage()
+
+    if deadline.fits(settings.ai_min_attempt_s):
+        follow_up = repair_prompt(prompt, picks, slots)
+        try:
+            repair = await factory.agenerate(
+                follow_up.system, follow_up.user, validate=follow_up.validate,
+                deadline_s=deadline.remaining() if deadline.bounded else None, schema=follow_up.schema,
+            )
+        except HTTPException as exc:
+            logger.warning("Pick repair for slots %s failed: %s", slots, exc.detail)
+        else:
+            extra = repair.parsed[:len(slots)]
+            usage = usage + (repair.usage or Usage())
+            repair_stats.repair_tokens += repair.tokens_used or 0
+            picks = _merge(picks, extra, slots[:len(extra)])
+            if len(extra) == len(slots):
+                repair_stats.repaired += 1
+                repair_stats.slots_repaired += len(slots)
+                if generation.tokens_used and repair.tokens_used is not None:
+                    repair_stats.tokens_saved += max(0, generation.tokens_used - repair.tokens_used)
+                return replace(generation, parsed=picks, usage=usage)
+
+    if deadline.fits(settings.ai_min_attempt_s):
+        try:
+            full = await factory.agenerate(
+                prompt.system, prompt.user, validate=replace(prompt.validate, complete=True),
+                deadline_s=deadline.remaining() if deadline.bounded else None, schema=prompt.schema,
+            )
+        except HTTPException as exc:
+            logger.warning("Full regeneration after a partial answer failed: %s", exc.detail)
+        else:
+            repair_stats.regenerated += 1
+            return replace(full, usage=usage + (full.usage or Usage()))
+
+    repair_stats.unrepaired += 1
+    return replace(generation, parsed=picks, usage=usage)
+
+
+def _cache_key(body: PickRequest) -> str | None:
+    if not settings.pick_cache_enabled:
+        return None
+    return pick_cache_key(body, prompt_fingerprint(), ai_factory.signature)
+
+
+def cache_namespace() -> str:
+    """Scope of near-cache entries: picks only match under the same prompt and model chain."""
+    return f"{prompt_hash(prompt_fingerprint())}:{ai_factory.signature}"
+
+
+def history_namespace(generation: GenerationResult) -> str | None:
+    """Namespace saved with a pick: live answers only, so warm-ups never pick up other prompts / models."""
+    return None if generation.cached else cache_namespace()
+
+
+def _stored_picks(
+    body: PickRequest, key: str | None, record: bool = True,
+) -> tuple[list[dict], GenerationResult] | None:
+    """
+    Look the answers up in the precomputed catalog, the pick cache, then the
+    near cache. `record=False` doesn't count towards their hit / miss stats.
+    """
+    if settings.pick_catalog_enabled:
+        entry = pick_catalog.get(body, prompt_fingerprint(), record)
+        if entry is not None:
+            watches, provider_name = entry
+            return watches, GenerationResult(text="", provider=provider_name, parsed=watches, source="catalog")
+
+    if key:
+        hit = pick_cache.get(key, record)
+        if hit is not None:
+            watches, provider_name = hit
+            return [dict(w) for w in watches], GenerationResult(
+                text="", provider=provider_name, parsed=watches, source="cache",
+            )
+
+    if settings.near_cache_enabled:
+        near = near_pick_cache.get(body, cache_namespace(), record)
+        if near is not None:
+            watches, provider_name, _ = near
+            return watches, GenerationResult(text="", provider=provider_name, parsed=watches, source="near")
+    return None
+
+
+def _remember(body: PickRequest, key: str | None, watches: list[dict], provider_name: str) -> None:
+    """Store a live result in the pick cache and the near cache."""
+    if key:
+        pick_cache.set(key, (watches, provider_name))
+    if settings.near_cache_enabled:
+        near_pick_cache.add(body, watches, provider_name, cache_namespace())
+
+
+def stored_picks(body: PickRequest, record: bool = True) -> tuple[list[dict], GenerationResult] | None:
+    """The catalog or cached picks for these answers, if any (no provider call)."""
+    return _stored_picks(body, _cache_key(body), record)
+
+
+async def agenerate_watch_picks(
+    body: PickRequest, fresh: bool = False, deadline_s: float | None = None,
+) -> tuple[list[dict], GenerationResult]:
+    """
+    Generate watch picks (with automatic provider fallback) for the request
+    path, jobs and speculation. An unparseable answer counts as a provider failure, so the factory falls
+    back (or lets a hedged provider win) instead of returning a 500.
+
+    Answers covered by the precomputed catalog are served from it, then
+    identical quiz answers are served from the pick cache, then close enough
+    ones from the near cache (source "near"); `fresh=True` skips these
+    lookups (the new result still refreshes the caches).
+    `deadline_s` bounds the live generation (HTTP 504 when it runs out).
+    Returns (watches, generation).
+    """
+    key = _cache_key(body)
+    if not fresh:
+        stored = _stored_picks(body, key)
+        if stored is not None:
+            return stored
+
+    deadline = Deadline(deadline_s)
+    prompt = build_prompt(body)
+    generation = await ai_factory.agenerate(
+        prompt.system, prompt.user, validate=prompt.validate, deadline_s=deadline_s, schema=prompt.schema,
+        cascade=replace(prompt.validate, strict=True),
+    )
+    generation = await _complete_picks(prompt, generation, deadline)
+    watches = list(generation.parsed)
+    _remember(body, key, watches, generation.provider)
+    return watches, generation
+
+
+async def agenerate_complete_picks(
+    body: PickRequest, factory: Any = None, deadline_s: float | None = None,
+) -> GenerationResult:
+    """
+    Live generation for the offline jobs (no cache lookups, nothing cached):
+    partial answers are repaired as on the request path, and one still short
+    of PICK_COUNT watches raises 502 so it is never persisted.
+    """
+    factory = factory or ai_factory
+    prompt = build_prompt(body)
+    generation = await factory.agenerate(
+        prompt.system, prompt.user, validate=prompt.validate, deadline_s=deadline_s, schema=prompt.schema,
+    )
+    generation = await _complete_picks(prompt, generation, Deadline(deadline_s), factory)
+    if missing_slots(generation.parsed):
+        raise HTTPException(
+            status_code=502, detail=f"Only {len(generation.parsed)} of {PICK_COUNT} picks after repair",
+        )
+    return generation
+
+
+async def astream_watch_picks(
+    body: PickRequest, fresh: bool = False, deadline_s: float | None = None,
+) -> AsyncIterator[tuple[str, Any]]:
+    """
+    Streaming variant of agenerate_watch_picks(). Yields ("watch", watch) as
+    soon as each watch object is complete, then ("done", (watches, generation)).
+    Stored picks (catalog / cache) are replayed the same way.
+    """
+    key = _cache_key(body)
+    if not fresh:
+        stored = _stored_picks(body, key)
+        if stored is not None:
+            for watch in stored[0]:
+                yield "watch", watch
+            yield "done", stored
+            return
+
+    deadline = Deadline(deadline_s)
+    prompt = build_prompt(body)
+    parser = prompt.validate.stream_parser()
+    chunks: list[str] = []
+    picks = Picks()
+    provider_name = ""
+    usage = Usage()
+    stream = ai_factory.astream(
+        prompt.system, prompt.user, usage=usage, deadline_s=deadline_s, schema=prompt.schema,
+    )
+    async for provider_name, chunk in stream:
+        chunks.append(chunk)
+        for watch in prompt.validate.collect(parser, parser.feed(chunk), picks):
+            yield "watch", watch
 
-    return watches, provider_name
+    _close_parser(parser)
+    if not picks:
+        raise HTTPException(status_code=500, detail="AI returned no usable watches")
+    generation = await _complete_picks(prompt, GenerationResult(
+        text="".join(chunks), provider=provider_name, parsed=picks, usage=usage,
+    ), deadline)
+    watches = list(generation.parsed)
+    # Repaired (or regenerated) watches arrive after the streamed ones; `done` carries the final order
+    for watch in watches:
+        if watch not in picks:
+            yield "watch", watch
+    _remember(body, key, watches, generation.provider)
+    yield "done", (watches, generation)
@@ -0,0 +1,57 @@
+"""Dependency probes for the background health monitor."""
+
+from __future__ import annotations
+
+import asyncio
+
+from app.ai import ai_factory
+from app.ai.base import AIProvider
+from app.core import clients
+from app.core.config import settings
+from app.core.health_monitor import HealthMonitor
+
+
+async def check_supabase() -> dict:
+    if not settings.supabase_configured:
+        return {"status": "not_configured"}
+    await asyncio.to_thread(lambda: clients.supabase.table("profiles").select("id").limit(1).execute())  # type: ignore[union-attr]
+    return {"status": "connected"}
+
+
+async def check_stripe() -> dict:
+    if not settings.stripe_configured:
+        return {"status": "not_configured"}
+    import stripe
+    await asyncio.to_thread(stripe.Account.retrieve)
+    return {"status": "connected"}
+
+
+def _ai_check(provider: AIProvider):
+    async def check() -> dict:
+        ok = await provider.aping()
+        return {"status": "connected" if ok else "error"}
+    return check
+
+
+def build_health_monitor() -> HealthMonitor:
+    monitor = HealthMonitor()
+    timeout = settings.health_probe_timeout_s
+    monitor.register("supabase", check_supabase, settings.health_probe_interval_s, timeout)
+    monitor.register("stripe", check_stripe, settings.health_probe_interval_s, timeout)
+    for provider in ai_factory.providers:
+        monitor.register(f"ai:{provider.name}", _ai_check(provider), settings.health_ai_probe_interval_s, timeout)
+    return monitor
+
+
+health_monitor = build_health_monitor()
+
+
+def service_status() -> dict:
+    return {
+        "supabase": health_monitor.snapshot("supabase"),
+        "stripe": health_monitor.snapshot("stripe"),
+    }
+
+
+def ai_provider_status() -> list[dict]:
+    return [{"name": p.name, **health_monitor.snapshot(f"ai:{p.name}")} for p in ai_factory.providers]
@@ -0,0 +1,179 @@
+"""
+Idempotency-Key handling for POST /picks/generate.
+
+Keys are scoped per user. The first request with a key runs normally; while
+it runs, duplicates wait for its outcome, and once it has succeeded they get
+its stored response replayed (no AI call, no new picks row) until the key
+expires. A failed request releases the key so the client can retry.
+
+State lives behind a threading.Lock and outcomes are concurrent.futures
+Futures, so the store is safe whether it is used from the event loop or from
+threadpool workers.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+MAX_KEY_LENGTH = 255
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    outcome: Future = field(default_factory=Future)
+    expires_at: float | None = None  # set once completed
+
+
+@dataclass
+class Claim:
+    """What begin() decided: run the request (leader), wait for one in progress, or replay."""
+
+    key: tuple[str, str]
+    outcome: Future | None = None  # to await, for duplicates of a request in progress
+    replay: dict | None = None  # stored response of a completed request
+    leader: bool = False
+
+
+def request_fingerprint(*parts: str) -> str:
+    """Hash of what the request asked for; reusing a key with different parameters is rejected."""
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Bounded, TTL'd per-user Idempotency-Key records (in progress or completed)."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.started = 0
+        self.waited = 0
+        self.replayed = 0
+        self.conflicts = 0
+
+    def begin(self, user_id: str, key: str, fingerprint: str) -> Claim:
+        """Register a request with this key. Raises 400 for a bad key, 422 for a key reused with other parameters."""
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1–{MAX_KEY_LENGTH} characters")
+        scoped = (user_id, key)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(scoped)
+            if entry is None:
+                self._entries[scoped] = _Entry(fingerprint)
+                self.started += 1
+                self._evict()
+                return Claim(scoped, leader=True)
+            if entry.fingerprint != fingerprint:
+                self.conflicts += 1
+                raise HTTPException(
+                    status_code=422, detail="Idempotency-Key was already used with different request parameters",
+                )
+            if entry.expires_at is not None:
+                self.replayed += 1
+                return Claim(scoped, replay=entry.outcome.result())
+            self.waited += 1
+            return Claim(scoped, outcome=entry.outcome)
+
+    async def wait(self, claim: Claim, timeout: float | None) -> dict:
+        """The response of the request `claim` duplicates (its error is re-raised; 409 if still running at `timeout`)."""
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(claim.outcome)), timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=409, detail="A request with this Idempotency-Key is still in progress",
+            ) from None
+
+    async def run(
+        self,
+        user_id: str,
+        key: str,
+        fingerprint: str,
+        work: Callable[[], Awaitable[dict]],
+        wait_timeout: float | None = None,
+    ) -> tuple[dict, bool]:
+        """
+        Run `work` once per (user, key): returns (response, replayed). Only the
+        first request calls `work`; duplicates wait for it or replay its result.
+        """
+        claim = self.begin(user_id, key, fingerprint)
+        if claim.replay is not None:
+            return claim.replay, True
+        if not claim.leader:
+            return await self.wait(claim, wait_timeout), True
+        try:
+            response = await work()
+        except BaseException as exc:
+            self.fail(claim, exc)
+            raise
+        self.complete(claim, response)
+        return response, False
+
+    def complete(self, claim: Claim, response: dict) -> None:
+        """Store the leader's response for replay and wake its waiters."""
+        with self._lock:
+            entry = self._entries.get(claim.key)
+            if entry is None:
+                return
+            entry.expires_at = time.monotonic() + self._ttl
+            self._entries.move_to_end(claim.key)
+        entry.outcome.set_result(response)
+
+    def fail(self, claim: Claim, exc: BaseException) -> None:
+        """Release the key after a failed leader; current waiters get the same error."""
+        with self._lock:
+            entry = self._entries.pop(claim.key, None)
+        if entry is None:
+            return
+        if not isinstance(exc, Exception):  # cancelled (client went away): waiters must retry
+            exc = HTTPException(status_code=409, detail="The original request with this Idempotency-Key was cancelled")
+        entry.outcome.set_exception(exc)
+
+    def _expire(self, now: float) -> None:
+        # Completed entries are kept in completion order, so expiry stops at the first live one
+        expired = []
+        for scoped, entry in self._entries.items():
+            if entry.expires_at is None:
+                continue
+            if entry.expires_at > now:
+                break
+            expired.append(scoped)
+        for scoped in expired:
+            del self._entries[scoped]
+
+    def _evict(self) -> None:
+        """Drop the oldest completed keys beyond max_entries (in-progress ones are never dropped)."""
+        overflow = len(self._entries) - self._max_entries
+        if overflow <= 0:
+            return
+        for scoped in [k for k, e in self._entries.items() if e.expires_at is not None][:overflow]:
+            del self._entries[scoped]
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_progress = sum(1 for e in self._entries.values() if e.expires_at is None)
+            return {
+                "keys": len(self._entries),
+                "in_progress": in_progress,
+                "started": self.started,
+                "waited": self.waited,
+                "replayed": self.replayed,
+                "conflicts": self.conflicts,
+            }
+
+
+idempotency_store = IdempotencyStore(settings.idempotency_ttl_s, settings.idempotency_max_entries)
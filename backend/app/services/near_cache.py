@@ -0,0 +1,217 @@
+"""
+Approximate (nearest-neighbour) pick cache: quiz answers that differ from an
+earlier submission only in low-impact fields reuse that submission's picks.
+
+Every stored answer set is a row of small integer codes, one per PickRequest
+field, in a fixed-size NumPy ring buffer. The distance between two answer
+sets is the sum of the weights (NEAR_CACHE_WEIGHTS) of the fields that
+differ; a lookup compares the query against every row in one vectorized
+pass and serves the nearest entry within NEAR_CACHE_MAX_DISTANCE.
+
+Entries come from live generations and, at start-up, from the most recent
+rows of the picks table generated under the same namespace. They are scoped to a namespace (prompt + model
+chain) like the exact pick cache.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+from app.ai.stats import RollingWindow
+from app.core.config import settings
+from app.schemas.picks import PickRequest
+from app.services.pick_cache import canonical_inputs
+from app.services.picks_service import PicksService
+
+logger = logging.getLogger(__name__)
+
+FIELDS = tuple(PickRequest.model_fields)
+_UNKNOWN = -1  # query value never stored: differs from every row
+
+
+@lru_cache(maxsize=8)
+def parse_weights(spec: str) -> np.ndarray:
+    """"budget:10,gender:1,..." → weight per FIELDS entry (unlisted fields weigh 1)."""
+    weights = dict.fromkeys(FIELDS, 1.0)
+    for entry in (e.strip() for e in spec.split(",")):
+        if not entry:
+            continue
+        name, sep, value = entry.partition(":")
+        if not sep or name.strip() not in weights:
+            raise ValueError(f"near cache weight {entry!r} is not '<PickRequest field>:<weight>'")
+        weights[name.strip()] = float(value)
+    return np.array([weights[f] for f in FIELDS], dtype=np.float32)
+
+
+class NearPickCache:
+    """Fixed-capacity ring buffer of (answer codes → picks) with weighted-Hamming lookups."""
+
+    def __init__(self, max_entries: int) -> None:
+        self._lock = threading.Lock()
+        # Per-field value → code, reference-counted by the rows using each code: a value
+        # is forgotten (and its code reused) once its last row is overwritten, so no
+        # vocabulary outgrows the ring buffer
+        self._vocab: dict[str, dict[str, int]] = {f: {} for f in FIELDS}
+        self._names: dict[str, dict[int, str]] = {f: {} for f in FIELDS}
+        self._refs: dict[str, dict[int, int]] = {f: {} for f in FIELDS}
+        self._free: dict[str, list[int]] = {f: [] for f in FIELDS}
+        self._namespaces: dict[str, int] = {}
+        self._codes = np.full((max_entries, len(FIELDS)), _UNKNOWN, dtype=np.int32)
+        self._ns = np.full(max_entries, -1, dtype=np.int32)
+        self._stamps = np.zeros(max_entries, dtype=np.float64)  # 0 = empty slot
+        self._values: list[tuple[list[dict], str] | None] = [None] * max_entries
+        self._next = 0
+        self.lookups = 0
+        self.exact_hits = 0  # distance 0 (the exact pick cache missed, e.g. it was evicted or disabled)
+        self.near_hits = 0
+        self.misses = 0
+        self.loaded = 0  # entries warmed from the picks table
+        self._nearest = RollingWindow()  # distance to the nearest entry, per lookup
+
+    def _encode(self, body: PickRequest) -> np.ndarray:
+        row = np.empty(len(FIELDS), dtype=np.int32)
+        for field, value in canonical_inputs(body):
+            row[FIELDS.index(field)] = self._vocab[field].get(value, _UNKNOWN)
+        return row
+
+    def _acquire_codes(self, body: PickRequest) -> np.ndarray:
+        """Codes for a row being stored, adding values to the vocabularies as needed."""
+        row = np.empty(len(FIELDS), dtype=np.int32)
+        for field, value in canonical_inputs(body):
+            vocab, refs = self._vocab[field], self._refs[field]
+            code = vocab.get(value)
+            if code is None:
+                free = self._free[field]
+                code = free.pop() if free else len(vocab)
+                vocab[value] = code
+                self._names[field][code] = value
+            refs[code] = refs.get(code, 0) + 1
+            row[FIELDS.index(field)] = code
+        return row
+
+    def _release_codes(self, row: np.ndarray) -> None:
+        """Drop an overwritten row's references; values no row uses any more are forgotten."""
+        for field, code in zip(FIELDS, row.tolist()):
+            refs = self._refs[field]
+            if code not in refs:
+                continue
+            refs[code] -= 1
+            if refs[code] == 0:
+                del refs[code]
+                del self._vocab[field][self._names[field].pop(code)]
+                self._free[field].append(code)
+
+    def add(self, body: PickRequest, watches: list[dict], provider: str, namespace: str) -> None:
+        """Store picks for these answers, overwriting the oldest entry when full."""
+        with self._lock:
+            slot = self._next
+            if self._values[slot] is not None:
+                self._release_codes(self._codes[slot])
+            self._codes[slot] = self._acquire_codes(body)
+            self._ns[slot] = self._namespaces.setdefault(namespace, len(self._namespaces))
+            self._stamps[slot] = time.time()
+            self._values[slot] = ([dict(w) for w in watches], provider)
+            self._next = (slot + 1) % len(self._values)
+
+    def get(self, body: PickRequest, namespace: str, record: bool = True) -> tuple[list[dict], str, float] | None:
+        """
+        (watches, provider, distance) of the nearest live entry within the
+        threshold, or None. `record=False` leaves the lookup statistics alone.
+        """
+        weights = parse_weights(settings.near_cache_weights)
+        cutoff = time.time() - settings.near_cache_ttl_hours * 3600
+        with self._lock:
+            self.lookups += record
+            ns = self._namespaces.get(namespace)
+            candidates = np.flatnonzero((self._ns == ns) & (self._stamps > cutoff)) if ns is not None else []
+            if len(candidates) == 0:
+                self.misses += record
+                return None
+            query = self._encode(body)
+            distances = (self._codes[candidates] != query) @ weights
+            # Nearest first, the most recent among equally near entries
+            nearest = np.lexsort((-self._stamps[candidates], distances))[0]
+            best, distance = candidates[nearest], float(distances[nearest])
+            if record:
+                self._nearest.record(distance)
+            if distance > settings.near_cache_max_distance:
+                self.misses += record
+                return None
+            if record and distance == 0:
+                self.exact_hits += 1
+            elif record:
+                self.near_hits += 1
+            watches, provider = self._values[best]
+            return [dict(w) for w in watches], provider, distance
+
+    def warm(self, rows: list[dict], namespace: str) -> int:
+        """Add past {"quiz_inputs", "results"} rows (oldest first, so the newest win ties)."""
+        added = 0
+        for row in reversed(rows):
+            try:
+                body = PickRequest(**row["quiz_inputs"])
+            except Exception:
+                continue
+            if row.get("results"):
+                self.add(body, row["results"], "history", namespace)
+                added += 1
+        self.loaded += added
+        return added
+
+    async def awarm_from_history(self, namespace: str) -> None:
+        """Load the most recent live picks saved under `namespace` from Supabase (start-up; failures are only logged)."""
+        if not settings.near_cache_enabled or settings.near_cache_warm_limit <= 0:
+            return
+        try:
+            rows = await run_in_threadpool(PicksService().recent_results, namespace, settings.near_cache_warm_limit)
+        except Exception as exc:
+            logger.warning("Near cache warm-up skipped: %s", exc)
+            return
+        added = self.warm(rows, namespace)
+        logger.info("Near cache warmed with %d past picks", added)
+
+    def clear(self) -> None:
+        with self._lock:
+            for table in (self._vocab, self._names, self._refs, self._free):
+                for field in FIELDS:
+                    table[field].clear()
+            self._codes[:] = _UNKNOWN
+            self._stamps[:] = 0
+            self._ns[:] = -1
+            self._values = [None] * len(self._values)
+            self._next = 0
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.near_hits
+
+        def pct(p: float) -> float | None:
+            value = self._nearest.percentile(p)
+            return round(value, 2) if value is not None else None
+
+        return {
+            "enabled": settings.near_cache_enabled,
+            "entries": int(np.count_nonzero(self._stamps)),
+            "vocabulary": sum(len(v) for v in self._vocab.values()),
+            "capacity": len(self._values),
+            "loaded_from_history": self.loaded,
+            "max_distance": settings.near_cache_max_distance,
+            "weights": dict(zip(FIELDS, parse_weights(settings.near_cache_weights).tolist())),
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / self.lookups, 3) if self.lookups else None,
+            "near_hit_rate": round(self.near_hits / self.lookups, 3) if self.lookups else None,
+            # Where the nearest entry usually sits, to tune max_distance against
+            "nearest_distance_p50": pct(50),
+            "nearest_distance_p90": pct(90),
+        }
+
+
+near_pick_cache = NearPickCache(settings.near_cache_max_entries)
@@ -0,0 +1,34 @@
+"""Exact-match cache for generated picks, keyed on canonical quiz answers."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from functools import lru_cache
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.schemas.picks import PickRequest
+
+pick_cache = LRUCache(
+    max_entries=settings.pick_cache_max_entries,
+    max_bytes=settings.pick_cache_max_mb * 1024 * 1024,
+    ttl_seconds=settings.pick_cache_ttl_seconds,
+)
+
+
+def canonical_inputs(body: PickRequest) -> tuple[tuple[str, str], ...]:
+    """Quiz answers as a sorted tuple of (field, whitespace-normalised value)."""
+    return tuple(sorted((k, " ".join(str(v or "").split())) for k, v in body.model_dump().items()))
+
+
+@lru_cache(maxsize=8)
+def prompt_hash(system_prompt: str) -> str:
+    """Short stable hash of a system prompt (used to invalidate stored picks)."""
+    return hashlib.sha256(system_prompt.encode()).hexdigest()[:16]
+
+
+def pick_cache_key(body: PickRequest, system_prompt: str, model_signature: str) -> str:
+    """Cache key: canonical answers + system prompt hash + provider/model chain."""
+    raw = json.dumps([canonical_inputs(body), prompt_hash(system_prompt), model_signature])
+    return hashlib.sha256(raw.encode()).hexdigest()
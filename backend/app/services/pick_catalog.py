@@ -0,0 +1,137 @@
+"""
+Precomputed pick catalog: validated picks for (a subset of) the full quiz
+option space, generated offline by `python -m app.jobs.precompute_picks`.
+
+Rows live in a local SQLite file (watches stored as zlib-compressed JSON) and
+are loaded into a dict on first use, so a lookup on the request path is a
+hash-map hit plus a small decompress — no I/O.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Iterable
+
+from app.core.config import settings
+from app.schemas.picks import PickRequest
+from app.services.pick_cache import canonical_inputs
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS picks (
+    key TEXT PRIMARY KEY,
+    inputs TEXT NOT NULL,
+    watches BLOB NOT NULL,
+    provider TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+def catalog_key(body: PickRequest) -> str:
+    """Compact key: canonical answer values in field-name order, unit-separated."""
+    return "\x1f".join(value for _, value in canonical_inputs(body))
+
+
+class PickCatalog:
+    """Read-mostly store of precomputed picks keyed by canonical quiz answers."""
+
+    def __init__(self, path: str | Path) -> None:
+        path = Path(path)
+        self.path = path if path.is_absolute() else _BACKEND_DIR / path
+        self._entries: dict[str, tuple[str, str, bytes]] = {}  # key → (fingerprint, provider, blob)
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute(_SCHEMA)
+        return conn
+
+    def load(self) -> None:
+        """(Re)load every row into memory. A missing file means an empty catalog."""
+        entries: dict[str, tuple[str, str, bytes]] = {}
+        if self.path.exists():
+            with self._connect() as conn:
+                for key, fingerprint, provider, blob in conn.execute(
+                    "SELECT key, fingerprint, provider, watches FROM picks"
+                ):
+                    entries[key] = (fingerprint, provider, blob)
+        with self._lock:
+            self._entries = entries
+            self._loaded = True
+        logger.info("Pick catalog loaded: %d entries from %s", len(entries), self.path)
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load()
+
+    def get(self, body: PickRequest, fingerprint: str, record: bool = True) -> tuple[list[dict], str] | None:
+        """Return (watches, provider) if a fresh entry exists for these answers (`record=False`: not counted)."""
+        self._ensure_loaded()
+        entry = self._entries.get(catalog_key(body))
+        if entry is None or entry[0] != fingerprint:
+            self.misses += record
+            return None
+        self.hits += record
+        return json.loads(zlib.decompress(entry[2])), entry[1]
+
+    def put(self, body: PickRequest, watches: list[dict], provider: str, fingerprint: str) -> None:
+        """Insert or replace one entry (committed immediately, so batch jobs can resume)."""
+        key = catalog_key(body)
+        blob = zlib.compress(json.dumps(watches, ensure_ascii=False, separators=(",", ":")).encode(), 9)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO picks (key, inputs, watches, provider, fingerprint, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(body.model_dump(), ensure_ascii=False), blob, provider, fingerprint, time.time()),
+            )
+        with self._lock:
+            self._entries[key] = (fingerprint, provider, blob)
+
+    def is_fresh(self, body: PickRequest, fingerprint: str) -> bool:
+        self._ensure_loaded()
+        entry = self._entries.get(catalog_key(body))
+        return entry is not None and entry[0] == fingerprint
+
+    def prune(self, keep: Iterable[PickRequest]) -> int:
+        """Delete entries whose answers are no longer in the quiz option space."""
+        self._ensure_loaded()
+        keep_keys = {catalog_key(b) for b in keep}
+        stale = [k for k in self._entries if k not in keep_keys]
+        if stale:
+            with self._connect() as conn:
+                conn.executemany("DELETE FROM picks WHERE key = ?", [(k,) for k in stale])
+            with self._lock:
+                for k in stale:
+                    self._entries.pop(k, None)
+        return len(stale)
+
+    def stats(self, fingerprint: str | None = None) -> dict:
+        self._ensure_loaded()
+        data = {
+            "path": str(self.path),
+            "entries": len(self._entries),
+            "bytes": sum(len(blob) for _, _, blob in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+        if fingerprint is not None:
+            data["fresh_entries"] = sum(1 for fp, _, _ in self._entries.values() if fp == fingerprint)
+        return data
+
+
+pick_catalog = PickCatalog(settings.pick_catalog_path)
@@ -0,0 +1,289 @@
+"""
+Asynchronous pick jobs: POST /picks/jobs enqueues a PickRequest and returns
+at once; an in-process worker pool generates the picks, saves them through
+PicksService.save_picks, and clients poll GET /picks/jobs/{id} or wait on
+the /ws/picks/jobs/{id} WebSocket.
+
+Jobs are stored in a local SQLite file, so queued work survives a restart:
+on start-up, jobs that were queued or still running are picked up again.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from app.ai.stats import RollingWindow
+from app.core.config import settings
+from app.schemas.picks import PickRequest
+from app.services.ai_service import agenerate_watch_picks, history_namespace
+from app.services.picks_service import PicksService
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    fresh INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    error_status INTEGER,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+)
+"""
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+
+class PickJobStore:
+    """SQLite persistence for pick jobs (one short transaction per call)."""
+
+    def __init__(self, path: str | Path) -> None:
+        path = Path(path)
+        self.path = path if path.is_absolute() else _BACKEND_DIR / path
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        conn.execute(_SCHEMA)
+        return conn
+
+    def insert(self, job_id: str, user_id: str, inputs: dict, fresh: bool) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, user_id, inputs, fresh, status, enqueued_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, user_id, json.dumps(inputs), int(fresh), QUEUED, time.time()),
+            )
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def mark_running(self, job_id: str) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?", (RUNNING, time.time(), job_id))
+
+    def mark_finished(
+        self, job_id: str, result: dict | None = None, error: str | None = None, error_status: int | None = None,
+    ) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, error_status = ?, finished_at = ? WHERE id = ?",
+                (
+                    FAILED if error else DONE,
+                    json.dumps(result) if result is not None else None,
+                    error, error_status, time.time(), job_id,
+                ),
+            )
+
+    def requeue_unfinished(self) -> list[str]:
+        """Reset jobs interrupted mid-run and return every queued id, oldest first."""
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?", (QUEUED, RUNNING))
+            rows = conn.execute("SELECT id FROM jobs WHERE status = ? ORDER BY enqueued_at", (QUEUED,)).fetchall()
+        return [row["id"] for row in rows]
+
+    def prune(self, older_than_s: float) -> int:
+        """Delete finished jobs older than the retention window."""
+        with self._lock, self._connect() as conn:
+            cur = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (*FINISHED, time.time() - older_than_s),
+            )
+        return cur.rowcount
+
+
+def _row_to_job(row: sqlite3.Row) -> dict:
+    job = dict(row)
+    job["inputs"] = json.loads(job["inputs"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["fresh"] = bool(job["fresh"])
+    return job
+
+
+def public_job(job: dict) -> dict:
+    """The job fields returned to its owner."""
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "result": job["result"],
+        "error": job["error"],
+        "enqueued_at": job["enqueued_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
+
+
+class PickJobRunner:
+    """Worker pool over a PickJobStore, with per-job change notifications."""
+
+    def __init__(self, store: PickJobStore, workers: int = 4, max_queued: int = 1000) -> None:
+        self.store = store
+        self._workers = workers
+        self._max_queued = max_queued
+        self._queue: asyncio.Queue[str] | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_time = RollingWindow()  # seconds from enqueue to start
+        self.run_time = RollingWindow()  # seconds from start to finish
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        pruned = await asyncio.to_thread(self.store.prune, settings.pick_jobs_retention_hours * 3600)
+        pending = await asyncio.to_thread(self.store.requeue_unfinished)
+        for job_id in pending:
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self._workers)]
+        logger.info("Pick job workers started: %d workers, %d jobs resumed, %d pruned", self._workers, len(pending), pruned)
+
+    async def stop(self) -> None:
+        """Cancel the workers; jobs cut off mid-run are resumed on the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, user_id: str, body: PickRequest, fresh: bool = False) -> dict:
+        if self._queue is None:
+            raise HTTPException(status_code=503, detail="Pick jobs are not running")
+        if self._queue.qsize() >= self._max_queued:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Pick job queue is full, try again shortly")
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(self.store.insert, job_id, user_id, body.model_dump(), fresh)
+        self._queue.put_nowait(job_id)
+        return {"job_id": job_id, "status": QUEUED, "queue_depth": self._queue.qsize()}
+
+    async def get(self, job_id: str, user_id: str) -> dict | None:
+        """The job, if it exists and belongs to `user_id`."""
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or job["user_id"] != user_id:
+            return None
+        return job
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        """A queue that receives the job's public view on every status change."""
+        updates: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(updates)
+        return updates
+
+    def unsubscribe(self, job_id: str, updates: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(updates)
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    async def _publish(self, job_id: str) -> None:
+        if job_id not in self._subscribers:
+            return
+        job = await asyncio.to_thread(self.store.get, job_id)
+        for updates in self._subscribers.get(job_id, ()):
+            updates.put_nowait(public_job(job))
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        while True:
+            job_id = await self._queue.get()
+            self._running += 1
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception("Pick job %s crashed", job_id)
+            finally:
+                self._running -= 1
+
+    async def _run(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or job["status"] in FINISHED:
+            return
+        await asyncio.to_thread(self.store.mark_running, job_id)
+        started = time.time()
+        self.wait_time.record(started - job["enqueued_at"])
+        await self._publish(job_id)
+
+        body = PickRequest.model_validate(job["inputs"])
+        try:
+            watches, generation = await agenerate_watch_picks(
+                body, fresh=job["fresh"], deadline_s=settings.pick_jobs_deadline_s,
+            )
+            record = await asyncio.to_thread(
+                PicksService().save_picks, job["user_id"], job["inputs"], watches, generation.tokens_used,
+                history_namespace(generation),
+            )
+        except HTTPException as exc:
+            self.failed += 1
+            await asyncio.to_thread(self.store.mark_finished, job_id, None, str(exc.detail), exc.status_code)
+        except Exception:
+            logger.exception("Pick job %s failed", job_id)
+            self.failed += 1
+            await asyncio.to_thread(self.store.mark_finished, job_id, None, "Pick generation failed", 500)
+        else:
+            self.completed += 1
+            result = {
+                "watches": watches,
+                "provider": generation.provider,
+                "hedged": generation.hedged,
+                "cached": generation.cached,
+                "source": generation.source,
+                "tokens_used": generation.tokens_used,
+                "pick_id": record.get("id") if record else None,
+            }
+            await asyncio.to_thread(self.store.mark_finished, job_id, result)
+        self.run_time.record(time.time() - started)
+        await self._publish(job_id)
+
+    def stats(self) -> dict:
+        def ms(window: RollingWindow, pct: float) -> int | None:
+            value = window.percentile(pct)
+            return round(value * 1000) if value is not None else None
+
+        return {
+            "workers": self._workers,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "in_progress": self._running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait_ms_p50": ms(self.wait_time, 50),
+            "wait_ms_p95": ms(self.wait_time, 95),
+            "run_ms_p50": ms(self.run_time, 50),
+            "run_ms_p95": ms(self.run_time, 95),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+        }
+
+
+pick_jobs = PickJobRunner(
+    PickJobStore(settings.pick_jobs_path),
+    workers=settings.pick_jobs_workers,
+    max_queued=settings.pick_jobs_max_queued,
+)
@@ -0,0 +1,264 @@
+"""
+Speculative pick pre-generation: while the user is still answering the
+quiz, POST /picks/speculate sends the answers known so far. The most likely
+completions of the remaining steps (ranked by answer frequencies in
+picks.quiz_inputs) are generated in the background, and /picks/generate
+claims the matching result — finished or still in flight — instead of
+starting its own call.
+
+Spend is bounded globally: at most speculation_max_inflight generations at a
+time and speculation_budget_per_hour started per hour. Unclaimed results are
+dropped after speculation_ttl_s.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+
+from starlette.concurrency import run_in_threadpool
+
+from app.ai import ai_factory
+from app.ai.base import GenerationResult
+from app.ai.deadline import Deadline
+from app.core.config import settings
+from app.schemas.picks import PickRequest
+from app.services.ai_service import agenerate_watch_picks, prompt_fingerprint, stored_picks
+from app.services.pick_cache import pick_cache_key
+from app.services.picks_service import PicksService
+from app.services.quiz_service import get_quiz_content
+
+logger = logging.getLogger(__name__)
+
+QUIZ_FIELDS = tuple(PickRequest.model_fields)
+
+
+class AnswerModel:
+    """
+    Per-field answer frequencies (add-one smoothed over the quiz options),
+    treating fields as independent: P(completion) is the product of the
+    probabilities of the missing answers.
+    """
+
+    def __init__(self, space: dict[str, list[str]], history: list[dict]) -> None:
+        counts = {f: Counter() for f in QUIZ_FIELDS}
+        for inputs in history:
+            for f in QUIZ_FIELDS:
+                if inputs.get(f):
+                    counts[f][inputs[f]] += 1
+        self.samples = len(history)
+        self._probs: dict[str, list[tuple[float, str]]] = {}
+        for f in QUIZ_FIELDS:
+            # Quiz options, plus answers seen in history (e.g. options since removed from the quiz)
+            values = list(dict.fromkeys([*space.get(f, []), *counts[f]]))
+            total = sum(counts[f][v] for v in values)
+            self._probs[f] = sorted(
+                (((counts[f][v] + 1) / (total + len(values)), v) for v in values),
+                key=lambda pv: pv[0], reverse=True,
+            )
+
+    def completions(self, partial: dict, n: int, min_probability: float = 0.0) -> list[tuple[float, PickRequest]]:
+        """
+        The `n` most likely full answer sets extending `partial`, most likely
+        first, as (probability, PickRequest). Fields without any known option
+        can't be completed (returns []).
+        """
+        missing = [f for f in QUIZ_FIELDS if not partial.get(f)]
+        # The n best completions only use each field's n most likely answers
+        choices = [self._probs[f][:n] for f in missing]
+        if any(not c for c in choices):
+            return []
+        scored = (
+            (math.prod(p for p, _ in combo), [v for _, v in combo])
+            for combo in itertools.product(*choices)
+        )
+        best = heapq.nlargest(n, scored, key=lambda item: item[0])
+        return [
+            (p, PickRequest(**{**{f: partial[f] for f in QUIZ_FIELDS if partial.get(f)}, **dict(zip(missing, values))}))
+            for p, values in best
+            if p >= min_probability
+        ]
+
+
+@dataclass
+class _Speculation:
+    task: asyncio.Task
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: float | None = None
+
+
+class PickSpeculator:
+    """Starts, tracks and hands out speculative generations (one per answer set)."""
+
+    def __init__(self) -> None:
+        self._model: AnswerModel | None = None
+        self._model_at = 0.0
+        self._model_lock = asyncio.Lock()
+        self._entries: dict[str, _Speculation] = {}
+        self._started: deque[float] = deque()  # start times within the last hour (budget)
+        self.requests = 0  # /speculate calls
+        self.started = 0
+        self.already_stored = 0  # completions the catalog / pick cache already covers
+        self.over_budget = 0  # completions skipped by the in-flight or hourly cap
+        self.failed = 0
+        self.expired = 0  # finished but never claimed
+        self.lookups = 0  # /generate requests checked
+        self.hits_inflight = 0
+        self.hits_ready = 0
+        self.tokens_spent = 0
+        self.tokens_wasted = 0  # tokens of expired (unclaimed) results
+
+    @staticmethod
+    def _key(body: PickRequest) -> str:
+        return pick_cache_key(body, prompt_fingerprint(), ai_factory.signature)
+
+    async def _answer_model(self) -> AnswerModel:
+        """The frequency model, reloaded from Supabase every speculation_refresh_s."""
+        async with self._model_lock:
+            if self._model is None or time.monotonic() - self._model_at > settings.speculation_refresh_s:
+                try:
+                    steps = await run_in_threadpool(get_quiz_content)
+                    history = await run_in_threadpool(
+                        PicksService().recent_quiz_inputs, settings.speculation_history,
+                    )
+                except Exception as exc:
+                    logger.warning("Could not load quiz answer frequencies: %s", exc)
+                    steps, history = [], []
+                space = {s["key"]: [o["api_value"] for o in s.get("options", [])] for s in steps}
+                self._model = AnswerModel(space, history)
+                self._model_at = time.monotonic()
+            return self._model
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._started and now - self._started[0] > 3600:
+            self._started.popleft()
+        for key, entry in list(self._entries.items()):
+            if entry.finished_at is not None and now - entry.finished_at > settings.speculation_ttl_s:
+                del self._entries[key]
+                self.expired += 1
+                self.tokens_wasted += entry.task.result()[1].tokens_used or 0
+
+    def _in_flight(self) -> int:
+        return sum(1 for e in self._entries.values() if e.finished_at is None)
+
+    async def speculate(self, partial: dict) -> dict:
+        """Start generations for the likeliest completions of `partial`; returns what was done."""
+        if not settings.speculation_enabled or not ai_factory.available:
+            return {"enabled": False, "started": 0}
+        self.requests += 1
+        partial = {f: v for f, v in partial.items() if f in QUIZ_FIELDS and v}
+        model = await self._answer_model()
+        self._expire()
+        started = 0
+        for probability, body in model.completions(
+            partial, settings.speculation_completions, settings.speculation_min_probability,
+        ):
+            key = self._key(body)
+            if key in self._entries:
+                continue
+            if stored_picks(body, record=False) is not None:  # not a user lookup: keep cache stats clean
+                self.already_stored += 1
+                continue
+            if (
+                self._in_flight() >= settings.speculation_max_inflight
+                or len(self._started) >= settings.speculation_budget_per_hour
+            ):
+                self.over_budget += 1
+                break
+            self._start(key, body)
+            started += 1
+            logger.debug("Speculating on %s (p=%.3f)", body.model_dump(), probability)
+        return {"enabled": True, "started": started}
+
+    def _start(self, key: str, body: PickRequest) -> None:
+        # fresh: speculate() just checked the stores (uncounted); the result still fills the caches
+        task = asyncio.create_task(
+            agenerate_watch_picks(body, fresh=True, deadline_s=settings.ai_deadline_generate_s),
+        )
+        entry = _Speculation(task)
+        self._entries[key] = entry
+        self._started.append(entry.started_at)
+        self.started += 1
+
+        def finished(t: asyncio.Task) -> None:
+            if t.cancelled() or t.exception() is not None:
+                self.failed += not t.cancelled()
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+                return
+            entry.finished_at = time.monotonic()
+            self.tokens_spent += t.result()[1].tokens_used or 0
+
+        task.add_done_callback(finished)
+
+    async def claim(self, body: PickRequest, deadline: Deadline) -> tuple[list[dict], GenerationResult] | None:
+        """
+        The speculative result for these exact answers, waiting (within
+        `deadline`) for one still in flight. None when there is none or it
+        failed — the caller then generates as usual.
+        """
+        if not settings.speculation_enabled:
+            return None
+        self.lookups += 1
+        self._expire()
+        key = self._key(body)
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        ready = entry.finished_at is not None
+        try:
+            result = await asyncio.wait_for(
+                asyncio.shield(entry.task), deadline.remaining() if deadline.bounded else None,
+            )
+        except Exception as exc:
+            logger.info("Speculative generation not usable: %s", exc)
+            return None
+        if ready:
+            self.hits_ready += 1
+        else:
+            self.hits_inflight += 1
+        return result
+
+    async def stop(self) -> None:
+        """Cancel speculative generations still running (shutdown)."""
+        tasks = [e.task for e in self._entries.values() if not e.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        self._expire()
+        hits = self.hits_inflight + self.hits_ready
+        return {
+            "enabled": settings.speculation_enabled,
+            "history_samples": self._model.samples if self._model else None,
+            "requests": self.requests,
+            "started": self.started,
+            "started_last_hour": len(self._started),
+            "budget_per_hour": settings.speculation_budget_per_hour,
+            "in_flight": self._in_flight(),
+            "ready": len(self._entries) - self._in_flight(),
+            "already_stored": self.already_stored,
+            "over_budget": self.over_budget,
+            "failed": self.failed,
+            "expired": self.expired,
+            "lookups": self.lookups,
+            "hits_inflight": self.hits_inflight,
+            "hits_ready": self.hits_ready,
+            # Share of speculative generations that served a request / of requests served by one
+            "hit_rate": round(hits / self.started, 3) if self.started else None,
+            "coverage": round(hits / self.lookups, 3) if self.lookups else None,
+            "tokens_spent": self.tokens_spent,
+            "tokens_wasted": self.tokens_wasted,
+        }
+
+
+pick_speculator = PickSpeculator()
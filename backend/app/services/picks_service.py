@@ -11,9 +11,18 @@ class PicksService:
     def __init__(self, repository: PicksRepository | None = None):
         self._repo = repository or PicksRepository()
 
-    def save_picks(self, user_id: str, quiz_inputs: dict, results: list[dict]) -> dict | None:
-        """Save a new pick. Returns created record."""
-        return self._repo.create(user_id, quiz_inputs, results)
+    def save_picks(
+        self,
+        user_id: str,
+        quiz_inputs: dict,
+        results: list[dict],
+        tokens_used: int | None = None,
+        cache_namespace: str | None = None,
+    ) -> dict | None:
+        """Save a new pick (with the AI tokens it cost and, if live, its cache namespace). Returns created record."""
+        return self._repo.create(
+            user_id, quiz_inputs, results, tokens_used=tokens_used, cache_namespace=cache_namespace,
+        )
 
     def get_history(self, user_id: str, limit: int = 50, offset: int = 0) -> list[dict]:
         """Get paginated pick history for a user."""
@@ -26,3 +35,11 @@ class PicksService:
     def count_user_picks(self, user_id: str) -> int:
         """Count picks for a user."""
         return self._repo.count_by_user(user_id)
+
+    def recent_quiz_inputs(self, limit: int = 5000) -> list[dict]:
+        """Most recent quiz answers across all users."""
+        return self._repo.list_quiz_inputs(limit=limit)
+
+    def recent_results(self, cache_namespace: str, limit: int = 5000) -> list[dict]:
+        """Most recent quiz answers with the picks generated for them under `cache_namespace`, newest first."""
+        return self._repo.list_recent_results(cache_namespace, limit=limit)
@@ -0,0 +1,283 @@
+"""
+Local watch catalog: real watch records plus a NumPy feature matrix, used to
+ground AI picks in a shortlist of existing models.
+
+The catalog is a versioned directory built by `python -m app.jobs.build_watch_catalog`:
+
+    manifest.json   {"format": FORMAT, "version": <content hash>, "columns": [...], "count": N}
+    watches.json    the records, in matrix row order
+    features.npy    float32 matrix, one row per watch (memory-mapped on load)
+
+shortlist() turns quiz answers into a weight vector over the same columns and
+scores every watch with one matrix-vector product, so a lookup stays in the
+low milliseconds even for tens of thousands of rows.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import settings
+from app.schemas.picks import PickRequest
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+
+# Bump when COLUMNS or the encoding below changes; older builds are ignored
+FORMAT = 1
+
+# Budget bands in quiz order (USD, upper bound exclusive)
+BUDGET_BANDS = {
+    "Under $200": (0, 200),
+    "$200–$500": (200, 500),
+    "$500–$2,000": (500, 2_000),
+    "$2,000–$5,000": (2_000, 5_000),
+    "$5,000+": (5_000, float("inf")),
+}
+MOVEMENTS = ("automatic", "manual", "quartz", "solar", "smart")
+STYLES = ("classic", "dress", "modern", "bold", "luxury", "sport", "field", "casual")
+TIERS = ("budget", "mid", "luxury")
+GENDERS = ("men", "women", "unisex")
+
+COLUMNS = (
+    *(f"budget:{band}" for band in BUDGET_BANDS),
+    "size:small", "size:medium", "size:large",
+    "movement:automatic", "movement:manual", "movement:quartz", "smart",
+    *(f"style:{style}" for style in STYLES),
+    *(f"tier:{tier}" for tier in TIERS),
+    *(f"gender:{gender}" for gender in GENDERS),
+)
+_COL = {name: i for i, name in enumerate(COLUMNS)}
+
+# Quiz answer → column weights. Unknown answers (free text) add nothing.
+_OCCASION = {
+    "Daily Wear": {"style:casual": 1.0, "style:classic": 0.5, "style:field": 0.5},
+    "Business": {"style:dress": 1.0, "style:classic": 1.0},
+    "Sport & Outdoor": {"style:sport": 1.5, "style:field": 1.0},
+    "Formal Events": {"style:dress": 1.5, "style:luxury": 0.5},
+    "Gift for Someone": {"style:classic": 1.0},
+}
+_STYLE = {
+    "Classic & Timeless": {"style:classic": 1.5, "style:dress": 0.5},
+    "Modern & Minimal": {"style:modern": 1.5},
+    "Bold & Statement": {"style:bold": 1.5, "style:sport": 0.5},
+    "Luxury & Prestigious": {"style:luxury": 1.5, "tier:luxury": 1.0},
+}
+_MOVEMENT = {
+    "Automatic": {"movement:automatic": 1.5},
+    "Manual Wind": {"movement:manual": 1.5, "movement:automatic": 0.5},
+    "Quartz": {"movement:quartz": 1.5},
+}
+_WRIST = {
+    'Small (under 6.5")': {"size:small": 1.5, "size:medium": 0.5, "size:large": -1.0},
+    'Medium (6.5"–7.5")': {"size:medium": 1.5, "size:small": 0.5, "size:large": 0.5},
+    'Large (over 7.5")': {"size:large": 1.5, "size:medium": 0.5, "size:small": -1.0},
+}
+_GENDER = {
+    "Men's": {"gender:men": 1.0, "gender:unisex": 0.75, "gender:women": -2.0},
+    "Women's": {"gender:women": 1.0, "gender:unisex": 0.75, "gender:men": -2.0},
+    "Unisex": {"gender:unisex": 1.0},
+}
+_BRANDS = {
+    "Luxury only (Rolex, Omega, etc.)": {"tier:luxury": 3.0, "tier:mid": -1.0, "tier:budget": -3.0},
+    "Mid-range (Tissot, Seiko, etc.)": {"tier:mid": 2.0},
+    "Budget friendly": {"tier:budget": 2.0, "tier:luxury": -2.0},
+    "No smartwatches please": {"smart": -10.0},
+}
+# A watch priced in the chosen band beats everything else on the list
+_BUDGET_MATCH, _BUDGET_NEAR, _BUDGET_FAR = 4.0, 1.0, -4.0
+
+
+def size_class(case_mm: float) -> str:
+    if case_mm < 37:
+        return "small"
+    return "medium" if case_mm < 42 else "large"
+
+
+def format_price(low: float, high: float) -> str:
+    return f"${low:,.0f}–${high:,.0f}"
+
+
+def encode(record: dict) -> np.ndarray:
+    """Feature row for one watch record."""
+    row = np.zeros(len(COLUMNS), dtype=np.float32)
+    low, high = record["price_min"], record["price_max"]
+    for band, (band_low, band_high) in BUDGET_BANDS.items():
+        if low < band_high and high >= band_low:
+            row[_COL[f"budget:{band}"]] = 1.0
+    row[_COL[f"size:{size_class(record['case_mm'])}"]] = 1.0
+    movement = record["movement"]
+    if movement == "smart":
+        row[_COL["smart"]] = 1.0
+    else:
+        row[_COL["movement:quartz" if movement == "solar" else f"movement:{movement}"]] = 1.0
+    for style in record.get("styles", ()):
+        if f"style:{style}" in _COL:
+            row[_COL[f"style:{style}"]] = 1.0
+    row[_COL[f"tier:{record['tier']}"]] = 1.0
+    row[_COL[f"gender:{record.get('gender', 'unisex')}"]] = 1.0
+    return row
+
+
+def query_vector(body: PickRequest) -> np.ndarray:
+    """Column weights expressing one set of quiz answers."""
+    q = np.zeros(len(COLUMNS), dtype=np.float32)
+    bands = list(BUDGET_BANDS)
+    if body.budget in BUDGET_BANDS:
+        chosen = bands.index(body.budget)
+        for i, band in enumerate(bands):
+            distance = abs(i - chosen)
+            q[_COL[f"budget:{band}"]] = _BUDGET_MATCH if distance == 0 else _BUDGET_NEAR if distance == 1 else _BUDGET_FAR
+    for table, answer in (
+        (_OCCASION, body.occasion),
+        (_STYLE, body.style),
+        (_MOVEMENT, body.movementType),
+        (_WRIST, body.wristSize),
+        (_GENDER, body.gender),
+        (_BRANDS, body.brandOpenness),
+    ):
+        for column, weight in table.get(answer, {}).items():
+            q[_COL[column]] += weight
+    return q
+
+
+def validate_record(record: dict) -> None:
+    """Raise ValueError if a source record can't be encoded."""
+    for field in ("id", "brand", "model", "price_min", "price_max", "case_mm", "movement", "tier"):
+        if field not in record:
+            raise ValueError(f"watch {record.get('id', '?')}: missing {field}")
+    if record["movement"] not in MOVEMENTS:
+        raise ValueError(f"watch {record['id']}: unknown movement {record['movement']!r}")
+    if record["tier"] not in TIERS:
+        raise ValueError(f"watch {record['id']}: unknown tier {record['tier']!r}")
+    if record.get("gender", "unisex") not in GENDERS:
+        raise ValueError(f"watch {record['id']}: unknown gender {record['gender']!r}")
+    if record["price_min"] > record["price_max"]:
+        raise ValueError(f"watch {record['id']}: price_min above price_max")
+
+
+def build(records: list[dict], out_dir: str | Path) -> dict:
+    """Write a catalog directory from source records. Returns the manifest."""
+    out_dir = Path(out_dir)
+    ids = set()
+    for record in records:
+        validate_record(record)
+        if record["id"] in ids:
+            raise ValueError(f"duplicate watch id {record['id']}")
+        ids.add(record["id"])
+    matrix = np.stack([encode(r) for r in records]) if records else np.zeros((0, len(COLUMNS)), np.float32)
+    payload = json.dumps(records, ensure_ascii=False, sort_keys=True)
+    manifest = {
+        "format": FORMAT,
+        "version": hashlib.sha256(payload.encode()).hexdigest()[:12],
+        "columns": list(COLUMNS),
+        "count": len(records),
+        "built_at": time.time(),
+    }
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / "watches.json").write_text(payload, encoding="utf-8")
+    np.save(out_dir / "features.npy", matrix)
+    # Written last: a directory without a matching manifest is never loaded
+    (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest
+
+
+class WatchCatalog:
+    """Read-only catalog loaded lazily from a build directory."""
+
+    def __init__(self, path: str | Path) -> None:
+        path = Path(path)
+        self.path = path if path.is_absolute() else _BACKEND_DIR / path
+        self.version: str | None = None
+        self._records: list[dict] = []
+        self._by_id: dict[str, dict] = {}
+        self._features: np.ndarray = np.zeros((0, len(COLUMNS)), np.float32)
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.lookups = 0
+
+    def load(self) -> None:
+        """(Re)load the build directory. Missing or outdated builds mean an empty catalog."""
+        version, records = None, []
+        features = np.zeros((0, len(COLUMNS)), np.float32)
+        manifest_path = self.path / "manifest.json"
+        if manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            if manifest.get("format") != FORMAT or manifest.get("columns") != list(COLUMNS):
+                logger.warning(
+                    "Watch catalog at %s is format %s, expected %s — rebuild it", self.path, manifest.get("format"), FORMAT,
+                )
+            else:
+                records = json.loads((self.path / "watches.json").read_text(encoding="utf-8"))
+                features = np.load(self.path / "features.npy", mmap_mode="r")
+                if features.shape != (len(records), len(COLUMNS)):
+                    logger.warning("Watch catalog at %s has a mismatched feature matrix — rebuild it", self.path)
+                    records, features = [], np.zeros((0, len(COLUMNS)), np.float32)
+                else:
+                    version = manifest["version"]
+        with self._lock:
+            self.version = version
+            self._records = records
+            self._by_id = {r["id"]: r for r in records}
+            self._features = features
+            self._loaded = True
+        logger.info("Watch catalog loaded: %d watches (version %s) from %s", len(records), version, self.path)
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load()
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._records)
+
+    def get(self, watch_id: str) -> dict | None:
+        self._ensure_loaded()
+        return self._by_id.get(watch_id)
+
+    def shortlist(self, body: PickRequest, n: int) -> list[dict]:
+        """The `n` best-matching records for these answers, best first (ties by catalog order)."""
+        self._ensure_loaded()
+        with self._lock:
+            records, features = self._records, self._features
+        if not records:
+            return []
+        self.lookups += 1
+        scores = features @ query_vector(body)
+        n = min(n, len(records))
+        if n < len(records):
+            top = np.argpartition(-scores, n - 1)[:n]
+        else:
+            top = np.arange(len(records))
+        order = top[np.lexsort((top, -scores[top]))]
+        return [records[i] for i in order]
+
+    def stats(self) -> dict:
+        self._ensure_loaded()
+        return {"path": str(self.path), "version": self.version, "watches": len(self._records), "lookups": self.lookups}
+
+
+def watch_name(record: dict) -> str:
+    return f"{record['brand']} {record['model']}"
+
+
+def watch_pick(record: dict, reason: str) -> dict:
+    """A WatchPick dict for a catalog record; everything but the reason comes from the catalog."""
+    return {
+        "name": watch_name(record),
+        "brand": record["brand"],
+        "price_range": format_price(record["price_min"], record["price_max"]),
+        "case_size": f"{record['case_mm']:g}mm",
+        "reason": reason,
+    }
+
+
+watch_catalog = WatchCatalog(settings.watch_catalog_path)
@@ -0,0 +1,111 @@
+"""
+Load-test AIClientFactory against FakeProviders (no API keys, no cost).
+
+    cd backend && python -m benchmarks.bench_factory
+    python -m benchmarks.bench_factory --requests 2000 --concurrency 100 --hedge
+    python -m benchmarks.bench_factory --error-rate 0.2 --malformed-rate 0.05 --latency histogram \\
+        --histogram "300:20,800:60,4000:20"
+
+Reports throughput, end-to-end latency percentiles, which provider answered
+(fallback depth), how often hedging fired and the factory's per-provider
+usage stats. The fake_* settings are overridden from the command line.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import Counter
+
+from fastapi import HTTPException
+
+from app.ai.factory import AIClientFactory
+from app.core.config import settings
+from app.schemas.picks import CompactRow
+from app.services.ai_service import SYSTEM_PROMPT, parse_watches
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+async def run(factory: AIClientFactory, requests: int, concurrency: int, distinct: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    providers: Counter[str] = Counter()
+    failures: Counter[int] = Counter()
+    hedged = 0
+
+    async def one(i: int) -> None:
+        nonlocal hedged
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await factory.agenerate(
+                    SYSTEM_PROMPT, f"Request {i % distinct}", validate=parse_watches,
+                    deadline_s=settings.ai_deadline_generate_s, schema=CompactRow,
+                )
+            except HTTPException as exc:
+                failures[exc.status_code] += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            providers[result.provider] += 1
+            hedged += result.hedged
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(requests / elapsed, 1),
+        "latency_ms": {
+            f"p{p}": round(_percentile(latencies, p) * 1000) for p in (50, 95, 99)
+        } if latencies else None,
+        "answered_by": dict(providers),
+        "hedged": hedged,
+        "failures": {str(k): v for k, v in failures.items()},
+        "coalesced": factory.coalescing.stats()["collapsed"],
+        "providers": factory.usage_stats(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--distinct", type=int, default=10_000, help="distinct prompts (fewer → more coalescing)")
+    parser.add_argument("--providers", default="fake-a,fake-b,fake-c")
+    parser.add_argument("--latency", default="lognormal", choices=["fixed", "lognormal", "histogram"])
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--sigma", type=float, default=0.6)
+    parser.add_argument("--histogram", default="")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--empty-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.02)
+    parser.add_argument("--hedge", action="store_true", help="enable hedged requests")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    settings.fake_providers = args.providers
+    settings.fake_latency = args.latency
+    settings.fake_latency_ms = args.latency_ms
+    settings.fake_latency_sigma = args.sigma
+    settings.fake_latency_histogram = args.histogram
+    settings.fake_error_rate = args.error_rate
+    settings.fake_empty_rate = args.empty_rate
+    settings.fake_malformed_rate = args.malformed_rate
+    settings.fake_seed = args.seed
+    settings.ai_hedge_enabled = args.hedge
+
+    factory = AIClientFactory()
+    report = asyncio.run(run(factory, args.requests, args.concurrency, args.distinct))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
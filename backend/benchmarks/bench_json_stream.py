@@ -0,0 +1,102 @@
+"""
+Compare the incremental watch parser against the old greedy-regex + json.loads path.
+
+    cd backend && python -m benchmarks.bench_json_stream
+
+For each input it reports the outcome of both paths, the time to parse the
+full text, and for the incremental parser the time to parse the same text
+fed in 16-char chunks (as it would arrive from a streaming provider) and the
+fraction of the text that had arrived when the first watch was available.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import timeit
+
+from app.ai.json_stream import ArrayParseError, IncrementalArrayParser
+from app.schemas.picks import WatchResult
+
+WATCH = {
+    "name": "Seiko Presage SPB167",
+    "brand": "Seiko",
+    "price_range": "$400–$500",
+    "case_size": "40.8mm",
+    "reason": "Its enamel-look dial gives real dress-watch character at this price. The 40.8mm case suits a medium wrist.",
+    "chrono24_url": "https://www.chrono24.com/search/index.htm?query=Seiko%20Presage%20SPB167",
+    "amazon_url": "https://www.amazon.com/s?k=Seiko%20Presage%20SPB167",
+}
+PROSE = "Sure! Based on your preferences [budget, style], here are my picks:\n```json\n"
+
+
+def _array(n: int) -> str:
+    return json.dumps([WATCH] * n, indent=2, ensure_ascii=False)
+
+
+CASES = {
+    "typical (4 watches)": _array(4),
+    "large (500 watches)": _array(500),
+    "prose + fences": PROSE + _array(4) + "\n```\nLet me know [if] you want more!",
+    "truncated mid-object": _array(4)[:-120],
+    "missing field": _array(3)[:-2] + ",\n" + json.dumps({k: v for k, v in WATCH.items() if k != "case_size"}) + "]",
+    "trailing brackets": _array(4) + "\nNote: prices vary [2024].",
+}
+
+
+def legacy(text: str) -> str:
+    match = re.search(r"\[[\s\S]*\]", text)
+    if not match:
+        return "error: unparseable"
+    try:
+        watches = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return "error: invalid JSON"
+    return f"{len(watches)} items (unvalidated)"
+
+
+def incremental(text: str, chunk: int | None = None) -> str:
+    parser = IncrementalArrayParser(WatchResult)
+    if chunk is None:
+        parser.feed(text)
+    else:
+        for i in range(0, len(text), chunk):
+            parser.feed(text[i:i + chunk])
+    try:
+        items = parser.close()
+    except ArrayParseError as exc:
+        return f"error: {exc}"
+    return f"{len(items)} valid" + (f", {len(parser.errors)} problem(s)" if parser.errors else "")
+
+
+def first_item_fraction(text: str, chunk: int = 16) -> float | None:
+    parser = IncrementalArrayParser(WatchResult)
+    for i in range(0, len(text), chunk):
+        if parser.feed(text[i:i + chunk]):
+            return min(1.0, (i + chunk) / len(text))
+    return None
+
+
+def _best_us(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    header = f"{'case':<24}{'legacy':>12}{'incr.':>12}{'incr.16ch':>12}{'1st@':>7}  outcome (legacy → incremental)"
+    print(header)
+    print("-" * len(header))
+    for name, text in CASES.items():
+        number = 20 if len(text) > 100_000 else 500
+        t_legacy = _best_us(lambda: legacy(text), number)
+        t_incr = _best_us(lambda: incremental(text), number)
+        t_chunked = _best_us(lambda: incremental(text, 16), max(1, number // 10))
+        first = first_item_fraction(text)
+        first_s = f"{first:.0%}" if first is not None else "-"
+        print(
+            f"{name:<24}{t_legacy:>10.0f}us{t_incr:>10.0f}us{t_chunked:>10.0f}us{first_s:>7}  "
+            f"{legacy(text)} → {incremental(text)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
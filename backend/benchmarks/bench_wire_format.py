@@ -0,0 +1,131 @@
+"""
+Measure what the compact wire format saves against the old object-with-URLs answers.
+
+    cd backend && python -m benchmarks.bench_wire_format            # offline size comparison
+    python -m benchmarks.bench_wire_format --live 20                # + 20 real generations per format
+
+Offline, the same four watches are encoded both ways and compared by size
+(tokens estimated at ~4 characters each). With --live, sample quiz answers are
+sent through the configured AI factory with the old system prompt and the
+current one, and the provider-reported output tokens and end-to-end latency
+are compared (p50 / p95). Live runs cost real API calls.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import time
+
+from app.ai import ai_factory
+from app.ai.json_stream import IncrementalArrayParser
+from app.ai.providers.fake_provider import fake_watches
+from app.schemas.picks import PickRequest, WatchPick, WatchResult
+from app.services.ai_service import SYSTEM_PROMPT, build_user_message, parse_watches
+
+# The system prompt before the compact format: objects with model-written links
+LEGACY_SYSTEM_PROMPT = (
+    "You are an expert watch advisor and horologist. Given a person's preferences, "
+    "pick exactly 4 watches as a JSON array. The first 3 are main picks. The 4th is "
+    'a "hidden gem" — a lesser-known but excellent alternative.\n\n'
+    "Each watch object must have these exact fields:\n"
+    '- "name": full model name (e.g. "Seiko Presage SPB167")\n'
+    '- "brand": brand name\n'
+    '- "price_range": price range string (e.g. "$400–$500")\n'
+    '- "case_size": case diameter in mm (e.g. "40.8mm")\n'
+    '- "reason": 2 sentences explaining why this watch matches the user\'s preferences\n'
+    '- "chrono24_url": "https://www.chrono24.com/search/index.htm?query=" + URL-encoded watch name\n'
+    '- "amazon_url": "https://www.amazon.com/s?k=" + URL-encoded watch name\n\n'
+    "Return ONLY the JSON array, no markdown, no explanation, no code fences."
+)
+REASON = "Its enamel-look dial gives real dress-watch character at this price. The case suits a medium wrist."
+CHARS_PER_TOKEN = 4
+
+SAMPLE_ANSWERS = {
+    "budget": ["Under $200", "$200–$500", "$500–$2,000", "$2,000–$5,000"],
+    "occasion": ["Daily Wear", "Business", "Sport & Outdoor"],
+    "style": ["Classic & Timeless", "Modern & Minimal", "Bold & Statement"],
+}
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+def offline() -> dict:
+    watches = [{**w, "reason": REASON} for w in fake_watches("Budget: $200–$500")]
+    legacy = json.dumps(watches, indent=2, ensure_ascii=False)
+    rows = [[w[f] for f in WatchPick.model_fields] for w in watches]
+    compact = "[\n" + ",\n".join("  " + json.dumps(row, ensure_ascii=False) for row in rows) + "\n]"
+    return {
+        "legacy_chars": len(legacy),
+        "compact_chars": len(compact),
+        "legacy_tokens_est": len(legacy) // CHARS_PER_TOKEN,
+        "compact_tokens_est": len(compact) // CHARS_PER_TOKEN,
+        "saved": f"{1 - len(compact) / len(legacy):.0%}",
+    }
+
+
+def _legacy_parse(raw: str | list) -> list[dict]:
+    parser = IncrementalArrayParser(WatchResult)
+    if isinstance(raw, list):
+        parser.feed_items(raw)
+    else:
+        parser.feed(raw)
+    return parser.close()
+
+
+async def live(n: int) -> dict:
+    bodies = [
+        PickRequest(
+            budget=budget, occasion=occasion, style=style,
+            wristSize='Medium (6.5"–7.5")', gender="Unisex", brandOpenness="Any brand",
+        )
+        for budget, occasion, style in itertools.islice(itertools.cycle(itertools.product(*SAMPLE_ANSWERS.values())), n)
+    ]
+    report = {}
+    for label, system_prompt, validate in (
+        ("legacy", LEGACY_SYSTEM_PROMPT, _legacy_parse),
+        ("compact", SYSTEM_PROMPT, parse_watches),
+    ):
+        tokens, latency, failures = [], [], 0
+        for body in bodies:
+            start = time.perf_counter()
+            try:
+                # Text mode for both, so the comparison is the wire format alone
+                result = await ai_factory.agenerate(system_prompt, build_user_message(body), validate=validate)
+            except Exception:
+                failures += 1
+                continue
+            latency.append(time.perf_counter() - start)
+            if result.usage is not None:
+                tokens.append(result.usage.completion_tokens)
+        report[label] = {
+            "calls": len(bodies),
+            "failures": failures,
+            "output_tokens_p50": _percentile(tokens, 50) if tokens else None,
+            "output_tokens_p95": _percentile(tokens, 95) if tokens else None,
+            "latency_ms_p50": round(_percentile(latency, 50) * 1000) if latency else None,
+            "latency_ms_p95": round(_percentile(latency, 95) * 1000) if latency else None,
+        }
+    await ai_factory.aclose()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", type=int, default=0, help="real generations per format (0 = offline only)")
+    args = parser.parse_args()
+
+    report = {"offline": offline()}
+    if args.live:
+        report["live"] = asyncio.run(live(args.live))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
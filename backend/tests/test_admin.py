@@ -12,3 +12,8 @@ def test_admin_analytics_requires_key(client):
 def test_admin_user_detail_requires_key(client):
     resp = client.get("/api/v1/admin/users/some-uuid")
     assert resp.status_code in (403, 503)
+
+
+def test_admin_ai_cache_requires_key(client):
+    resp = client.get("/api/v1/admin/ai/cache")
+    assert resp.status_code in (403, 503)
@@ -0,0 +1,383 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.ai.base import AIProvider, Completion, Usage
+from app.ai.cascade import parse_tiers
+from app.ai.circuit import CircuitBreaker, CircuitState
+from app.ai.factory import AIClientFactory
+from app.ai.usage import UsageAggregator
+from app.core.config import settings
+
+
+class StubProvider(AIProvider):
+    def __init__(self, name: str, reply: str = "", error: Exception | None = None, delay: float = 0.0):
+        self.name = name
+        self.model = "stub"
+        self._reply = reply
+        self._error = error
+        self._delay = delay
+        self.calls = 0
+        self.cancelled = False
+
+    def generate(self, system_prompt: str, user_message: str) -> str:
+        self.calls += 1
+        if self._error:
+            raise self._error
+        return self._reply
+
+    def ping(self) -> bool:
+        return self._error is None
+
+    async def agenerate(self, system_prompt: str, user_message: str) -> str:
+        try:
+            await asyncio.sleep(self._delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self.generate(system_prompt, user_message)
+
+    async def aping(self) -> bool:
+        return self.ping()
+
+
+def make_factory(*providers: AIProvider, tiers: tuple[AIProvider, ...] = ()) -> AIClientFactory:
+    return AIClientFactory(providers, tiers)
+
+
+def test_agenerate_falls_back_to_next_provider():
+    broken = StubProvider("openai", error=RuntimeError("boom"))
+    empty = StubProvider("anthropic", reply="   ")
+    good = StubProvider("gemini", reply="[]")
+    factory = make_factory(broken, empty, good)
+
+    result = asyncio.run(factory.agenerate("sys", "user"))
+
+    assert (result.text, result.provider, result.hedged) == ("[]", "gemini", False)
+    assert broken.calls == empty.calls == good.calls == 1
+
+
+def test_agenerate_raises_502_when_all_fail():
+    factory = make_factory(StubProvider("openai", error=RuntimeError("boom")))
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(factory.agenerate("sys", "user"))
+    assert exc_info.value.status_code == 502
+
+
+def test_ahealth_reports_each_provider():
+    factory = make_factory(StubProvider("openai", reply="x"), StubProvider("gemini", error=RuntimeError("down")))
+    health = asyncio.run(factory.ahealth())
+    assert [h["status"] for h in health] == ["connected", "error"]
+
+
+def test_agenerate_falls_back_when_validation_fails():
+    factory = make_factory(StubProvider("openai", reply="nope"), StubProvider("gemini", reply="[1]"))
+
+    def validate(text: str) -> list:
+        if not text.startswith("["):
+            raise ValueError("not a list")
+        return [1]
+
+    result = asyncio.run(factory.agenerate("sys", "user", validate=validate))
+    assert result.provider == "gemini"
+    assert result.parsed == [1]
+
+
+def test_hedge_fires_when_primary_is_slow(monkeypatch):
+    monkeypatch.setattr(settings, "ai_hedge_enabled", True)
+    monkeypatch.setattr(settings, "ai_hedge_delay_ms", 20)
+    monkeypatch.setattr(settings, "ai_hedge_max_fanout", 2)
+    slow = StubProvider("openai", reply="slow", delay=1.0)
+    fast = StubProvider("anthropic", reply="fast")
+    factory = make_factory(slow, fast)
+
+    result = asyncio.run(factory.agenerate("sys", "user"))
+
+    assert result.provider == "anthropic"
+    assert result.hedged is True
+    assert slow.cancelled is True
+
+
+def test_failure_falls_back_to_one_provider_without_hedging(monkeypatch):
+    monkeypatch.setattr(settings, "ai_hedge_enabled", True)
+    monkeypatch.setattr(settings, "ai_hedge_delay_ms", 1000)
+    monkeypatch.setattr(settings, "ai_hedge_max_fanout", 3)
+    broken = StubProvider("openai", error=RuntimeError("boom"))
+    second = StubProvider("anthropic", reply="second", delay=0.05)
+    third = StubProvider("gemini", reply="third")
+    factory = make_factory(broken, second, third)
+
+    result = asyncio.run(factory.agenerate("sys", "user"))
+
+    assert (result.provider, result.hedged) == ("anthropic", False)
+    assert third.calls == 0
+
+
+def test_open_breaker_skips_provider():
+    flaky = StubProvider("openai", error=RuntimeError("503"))
+    good = StubProvider("anthropic", reply="ok")
+    factory = make_factory(flaky, good)
+    for _ in range(settings.ai_breaker_min_calls):
+        asyncio.run(factory.agenerate("sys", "user"))
+
+    assert factory._breakers["openai"].state is CircuitState.OPEN
+    calls_before = flaky.calls
+    result = asyncio.run(factory.agenerate("sys", "user"))
+    assert result.provider == "anthropic"
+    assert flaky.calls == calls_before
+    assert [p["name"] for p in factory.fallback_order()] == ["anthropic", "openai"]
+    assert factory.fallback_order()[-1]["breaker"] == "open"
+
+
+def test_breaker_half_open_probe_closes_on_success():
+    breaker = CircuitBreaker(min_calls=2, error_threshold=0.5, open_seconds=0)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state is CircuitState.HALF_OPEN  # open_seconds=0 → probe allowed immediately
+    assert breaker.allow() is True
+    assert breaker.allow() is False  # only one probe at a time
+    breaker.record_success(0.1)
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_astream_skips_provider_that_fails_before_first_chunk():
+    factory = make_factory(StubProvider("openai", error=RuntimeError("boom")), StubProvider("gemini", reply="[{}]"))
+
+    async def collect():
+        return [pair async for pair in factory.astream("sys", "user")]
+
+    assert asyncio.run(collect()) == [("gemini", "[{}]")]
+
+
+def test_identical_concurrent_generations_are_coalesced():
+    provider = StubProvider("openai", reply="[]", delay=0.01)
+    factory = make_factory(provider)
+
+    async def run():
+        return await asyncio.gather(*(factory.agenerate("sys", "same answers") for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert provider.calls == 1
+    assert {r.provider for r in results} == {"openai"}
+    assert factory.coalescing.stats()["collapsed"] == 4
+
+
+class MeteredProvider(StubProvider):
+    async def acomplete(self, system_prompt: str, user_message: str, schema=None) -> Completion:
+        text = await self.agenerate(system_prompt, user_message)
+        return Completion(text, Usage(prompt_tokens=120, completion_tokens=30))
+
+
+def test_usage_records_tokens_outcome_and_fallback_position():
+    factory = make_factory(StubProvider("openai", error=RuntimeError("boom")), MeteredProvider("gemini", reply="[]"))
+
+    result = asyncio.run(factory.agenerate("sys", "user"))
+
+    assert result.tokens_used == 150
+    stats = {s["name"]: s for s in factory.usage_stats()}
+    assert stats["openai"]["outcomes"] == {"error": 1}
+    assert stats["gemini"]["outcomes"] == {"success": 1}
+    assert stats["gemini"]["fallback_positions"] == {"2": 1}
+    assert (stats["gemini"]["prompt_tokens"], stats["gemini"]["completion_tokens"]) == (120, 30)
+    assert stats["gemini"]["ttft_p50_ms"] is not None
+
+
+def test_usage_marks_rejected_answers_invalid():
+    def reject(text):
+        raise ValueError("bad json")
+
+    factory = make_factory(MeteredProvider("openai", reply="nope"))
+    with pytest.raises(HTTPException):
+        asyncio.run(factory.agenerate("sys", "user", validate=reject))
+
+    (stats,) = factory.usage_stats()
+    assert stats["outcomes"] == {"invalid": 1}
+    assert stats["prompt_tokens"] == 120
+
+
+def test_rejected_answers_do_not_open_the_breaker():
+    def reject(text):
+        raise ValueError("short of 4 picks")
+
+    factory = make_factory(StubProvider("openai", reply="nope"))
+    for _ in range(settings.ai_breaker_min_calls):
+        with pytest.raises(HTTPException):
+            asyncio.run(factory.agenerate("sys", "user", validate=reject))
+
+    assert factory._breakers["openai"].state is CircuitState.CLOSED
+    assert factory._breakers["openai"].error_rate == 0.0
+
+
+def test_deadline_bounds_slow_provider_and_falls_back(monkeypatch):
+    monkeypatch.setattr(settings, "ai_provider_cap_s", 0.05)
+    monkeypatch.setattr(settings, "ai_min_attempt_s", 0.01)
+    slow = StubProvider("openai", reply="[]", delay=5)
+    fast = StubProvider("gemini", reply="[]")
+    factory = make_factory(slow, fast)
+
+    result = asyncio.run(factory.agenerate("sys", "user", deadline_s=1.0))
+
+    assert result.provider == "gemini"
+    assert slow.cancelled
+    assert {s["name"]: s["outcomes"] for s in factory.usage_stats()}["openai"] == {"timeout": 1}
+
+
+def test_deadline_exhausted_raises_504_with_attempts(monkeypatch):
+    monkeypatch.setattr(settings, "ai_provider_cap_s", 10)
+    monkeypatch.setattr(settings, "ai_min_attempt_s", 0.05)
+    factory = make_factory(StubProvider("openai", reply="[]", delay=5), StubProvider("gemini", reply="[]"))
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(factory.agenerate("sys", "user", deadline_s=0.1))
+
+    assert exc_info.value.status_code == 504
+    assert "openai: no answer" in exc_info.value.detail
+    assert "gemini: skipped" in exc_info.value.detail
+    # A timeout on a leftover budget doesn't count against the breaker
+    assert factory._breakers["openai"].error_rate == 0
+
+
+class StructuredProvider(StubProvider):
+    structured = True
+
+    async def acomplete(self, system_prompt: str, user_message: str, schema=None) -> Completion:
+        await self.agenerate(system_prompt, user_message)
+        return Completion('{"items": [{"a": 1}]}', structured=[{"a": 1}] if schema else None)
+
+
+def test_structured_answer_is_validated_without_text_parsing():
+    seen = []
+    factory = make_factory(StructuredProvider("openai"))
+
+    result = asyncio.run(factory.agenerate("sys", "user", validate=lambda raw: seen.append(raw) or raw, schema=dict))
+
+    assert seen == [[{"a": 1}]]
+    assert result.parsed == [{"a": 1}]
+    (stats,) = factory.usage_stats()
+    assert (stats["output_mode"], stats["parse_failure_rate"]) == ("structured", 0.0)
+
+
+def test_usage_reports_prompt_cache_tokens():
+    aggregator = UsageAggregator()
+    aggregator.record("anthropic", "m", "success", 1, 0.5, usage=Usage(1000, 50, cache_write_tokens=900))
+    aggregator.record("anthropic", "m", "success", 1, 0.2, usage=Usage(1000, 50, cache_read_tokens=900))
+
+    (stats,) = aggregator.stats()
+    assert (stats["cache_read_tokens"], stats["cache_write_tokens"]) == (900, 900)
+    assert stats["cache_read_ratio"] == 0.45
+    assert (stats["latency_p50_ms_cache_hit"], stats["latency_p50_ms_cache_miss"]) == (200, 500)
+
+
+def accept_ok(text):
+    if text != "ok":
+        raise ValueError(f"rejected {text!r}")
+    return text
+
+
+def test_cascade_answers_from_cheap_tier(monkeypatch):
+    monkeypatch.setattr(settings, "ai_cascade_enabled", True)
+    cheap = StubProvider("openai/nano", reply="ok")
+    primary = StubProvider("openai", reply="ok")
+    factory = make_factory(primary, tiers=(cheap,))
+
+    result = asyncio.run(factory.agenerate("sys", "user", validate=accept_ok, cascade=accept_ok))
+
+    assert (result.provider, result.parsed) == ("openai/nano", "ok")
+    assert primary.calls == 0
+    stats = factory.cascade_stats()
+    assert stats["escalation_rate"] == 0.0
+    assert stats["tiers"][0]["accepted"] == 1 and stats["tiers"][1]["attempts"] == 0
+
+
+def test_cascade_escalates_rejected_answers(monkeypatch):
+    monkeypatch.setattr(settings, "ai_cascade_enabled", True)
+    sloppy = StubProvider("openai/nano", reply="nearly")
+    broken = StubProvider("gemini/lite", error=RuntimeError("boom"))
+    primary = StubProvider("anthropic", reply="ok")
+    factory = make_factory(primary, tiers=(sloppy, broken))
+
+    result = asyncio.run(factory.agenerate("sys", "user", validate=accept_ok, cascade=accept_ok))
+
+    assert result.provider == "anthropic"
+    assert sloppy.calls == broken.calls == primary.calls == 1
+    stats = factory.cascade_stats()
+    assert (stats["requests"], stats["escalated_to_primary"], stats["escalation_rate"]) == (1, 1, 1.0)
+    assert [t["escalated"] for t in stats["tiers"]] == [1, 1, 0]
+    assert stats["tiers"][2]["latency_ms_p50"] is not None
+
+
+def test_cascade_needs_acceptance_check(monkeypatch):
+    monkeypatch.setattr(settings, "ai_cascade_enabled", True)
+    cheap = StubProvider("openai/nano", reply="ok")
+    factory = make_factory(StubProvider("openai", reply="ok"), tiers=(cheap,))
+
+    assert asyncio.run(factory.agenerate("sys", "user")).provider == "openai"
+    assert cheap.calls == 0
+
+
+def test_explicit_providers_ignore_configured_tiers(monkeypatch):
+    monkeypatch.setattr(settings, "ai_cascade_tiers", "openai:gpt-4.1-nano")
+    factory = make_factory(StubProvider("openai", reply="ok"))
+
+    assert [t["tier"] for t in factory.cascade_stats()["tiers"]] == ["primary"]
+
+
+def test_parse_tiers():
+    assert parse_tiers(" openai:gpt-4.1-nano, gemini:gemini-2.0-flash-lite,") == [
+        ("openai", "gpt-4.1-nano"), ("gemini", "gemini-2.0-flash-lite"),
+    ]
+    with pytest.raises(ValueError):
+        parse_tiers("openai")
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_full_provider_is_skipped_for_one_with_capacity(monkeypatch):
+    monkeypatch.setattr(settings, "ai_concurrency_initial", 1)
+    monkeypatch.setattr(settings, "ai_concurrency_min", 1)
+    monkeypatch.setattr(settings, "ai_concurrency_wait_ms", 20)
+    primary = StubProvider("openai", reply="primary", delay=0.2)
+    backup = StubProvider("anthropic", reply="backup")
+    factory = make_factory(primary, backup)
+
+    async def run():
+        return await asyncio.gather(factory.agenerate("sys", "a"), factory.agenerate("sys", "b"))
+
+    first, second = asyncio.run(run())
+    assert (first.provider, second.provider) == ("openai", "anthropic")
+    assert primary.calls == 1
+
+
+def test_all_providers_at_capacity_raise_503(monkeypatch):
+    monkeypatch.setattr(settings, "ai_concurrency_initial", 1)
+    monkeypatch.setattr(settings, "ai_concurrency_min", 1)
+    monkeypatch.setattr(settings, "ai_concurrency_wait_ms", 20)
+    factory = make_factory(StubProvider("openai", reply="ok", delay=0.2))
+
+    async def run():
+        return await asyncio.gather(
+            factory.agenerate("sys", "a"), factory.agenerate("sys", "b"), return_exceptions=True,
+        )
+
+    ok, busy = asyncio.run(run())
+    assert ok.provider == "openai"
+    assert isinstance(busy, HTTPException) and busy.status_code == 503
+    assert busy.headers == {"Retry-After": "1"}
+    assert factory.concurrency_stats()["providers"][0]["rejected"] == 1
+
+
+def test_rate_limited_provider_backs_off(monkeypatch):
+    monkeypatch.setattr(settings, "ai_concurrency_initial", 8)
+    throttled = StubProvider("openai", error=StatusError(429))
+    good = StubProvider("anthropic", reply="ok")
+    factory = make_factory(throttled, good)
+
+    assert asyncio.run(factory.agenerate("sys", "user")).provider == "anthropic"
+    stats = {p["name"]: p for p in factory.concurrency_stats()["providers"]}
+    assert (stats["openai"]["limit"], stats["openai"]["overloads"]) == (4, 1)
+    assert stats["anthropic"]["limit"] == 8 and stats["openai"]["in_flight"] == 0
@@ -0,0 +1,23 @@
+from app.ai.schema import ITEMS_KEY, gemini_schema, items_schema, loads_items
+from app.schemas.picks import WatchResult
+
+
+def test_items_schema_is_strict():
+    schema = items_schema(WatchResult)
+    item = schema["properties"][ITEMS_KEY]["items"]
+    assert schema["additionalProperties"] is False
+    assert item["additionalProperties"] is False
+    assert set(item["required"]) == set(WatchResult.model_fields)
+    assert "title" not in item
+
+
+def test_gemini_schema_drops_unsupported_keywords():
+    schema = gemini_schema(items_schema(WatchResult))
+    assert "additionalProperties" not in schema
+    assert "additionalProperties" not in schema["properties"][ITEMS_KEY]["items"]
+
+
+def test_loads_items():
+    assert loads_items('{"items": [{"a": 1}]}') == [{"a": 1}]
+    assert loads_items('[{"a": 1}]') is None
+    assert loads_items("not json") is None
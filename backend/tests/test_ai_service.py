@@ -0,0 +1,156 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from app.ai.base import GenerationResult, Usage
+from app.schemas.picks import PickRequest
+from app.services import ai_service
+from app.services.near_cache import NearPickCache
+
+PICKS = [
+    {"name": f"Watch {i}", "brand": "Brand", "price_range": "$1", "case_size": "40mm",
+     "reason": 'Says "hi" {not a brace} [or a bracket]'}
+    for i in range(4)
+]
+WATCHES = [ai_service.expand_watch(pick) for pick in PICKS]
+BODY = PickRequest(
+    budget="$200–$500", occasion="Daily Wear", style="Classic & Timeless",
+    wristSize="Medium (6.5\"–7.5\")", gender="Unisex", brandOpenness="Any brand",
+)
+
+
+@pytest.fixture
+def live_only(monkeypatch):
+    """Send every generation to the stub factory: no catalog, pick / near cache or watch shortlist."""
+    for name in ("pick_catalog_enabled", "pick_cache_enabled", "near_cache_enabled", "watch_catalog_enabled"):
+        monkeypatch.setattr(ai_service.settings, name, False)
+
+
+class ChunkedFactory:
+    signature = "stub:model"
+
+    def __init__(self, text: str, size: int = 7):
+        self._chunks = [text[i:i + size] for i in range(0, len(text), size)]
+
+    async def astream(self, system_prompt, user_message, usage=None, deadline_s=None, schema=None):
+        for chunk in self._chunks:
+            yield "stub", chunk
+
+
+def test_stream_yields_each_watch_then_done(live_only, monkeypatch):
+    text = "Sure! Here you go:\n```json\n" + json.dumps(WATCHES, indent=2) + "\n```"
+    monkeypatch.setattr(ai_service, "ai_factory", ChunkedFactory(text))
+
+    async def collect():
+        return [event async for event in ai_service.astream_watch_picks(BODY)]
+
+    events = asyncio.run(collect())
+    assert [kind for kind, _ in events] == ["watch"] * 4 + ["done"]
+    assert [payload for _, payload in events[:4]] == WATCHES
+    watches, generation = events[-1][1]
+    assert watches == WATCHES and generation.provider == "stub"
+
+
+def test_compact_rows_expand_to_full_watches(live_only, monkeypatch):
+    rows = [[p["name"], p["brand"], p["price_range"], p["case_size"], p["reason"]] for p in PICKS]
+    monkeypatch.setattr(ai_service, "ai_factory", ChunkedFactory(json.dumps(rows), size=5))
+
+    async def collect():
+        return [event async for event in ai_service.astream_watch_picks(BODY)]
+
+    events = asyncio.run(collect())
+    assert [payload for kind, payload in events if kind == "watch"] == WATCHES
+    assert WATCHES[0]["chrono24_url"] == "https://www.chrono24.com/search/index.htm?query=Watch%200"
+    assert WATCHES[0]["amazon_url"] == "https://www.amazon.com/s?k=Watch%200"
+    assert ai_service.parse_watches(rows[:2] + [["too", "short"]]) == WATCHES[:2]
+
+
+def test_parse_watches_accepts_structured_items():
+    items = WATCHES[:2] + [{"name": "missing fields"}]
+    assert ai_service.parse_watches(items) == WATCHES[:2]
+
+
+def test_structured_stream_text_is_parsed_incrementally(live_only, monkeypatch):
+    text = json.dumps({"items": WATCHES})
+    monkeypatch.setattr(ai_service, "ai_factory", ChunkedFactory(text))
+
+    async def collect():
+        return [event async for event in ai_service.astream_watch_picks(BODY)]
+
+    events = asyncio.run(collect())
+    assert [payload for kind, payload in events if kind == "watch"] == WATCHES
+
+
+class RepairingFactory(ChunkedFactory):
+    """Streams a partial answer, then answers the follow-up with `repair_rows`."""
+
+    def __init__(self, text: str, repair_rows: list):
+        super().__init__(text)
+        self.repair_rows = repair_rows
+        self.follow_ups = []
+
+    async def agenerate(self, system_prompt, user_message, validate=None, deadline_s=None, schema=None):
+        self.follow_ups.append(user_message)
+        usage = Usage(prompt_tokens=300, completion_tokens=40)
+        return GenerationResult(
+            text="", provider="stub", parsed=validate(self.repair_rows), usage=usage,
+        )
+
+
+def test_partial_answer_is_repaired_in_place(live_only, monkeypatch):
+    rows = [[p["name"], p["brand"], p["price_range"], p["case_size"], p["reason"]] for p in PICKS]
+    # Third row is malformed and the fourth repeats the first
+    partial = [rows[0], rows[1], ["Watch 2", "Brand"], rows[0], rows[3]]
+    factory = RepairingFactory(json.dumps(partial), repair_rows=[rows[0], rows[2]])
+    monkeypatch.setattr(ai_service, "ai_factory", factory)
+    monkeypatch.setattr(ai_service, "repair_stats", ai_service.RepairStats())
+
+    async def collect():
+        return [event async for event in ai_service.astream_watch_picks(BODY)]
+
+    events = asyncio.run(collect())
+    streamed = [payload for kind, payload in events if kind == "watch"]
+    assert streamed == [WATCHES[0], WATCHES[1], WATCHES[3], WATCHES[2]]
+    watches, generation = events[-1][1]
+    assert watches == WATCHES
+    assert len(factory.follow_ups) == 1
+    assert "You already picked: Watch 0, Watch 1, Watch 3" in factory.follow_ups[0]
+    assert "1 main pick (1 row)" in factory.follow_ups[0]
+    stats = ai_service.repair_stats.stats()
+    assert stats["partial"] == stats["repaired"] == stats["slots_repaired"] == 1
+    assert stats["repair_tokens"] == 340
+
+
+def test_missing_slots_lowest_first():
+    picks = ai_service.Picks()
+    picks.extend(WATCHES[:2])
+    picks.slots.extend([0, 3])
+    assert ai_service.missing_slots(picks) == [1, 2]
+    picks.extend(WATCHES[2:])
+    assert ai_service.missing_slots(picks) == []
+
+
+def test_strict_parser_is_the_cascade_acceptance_check():
+    rows = [[p["name"], p["brand"], p["price_range"], p["case_size"], p["reason"]] for p in PICKS]
+    strict = ai_service.PicksParser(strict=True)
+    assert strict(rows) == WATCHES
+    for bad in (rows[:3] + [rows[0]], rows[:3] + [["Watch 3", "Brand"]], rows[:3] + [[*rows[3][:3], "1.6 in", "x"]]):
+        with pytest.raises(HTTPException):
+            strict(bad)
+    assert len(ai_service.PicksParser()(rows[:3] + [rows[0]])) == 3
+
+
+def test_similar_answers_are_served_from_the_near_cache(live_only, monkeypatch):
+    monkeypatch.setattr(ai_service, "ai_factory", ChunkedFactory(json.dumps(WATCHES)))
+    monkeypatch.setattr(ai_service, "near_pick_cache", NearPickCache(max_entries=8))
+    monkeypatch.setattr(ai_service.settings, "near_cache_enabled", True)
+
+    async def collect(body):
+        return [event async for event in ai_service.astream_watch_picks(body)]
+
+    live = asyncio.run(collect(BODY))[-1][1][1]
+    near = asyncio.run(collect(BODY.model_copy(update={"gender": "Women's"})))[-1][1]
+    assert live.source == "live"
+    assert near[0] == WATCHES and near[1].source == "near" and near[1].tokens_used == 0
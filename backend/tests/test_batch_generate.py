@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+from fastapi import HTTPException
+
+from app.ai.base import GenerationResult, Usage
+from app.core.config import settings
+from app.jobs import batch_generate
+from app.jobs.batch_generate import completed_ids, provider_limits, run_batch
+
+BODY = {
+    "budget": "$200–$500", "occasion": "Daily Wear", "style": "Classic & Timeless",
+    "wristSize": "Medium", "gender": "Unisex", "brandOpenness": "Any brand",
+}
+
+
+def picks_text(count):
+    return json.dumps([
+        {"name": f"Watch {i}", "brand": "Brand", "price_range": "$1", "case_size": "40mm", "reason": "r"}
+        for i in range(count)
+    ])
+
+
+class StubFactory:
+    def __init__(self, fail_ids=(), short_ids=()):
+        self.calls = []
+        self._fail = set(fail_ids)
+        self._short = set(short_ids)
+
+    async def agenerate(self, system_prompt, user_message, validate=None, deadline_s=None, schema=None):
+        self.calls.append(user_message)
+        if any(f"Occasion: {i}" in user_message for i in self._fail):
+            raise RuntimeError("boom")
+        count = 2 if any(f"Occasion: {i}" in user_message for i in self._short) else 4
+        try:
+            parsed = validate(picks_text(count))
+        except ValueError as exc:  # like the real factory: a rejected answer is a provider failure
+            raise HTTPException(status_code=502, detail=str(exc))
+        return GenerationResult(text="[]", provider="stub", parsed=parsed, usage=Usage(100, 20))
+
+    def rate_limit_stats(self):
+        return {}
+
+
+def write_inputs(path, occasions):
+    path.write_text("".join(json.dumps({**BODY, "id": o, "occasion": o}) + "\n" for o in occasions))
+
+
+def test_batch_writes_results_and_resumes(tmp_path):
+    inputs, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_inputs(inputs, ["a", "b", "c"])
+
+    first = asyncio.run(run_batch(inputs, output, factory=StubFactory(fail_ids={"b"}), concurrency=2))
+    assert (first["ok"], first["failed"], first["tokens"]) == (2, 1, 240)
+    assert completed_ids(output) == {"a", "c"}
+
+    # Simulate a crash that tore the last line, then rerun: only "b" is retried
+    with output.open("a") as fh:
+        fh.write('{"id": "d", "sta')
+    retry = StubFactory()
+    second = asyncio.run(run_batch(inputs, output, factory=retry, concurrency=2))
+    assert (second["ok"], second["skipped"]) == (1, 2)
+    assert len(retry.calls) == 1
+    assert completed_ids(output) == {"a", "b", "c"}
+
+
+def test_short_answers_are_errors_and_retried(tmp_path):
+    inputs, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_inputs(inputs, ["a", "short"])
+
+    first = asyncio.run(run_batch(inputs, output, factory=StubFactory(short_ids={"short"}), concurrency=2))
+    assert (first["ok"], first["failed"]) == (1, 1)
+    assert completed_ids(output) == {"a"}
+    errors = [json.loads(line) for line in output.read_text().splitlines() if '"error"' in line]
+    assert "of 4 picks" in errors[0]["error"]
+
+    second = asyncio.run(run_batch(inputs, output, factory=StubFactory(), concurrency=2))
+    assert (second["ok"], second["skipped"]) == (1, 1)
+    assert completed_ids(output) == {"a", "short"}
+
+
+class FailingCatalog:
+    def put(self, body, watches, provider, fingerprint):
+        if body.occasion == "b":
+            raise OSError("disk full")
+
+
+def test_catalog_failure_is_recorded_and_batch_continues(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_generate, "pick_catalog", FailingCatalog())
+    inputs, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_inputs(inputs, ["a", "b", "c", "d", "e"])
+
+    counts = asyncio.run(run_batch(inputs, output, factory=StubFactory(), concurrency=1, store_in_catalog=True))
+
+    assert (counts["ok"], counts["failed"]) == (4, 1)
+    assert completed_ids(output) == {"a", "c", "d", "e"}
+    errors = [json.loads(line) for line in output.read_text().splitlines() if '"error"' in line]
+    assert errors[0]["id"] == "b" and "disk full" in errors[0]["error"]
+
+
+class NamedProvider:
+    def __init__(self, name):
+        self.name = name
+
+
+class ProvidersFactory:
+    def __init__(self, providers, tiers=()):
+        self.providers = [NamedProvider(n) for n in providers]
+        self.tiers = [NamedProvider(n) for n in tiers]
+
+
+def test_provider_limits_cover_tiers_and_unknown_providers(monkeypatch):
+    monkeypatch.setattr(settings, "ai_batch_default_rpm", 7)
+    factory = ProvidersFactory(["openai", "fake-a", "fake-b"], tiers=["openai/gpt-4.1-nano", "gemini/flash-lite"])
+
+    limits = provider_limits(factory)
+
+    assert set(limits) == {"openai", "fake-a", "fake-b", "openai/gpt-4.1-nano", "gemini/flash-lite"}
+    assert limits["openai/gpt-4.1-nano"] is limits["openai"]  # one account quota
+    assert limits["fake-a"] is not limits["fake-b"]
+    assert (limits["fake-a"].rpm, limits["openai"].rpm) == (7, settings.openai_rpm)
@@ -0,0 +1,62 @@
+import asyncio
+
+from app.ai.concurrency import IGNORE, OK, OVERLOAD, AdaptiveLimit, overload_status
+
+
+def test_overload_halves_limit_once_per_epoch():
+    limit = AdaptiveLimit(initial=8, min_limit=1)
+
+    async def run():
+        slots = [await limit.acquire(0) for _ in range(4)]
+        for slot in slots:  # all started before the first decrease
+            limit.release(slot, OVERLOAD)
+
+    asyncio.run(run())
+    assert (limit.limit, limit.overloads, limit.decreases) == (4, 4, 1)
+
+
+def test_success_grows_limit_while_saturated():
+    limit = AdaptiveLimit(initial=2, max_limit=3)
+
+    async def run():
+        for _ in range(10):
+            slots = [await limit.acquire(0) for _ in range(limit.limit)]
+            for slot in slots:
+                limit.release(slot, OK, 0.1)
+
+    asyncio.run(run())
+    assert limit.limit == 3
+
+
+def test_waiter_gets_released_slot_or_gives_up():
+    limit = AdaptiveLimit(initial=1)
+
+    async def run():
+        held = await limit.acquire(0)
+        assert await limit.acquire(0) is None  # no wait allowed: moves on immediately
+        waiter = asyncio.create_task(limit.acquire(1.0))
+        await asyncio.sleep(0.02)
+        limit.release(held, IGNORE)
+        slot = await waiter
+        assert slot is not None and slot.waited_s > 0
+        assert await limit.acquire(0.02) is None  # still held by the waiter
+
+    asyncio.run(run())
+    stats = limit.stats()
+    assert (stats["in_flight"], stats["queued"], stats["rejected"]) == (1, 2, 2)
+
+
+def test_overload_status_reads_sdk_error_codes():
+    class SDKError(Exception):
+        status_code = 503
+
+    class GoogleError(Exception):
+        code = 429
+
+    class BadRequest(Exception):
+        status_code = 400
+
+    assert overload_status(SDKError()) == 503
+    assert overload_status(GoogleError()) == 429
+    assert overload_status(BadRequest()) is None
+    assert overload_status(RuntimeError("boom")) is None
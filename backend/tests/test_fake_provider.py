@@ -0,0 +1,65 @@
+import asyncio
+import json
+import random
+
+import pytest
+from fastapi import HTTPException
+
+from app.ai.providers.fake_provider import FakeProvider, LatencyModel, fake_watches
+from app.schemas.picks import CompactRow
+from app.services.ai_service import parse_watches
+
+
+def test_answers_are_valid_and_deterministic():
+    provider = FakeProvider()
+    text = asyncio.run(provider.agenerate("sys", "Budget: $500"))
+
+    assert parse_watches(text) == fake_watches("Budget: $500")
+    assert len(parse_watches(text)) == 4
+    assert fake_watches("Budget: $500") != fake_watches("Budget: $1000")
+
+
+def test_structured_answer_carries_items():
+    provider = FakeProvider(structured=True)
+    completion = asyncio.run(provider.acomplete("sys", "user", schema=CompactRow))
+    assert parse_watches(completion.structured) == fake_watches("user")
+    assert completion.usage.total_tokens > 0
+
+
+def test_shortlist_prompt_gets_shortlist_ids():
+    provider = FakeProvider()
+    text = asyncio.run(provider.agenerate("sys", "Budget: $500\n\nShortlist:\n[a] A | x\n[b] B | x\n[c] C | x"))
+    assert [row[0] for row in json.loads(text)] == ["a", "b", "c"]
+
+
+@pytest.mark.parametrize(
+    "rates, check",
+    [
+        ({"error_rate": 1.0}, "error"),
+        ({"empty_rate": 1.0}, ""),
+        ({"malformed_rate": 1.0}, "malformed"),
+    ],
+)
+def test_fault_injection(rates, check):
+    provider = FakeProvider(**rates)
+    if check == "error":
+        with pytest.raises(RuntimeError):
+            provider.generate("sys", "user")
+        return
+    text = provider.generate("sys", "user")
+    if check == "malformed":
+        with pytest.raises(HTTPException):
+            parse_watches(text)
+    else:
+        assert text == check
+
+
+def test_latency_distributions():
+    rng = random.Random(1)
+    assert LatencyModel("fixed", 250).sample() == 0.25
+    lognormal = sorted(LatencyModel("lognormal", 800, 0.5, rng=rng).sample() for _ in range(999))
+    assert 0.7 < lognormal[499] < 0.9
+    histogram = LatencyModel("histogram", histogram="100:1,900:0", rng=rng)
+    assert {histogram.sample() for _ in range(20)} == {0.1}
+    with pytest.raises(ValueError):
+        LatencyModel("gaussian")
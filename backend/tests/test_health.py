@@ -6,7 +6,8 @@ def test_health_returns_ok(client):
     assert "status" in body["data"]
     assert "services" in body["data"]
     assert "ai_providers" in body["data"]
-    assert "ai_fallback_order" in body["data"]
+    assert all(isinstance(name, str) for name in body["data"]["ai_fallback_order"])
+    assert [p["name"] for p in body["data"]["ai_routing"]] == body["data"]["ai_fallback_order"]
 
 
 def test_root_redirects_to_docs(client):
@@ -0,0 +1,53 @@
+import asyncio
+
+from app.core.health_monitor import HealthMonitor
+
+
+async def connected() -> dict:
+    return {"status": "connected"}
+
+
+async def hangs() -> dict:
+    await asyncio.sleep(10)
+    return {"status": "connected"}
+
+
+async def raises() -> dict:
+    raise RuntimeError("db down")
+
+
+def test_snapshot_is_unknown_before_first_probe():
+    monitor = HealthMonitor()
+    monitor.register("db", connected, interval_s=30, timeout_s=1)
+    assert monitor.snapshot("db")["status"] == "unknown"
+    assert monitor.snapshot("missing") == {"status": "unknown"}
+
+
+def test_probes_run_in_parallel_with_timeouts():
+    monitor = HealthMonitor()
+    monitor.register("ok", connected, interval_s=30, timeout_s=1)
+    monitor.register("slow", hangs, interval_s=30, timeout_s=0.05)
+    monitor.register("broken", raises, interval_s=30, timeout_s=1)
+
+    asyncio.run(monitor.run_once())
+
+    ok = monitor.snapshot("ok")
+    assert ok["status"] == "connected" and ok["last_success"] == ok["last_checked"]
+    slow = monitor.snapshot("slow")
+    assert slow["status"] == "error" and "timed out" in slow["detail"] and slow["last_success"] is None
+    assert monitor.snapshot("broken")["detail"] == "db down"
+
+
+def test_background_loop_starts_and_stops():
+    monitor = HealthMonitor()
+    monitor.register("ok", connected, interval_s=0.01, timeout_s=1)
+
+    async def run():
+        await monitor.start()
+        await asyncio.sleep(0.05)
+        assert monitor.running
+        await monitor.stop()
+        assert not monitor.running
+
+    asyncio.run(run())
+    assert monitor.snapshot("ok")["status"] == "connected"
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.idempotency import IdempotencyStore, request_fingerprint
+
+FP = request_fingerprint('{"budget": "$200–$500"}', "False")
+
+
+def test_duplicates_wait_then_replay():
+    store = IdempotencyStore(ttl_seconds=60, max_entries=10)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"pick_id": "pick-1"}
+
+    async def scenario():
+        concurrent = await asyncio.gather(*(store.run("u1", "key-1", FP, work) for _ in range(3)))
+        later = await store.run("u1", "key-1", FP, work)
+        other_user = await store.run("u2", "key-1", FP, work)
+        return concurrent, later, other_user
+
+    concurrent, later, other_user = asyncio.run(scenario())
+    assert len(calls) == 2  # one per user
+    assert sorted(replayed for _, replayed in concurrent) == [False, True, True]
+    assert all(data == {"pick_id": "pick-1"} for data, _ in concurrent)
+    assert later == ({"pick_id": "pick-1"}, True)
+    assert other_user[1] is False
+    assert store.stats()["waited"] == 2 and store.stats()["replayed"] == 1
+
+
+def test_failure_releases_key_and_reaches_waiters():
+    store = IdempotencyStore(ttl_seconds=60, max_entries=10)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise HTTPException(status_code=502, detail="All AI providers failed")
+        return {"pick_id": "pick-2"}
+
+    async def scenario():
+        first = await asyncio.gather(*(store.run("u1", "k", FP, flaky) for _ in range(2)), return_exceptions=True)
+        retry = await store.run("u1", "k", FP, flaky)
+        return first, retry
+
+    first, retry = asyncio.run(scenario())
+    assert [exc.status_code for exc in first] == [502, 502]
+    assert retry == ({"pick_id": "pick-2"}, False)
+
+
+def test_key_reused_with_other_body_is_rejected():
+    store = IdempotencyStore(ttl_seconds=60, max_entries=10)
+    store.begin("u1", "k", FP)
+    with pytest.raises(HTTPException) as exc_info:
+        store.begin("u1", "k", request_fingerprint("{}", "False"))
+    assert exc_info.value.status_code == 422
+    with pytest.raises(HTTPException):
+        store.begin("u1", "x" * 300, FP)
+
+
+def test_one_leader_across_threads_and_bounded_store():
+    store = IdempotencyStore(ttl_seconds=60, max_entries=2)
+    leaders = []
+    barrier = threading.Barrier(8)
+
+    def begin():
+        barrier.wait()
+        leaders.append(store.begin("u1", "same", FP).leader)
+
+    threads = [threading.Thread(target=begin) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert leaders.count(True) == 1
+
+    for key in ("a", "b", "c"):
+        store.complete(store.begin("u1", key, FP), {"key": key})
+    assert store.stats()["keys"] == 2  # oldest completed key evicted, the in-progress one kept
+    assert store.begin("u1", "c", FP).replay == {"key": "c"}
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from app.ai.json_stream import ArrayParseError, IncrementalArrayParser
+from app.schemas.picks import WatchPick, WatchResult
+
+WATCH = {
+    "name": "Seiko Presage SPB167", "brand": "Seiko", "price_range": "$400–$500", "case_size": "40.8mm",
+    "reason": 'A {dressy} "cocktail" dial\\nfor [daily] wear.', "chrono24_url": "c", "amazon_url": "a",
+}
+
+
+def feed_in_chunks(parser: IncrementalArrayParser, text: str, size: int) -> list[list[dict]]:
+    return [parser.feed(text[i:i + size]) for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 64, 10_000])
+def test_yields_each_object_when_it_closes(size):
+    text = "Here are [4] picks:\n```json\n" + json.dumps([WATCH, WATCH], indent=2) + "\n```\nEnjoy [!]"
+    parser = IncrementalArrayParser(WatchResult)
+    batches = feed_in_chunks(parser, text, size)
+    assert [w for batch in batches for w in batch] == [WATCH, WATCH]
+    assert parser.done
+    assert parser.close() == [WATCH, WATCH]
+    assert parser.errors == []
+
+
+def test_object_is_available_before_array_closes():
+    text = json.dumps([WATCH, WATCH])
+    parser = IncrementalArrayParser()
+    first_close = len("[" + json.dumps(WATCH))
+    assert parser.feed(text[:first_close]) == [WATCH]
+
+
+def test_reports_schema_and_syntax_errors_by_index():
+    missing = {k: v for k, v in WATCH.items() if k != "case_size"}
+    text = "[" + json.dumps(WATCH) + "," + json.dumps(missing) + ', {"name": "x",}, "oops", ' + json.dumps(WATCH) + "]"
+    parser = IncrementalArrayParser(WatchResult)
+    parser.feed(text)
+    assert len(parser.close()) == 2
+    assert parser.errors[0].startswith("item 1: case_size")
+    assert parser.errors[1].startswith("item 2: invalid JSON")
+    assert parser.errors[2].startswith("item 3: expected an object")
+
+
+@pytest.mark.parametrize("size", [1, 7, 10_000])
+def test_positional_rows_map_onto_fields(size):
+    pick = {k: WATCH[k] for k in WatchPick.model_fields}
+    row = list(pick.values())
+    text = "```json\n" + json.dumps([row, row[:3], pick]) + "\n```"
+    parser = IncrementalArrayParser(WatchPick, positional=True)
+    batches = feed_in_chunks(parser, text, size)
+    assert [w for batch in batches for w in batch] == [pick, pick]
+    assert parser.errors == ["item 1: expected 5 values, got 3"]
+
+
+def test_truncated_output_keeps_complete_items():
+    text = json.dumps([WATCH, WATCH])[:-40]
+    parser = IncrementalArrayParser(WatchResult)
+    parser.feed(text)
+    assert parser.close() == [WATCH]
+    assert "truncated" in parser.errors[0]
+
+
+@pytest.mark.parametrize("text, reason", [
+    ("Sorry, I can't help with that.", "no JSON array"),
+    ("[]", "empty array"),
+    ('[{"name": "x"', "truncated"),
+])
+def test_failure_reasons(text, reason):
+    parser = IncrementalArrayParser(WatchResult)
+    parser.feed(text)
+    with pytest.raises(ArrayParseError, match=reason):
+        parser.close()
@@ -0,0 +1,83 @@
+import asyncio
+
+from app.schemas.picks import PickRequest
+from app.services import near_cache as near_module
+from app.services.near_cache import NearPickCache, parse_weights
+
+BODY = PickRequest(
+    budget="$200–$500", occasion="Daily Wear", style="Classic & Timeless",
+    wristSize="Medium", gender="Unisex", brandOpenness="Any brand",
+)
+WATCHES = [{"name": "Seiko Presage"}]
+
+
+def test_low_impact_difference_is_a_near_hit(monkeypatch):
+    monkeypatch.setattr(near_module.settings, "near_cache_weights", "budget:10,style:3,gender:0.5,brandOpenness:0.5")
+    monkeypatch.setattr(near_module.settings, "near_cache_max_distance", 1.0)
+    cache = NearPickCache(max_entries=8)
+    cache.add(BODY, WATCHES, "openai", "ns")
+
+    near = cache.get(BODY.model_copy(update={"gender": "Men's", "brandOpenness": "Budget friendly"}), "ns")
+    assert near == (WATCHES, "openai", 1.0)
+    assert cache.get(BODY.model_copy(update={"budget": "Under $200"}), "ns") is None
+    assert cache.get(BODY.model_copy(update={"style": "Bold & Statement"}), "ns") is None
+    assert cache.get(BODY, "other-prompt") is None
+
+    stats = cache.stats()
+    assert (stats["lookups"], stats["near_hits"], stats["misses"]) == (4, 1, 3)
+    assert stats["near_hit_rate"] == 0.25
+
+
+def test_nearest_entry_wins_and_ring_buffer_evicts(monkeypatch):
+    monkeypatch.setattr(near_module.settings, "near_cache_weights", "")
+    monkeypatch.setattr(near_module.settings, "near_cache_max_distance", 2.0)
+    cache = NearPickCache(max_entries=2)
+    cache.add(BODY.model_copy(update={"gender": "Men's", "style": "Modern & Minimal"}), [{"name": "far"}], "a", "ns")
+    cache.add(BODY.model_copy(update={"gender": "Men's"}), [{"name": "near"}], "b", "ns")
+    assert cache.get(BODY, "ns")[0] == [{"name": "near"}]
+
+    cache.add(BODY.model_copy(update={"occasion": "Business", "style": "Modern & Minimal"}), [{"name": "new"}], "c", "ns")
+    assert cache.stats()["entries"] == 2
+    assert cache.get(BODY, "ns")[0] == [{"name": "near"}]
+    cache.add(BODY.model_copy(update={"occasion": "Business"}), [{"name": "newest"}], "d", "ns")
+    assert cache.get(BODY, "ns")[0] == [{"name": "newest"}]  # "near" was overwritten
+
+
+def test_warm_from_history_rows():
+    cache = NearPickCache(max_entries=8)
+    rows = [
+        {"quiz_inputs": BODY.model_dump(), "results": WATCHES},
+        {"quiz_inputs": {"budget": "missing fields"}, "results": WATCHES},
+    ]
+    assert cache.warm(rows, "ns") == 1
+    assert cache.get(BODY, "ns")[2] == 0.0
+    assert list(parse_weights("gender:0.5")) == [1, 1, 1, 1, 0.5, 1, 1]
+
+
+def test_warm_up_only_loads_the_current_namespace(monkeypatch):
+    requested = []
+
+    class FakePicksService:
+        def recent_results(self, cache_namespace, limit=5000):
+            requested.append(cache_namespace)
+            return [{"quiz_inputs": BODY.model_dump(), "results": WATCHES}]
+
+    monkeypatch.setattr(near_module, "PicksService", FakePicksService)
+    monkeypatch.setattr(near_module.settings, "near_cache_enabled", True)
+    cache = NearPickCache(max_entries=8)
+
+    asyncio.run(cache.awarm_from_history("prompt-a:openai/gpt"))
+    assert requested == ["prompt-a:openai/gpt"]
+    assert cache.get(BODY, "prompt-a:openai/gpt") is not None
+    assert cache.get(BODY, "prompt-b:openai/gpt") is None
+
+
+def test_vocabulary_is_bounded_by_the_ring_buffer():
+    cache = NearPickCache(max_entries=2)
+    for i in range(5):
+        cache.add(BODY.model_copy(update={"occasion": f"free text {i}"}), [{"name": f"w{i}"}], "openai", "ns")
+
+    assert len(cache._vocab["occasion"]) == 2
+    assert cache.get(BODY.model_copy(update={"occasion": "free text 4"}), "ns")[0] == [{"name": "w4"}]
+    assert cache.get(BODY.model_copy(update={"occasion": "free text 3"}), "ns")[0] == [{"name": "w3"}]
+    assert cache.get(BODY.model_copy(update={"occasion": "free text 0"}), "ns") is None  # evicted and forgotten
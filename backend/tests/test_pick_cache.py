@@ -0,0 +1,56 @@
+import time
+
+from app.core.cache import LRUCache
+from app.schemas.picks import PickRequest
+from app.services.pick_cache import pick_cache_key
+
+ANSWERS = {
+    "budget": "$500–$2,000",
+    "occasion": "Daily Wear",
+    "style": "Classic & Timeless",
+    "wristSize": "Medium (6.5\"–7.5\")",
+    "gender": "Men's",
+    "brandOpenness": "Any brand",
+}
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_respects_byte_bound_and_ttl():
+    cache = LRUCache(max_entries=100, max_bytes=20, ttl_seconds=0.01)
+    cache.set("big", "x" * 50)
+    assert cache.get("big") is None
+    cache.set("small", "x")
+    time.sleep(0.02)
+    assert cache.get("small") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 0 and stats["misses"] == 2
+
+
+def test_unrecorded_lookup_leaves_stats_and_recency_alone():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a", record=False) == 1
+    assert cache.get("missing", record=False) is None
+    cache.set("c", 3)  # "a" is still least recently used
+    assert cache.get("a") is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (0, 1)
+
+
+def test_cache_key_is_canonical():
+    a = PickRequest(**ANSWERS)
+    b = PickRequest(**{**ANSWERS, "style": "  Classic &  Timeless "})
+    assert pick_cache_key(a, "prompt", "openai:gpt") == pick_cache_key(b, "prompt", "openai:gpt")
+    assert pick_cache_key(a, "prompt", "openai:gpt") != pick_cache_key(a, "prompt v2", "openai:gpt")
+    assert pick_cache_key(a, "prompt", "openai:gpt") != pick_cache_key(a, "prompt", "openai:gpt-4o")
@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+from fastapi import HTTPException
+
+from app.ai.base import GenerationResult, Usage
+from app.jobs.precompute_picks import enumerate_inputs, precompute, weighted_inputs
+from app.schemas.picks import PickRequest
+from app.services import ai_service
+from app.services.pick_catalog import PickCatalog
+
+SPACE = {
+    "budget": ["Under $200", "$200–$500"],
+    "occasion": ["Daily Wear", "Business"],
+    "style": ["Classic & Timeless"],
+    "wristSize": ["Medium (6.5\"–7.5\")"],
+    "gender": ["Men's", "Women's"],
+    "brandOpenness": ["Any brand"],
+    "movementType": ["Automatic", "Quartz"],
+}
+WATCHES = [{"name": "Seiko Presage SPB167", "brand": "Seiko"}]
+
+
+def test_enumerate_covers_cross_product():
+    inputs = list(enumerate_inputs(SPACE))
+    assert len(inputs) == 16
+    assert len({tuple(b.model_dump().values()) for b in inputs}) == 16
+
+
+def test_weighted_inputs_prefers_frequent_answers():
+    history = [{"budget": "$200–$500", "gender": "Women's", "movementType": "Quartz"}] * 10
+    top = weighted_inputs(SPACE, history, top=2)
+    assert all(b.budget == "$200–$500" and b.gender == "Women's" and b.movementType == "Quartz" for b in top)
+
+
+def test_catalog_roundtrip_fingerprint_and_prune(tmp_path):
+    path = tmp_path / "catalog.sqlite3"
+    body, other = list(enumerate_inputs(SPACE))[:2]
+    catalog = PickCatalog(path)
+    catalog.put(body, WATCHES, "openai", "fp1")
+    catalog.put(other, WATCHES, "gemini", "fp1")
+
+    reopened = PickCatalog(path)
+    assert reopened.get(body, "fp1") == (WATCHES, "openai")
+    assert reopened.get(body, "fp2") is None  # prompt changed → stale
+    assert reopened.prune([body]) == 1
+    assert PickCatalog(path).get(other, "fp1") is None
+    assert reopened.stats("fp1")["fresh_entries"] == 1
+
+
+def test_catalog_key_ignores_whitespace(tmp_path):
+    catalog = PickCatalog(tmp_path / "catalog.sqlite3")
+    body = list(enumerate_inputs(SPACE))[0]
+    catalog.put(body, WATCHES, "openai", "fp")
+    spaced = PickRequest(**{**body.model_dump(), "occasion": f"  {body.occasion} "})
+    assert catalog.get(spaced, "fp") is not None
+
+
+class ShortAnswerFactory:
+    """Answers Quartz requests with only two watches, every repair included."""
+
+    async def agenerate(self, system_prompt, user_message, validate=None, deadline_s=None, schema=None):
+        count = 2 if "Quartz" in user_message else 4
+        rows = [
+            {"name": f"Watch {i}", "brand": "Brand", "price_range": "$1", "case_size": "40mm", "reason": "r"}
+            for i in range(count)
+        ]
+        try:
+            parsed = validate(json.dumps(rows))
+        except ValueError as exc:
+            raise HTTPException(status_code=502, detail=str(exc))
+        return GenerationResult(text="[]", provider="stub", parsed=parsed, usage=Usage(10, 10))
+
+
+def test_precompute_never_stores_partial_answers(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_service, "ai_factory", ShortAnswerFactory())
+    monkeypatch.setattr(ai_service.settings, "watch_catalog_enabled", False)
+    automatic, quartz = [b for b in enumerate_inputs(SPACE) if b.budget == "Under $200"][:2]
+    catalog = PickCatalog(tmp_path / "catalog.sqlite3")
+
+    counts = asyncio.run(precompute([automatic, quartz], catalog))
+
+    assert (counts["generated"], counts["failed"]) == (1, 1)
+    fingerprint = ai_service.prompt_fingerprint()
+    assert len(catalog.get(automatic, fingerprint)[0]) == 4
+    assert catalog.get(quartz, fingerprint) is None
@@ -0,0 +1,152 @@
+import asyncio
+
+from fastapi import HTTPException
+
+from app.ai.base import GenerationResult, Usage
+from app.schemas.picks import PickRequest
+from app.services import pick_jobs as jobs_module
+from app.services.pick_jobs import DONE, FAILED, QUEUED, PickJobRunner, PickJobStore
+
+BODY = PickRequest(
+    budget="$200–$500", occasion="Daily Wear", style="Classic & Timeless",
+    wristSize="Medium", gender="Unisex", brandOpenness="Any brand",
+)
+WATCHES = [{"name": "Seiko Presage"}]
+
+
+def stub_pipeline(monkeypatch, fail=False, save_error=None):
+    saved = []
+
+    async def fake_generate(body, fresh=False, deadline_s=None):
+        await asyncio.sleep(0)
+        if fail:
+            raise HTTPException(status_code=502, detail="All AI providers failed")
+        return WATCHES, GenerationResult(text="[]", provider="stub", parsed=WATCHES, usage=Usage(100, 20))
+
+    class FakePicksService:
+        def save_picks(self, user_id, quiz_inputs, results, tokens_used=None, cache_namespace=None):
+            if save_error is not None:
+                raise save_error
+            saved.append((user_id, results, tokens_used))
+            return {"id": "pick-1"}
+
+    monkeypatch.setattr(jobs_module, "agenerate_watch_picks", fake_generate)
+    monkeypatch.setattr(jobs_module, "PicksService", FakePicksService)
+    return saved
+
+
+async def wait_finished(runner, job_id, user_id="u1"):
+    for _ in range(200):
+        job = await runner.get(job_id, user_id)
+        if job["status"] in (DONE, FAILED):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_job_runs_and_saves_picks(tmp_path, monkeypatch):
+    saved = stub_pipeline(monkeypatch)
+
+    async def scenario():
+        runner = PickJobRunner(PickJobStore(tmp_path / "jobs.sqlite3"), workers=2)
+        await runner.start()
+        try:
+            submitted = await runner.submit("u1", BODY)
+            assert submitted["status"] == QUEUED
+            updates = runner.subscribe(submitted["job_id"])
+            job = await wait_finished(runner, submitted["job_id"])
+            assert await runner.get(submitted["job_id"], "someone-else") is None
+            return job, updates, runner.stats()
+        finally:
+            await runner.stop()
+
+    job, updates, stats = asyncio.run(scenario())
+    assert job["status"] == DONE
+    assert job["result"]["pick_id"] == "pick-1"
+    assert job["result"]["tokens_used"] == 120
+    assert saved == [("u1", WATCHES, 120)]
+    assert stats["completed"] == 1 and stats["queue_depth"] == 0
+    assert stats["wait_ms_p50"] is not None
+    assert updates.qsize() >= 1
+
+
+def test_failed_job_keeps_error(tmp_path, monkeypatch):
+    saved = stub_pipeline(monkeypatch, fail=True)
+
+    async def scenario():
+        runner = PickJobRunner(PickJobStore(tmp_path / "jobs.sqlite3"), workers=1)
+        await runner.start()
+        try:
+            job_id = (await runner.submit("u1", BODY))["job_id"]
+            return await wait_finished(runner, job_id)
+        finally:
+            await runner.stop()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == FAILED
+    assert (job["error"], job["error_status"]) == ("All AI providers failed", 502)
+    assert saved == []
+
+
+def test_unexpected_error_fails_job_and_notifies(tmp_path, monkeypatch):
+    stub_pipeline(monkeypatch, save_error=RuntimeError("insert failed"))
+
+    async def scenario():
+        runner = PickJobRunner(PickJobStore(tmp_path / "jobs.sqlite3"), workers=1)
+        await runner.start()
+        try:
+            job_id = (await runner.submit("u1", BODY))["job_id"]
+            updates = runner.subscribe(job_id)
+            job = await wait_finished(runner, job_id)
+            await asyncio.sleep(0.05)
+            events = [updates.get_nowait() for _ in range(updates.qsize())]
+            return job, events, runner.stats()
+        finally:
+            await runner.stop()
+
+    job, events, stats = asyncio.run(scenario())
+    assert job["status"] == FAILED
+    assert (job["error"], job["error_status"]) == ("Pick generation failed", 500)
+    assert job["finished_at"] is not None
+    assert events[-1]["status"] == FAILED
+    assert stats["failed"] == 1
+
+
+def test_unfinished_jobs_resume_after_restart(tmp_path, monkeypatch):
+    saved = stub_pipeline(monkeypatch)
+    store = PickJobStore(tmp_path / "jobs.sqlite3")
+    store.insert("queued-job", "u1", BODY.model_dump(), fresh=False)
+    store.insert("interrupted-job", "u1", BODY.model_dump(), fresh=False)
+    store.mark_running("interrupted-job")
+
+    async def scenario():
+        runner = PickJobRunner(store, workers=1)
+        await runner.start()
+        try:
+            return [await wait_finished(runner, job_id) for job_id in ("queued-job", "interrupted-job")]
+        finally:
+            await runner.stop()
+
+    jobs = asyncio.run(scenario())
+    assert [job["status"] for job in jobs] == [DONE, DONE]
+    assert len(saved) == 2
+
+
+def test_full_queue_rejects(tmp_path, monkeypatch):
+    stub_pipeline(monkeypatch)
+
+    async def scenario():
+        runner = PickJobRunner(PickJobStore(tmp_path / "jobs.sqlite3"), workers=0, max_queued=1)
+        await runner.start()
+        try:
+            await runner.submit("u1", BODY)
+            try:
+                await runner.submit("u1", BODY)
+            except HTTPException as exc:
+                return exc.status_code, runner.stats()
+        finally:
+            await runner.stop()
+
+    status, stats = asyncio.run(scenario())
+    assert status == 503
+    assert stats["queue_depth"] == 1 and stats["rejected"] == 1
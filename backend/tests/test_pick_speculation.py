@@ -0,0 +1,125 @@
+import asyncio
+
+from app.ai.base import GenerationResult, Usage
+from app.ai.deadline import Deadline
+from app.schemas.picks import PickRequest
+from app.services import pick_speculation as spec_module
+from app.services.pick_speculation import AnswerModel, PickSpeculator
+
+SPACE = {
+    "budget": ["Under $200", "$200–$500", "$500–$2,000"],
+    "occasion": ["Daily Wear", "Business"],
+    "style": ["Classic & Timeless", "Modern & Minimal"],
+    "wristSize": ["Medium"],
+    "gender": ["Unisex"],
+    "brandOpenness": ["Any brand"],
+    "movementType": ["No preference"],
+}
+HISTORY = (
+    [{"budget": "$200–$500", "style": "Classic & Timeless"}] * 6
+    + [{"budget": "$200–$500", "style": "Modern & Minimal"}] * 3
+    + [{"budget": "Under $200", "style": "Modern & Minimal"}]
+)
+PARTIAL = {"occasion": "Daily Wear", "wristSize": "Medium", "gender": "Unisex",
+           "brandOpenness": "Any brand", "movementType": "No preference"}
+
+
+def test_completions_ranked_by_answer_frequency():
+    model = AnswerModel(SPACE, HISTORY)
+    completions = model.completions(PARTIAL, n=2)
+    assert [(b.budget, b.style) for _, b in completions] == [
+        ("$200–$500", "Classic & Timeless"), ("$200–$500", "Modern & Minimal"),
+    ]
+    assert completions[0][0] > completions[1][0]
+    assert all(b.occasion == "Daily Wear" for _, b in completions)
+    assert model.completions(PARTIAL, n=2, min_probability=0.5) == []
+
+
+class StubFactory:
+    available = True
+    signature = "stub:model"
+
+
+def stub_speculator(monkeypatch, delay=0.0):
+    calls = []
+
+    async def fake_generate(body, fresh=False, deadline_s=None):
+        calls.append(body)
+        await asyncio.sleep(delay)
+        watches = [{"name": f"{body.budget} {body.style}"}]
+        return watches, GenerationResult(text="[]", provider="stub", parsed=watches, usage=Usage(100, 20))
+
+    speculator = PickSpeculator()
+    speculator._model = AnswerModel(SPACE, HISTORY)
+    speculator._model_at = float("inf")
+    monkeypatch.setattr(spec_module, "agenerate_watch_picks", fake_generate)
+    monkeypatch.setattr(spec_module, "stored_picks", lambda body, record=True: None)
+    monkeypatch.setattr(spec_module, "ai_factory", StubFactory())
+    return speculator, calls
+
+
+def test_generate_claims_speculative_results(monkeypatch):
+    monkeypatch.setattr(spec_module.settings, "speculation_completions", 2)
+    monkeypatch.setattr(spec_module.settings, "speculation_min_probability", 0.0)
+    speculator, calls = stub_speculator(monkeypatch, delay=0.05)
+    likely = PickRequest(**PARTIAL, budget="$200–$500", style="Classic & Timeless")
+    runner_up = PickRequest(**PARTIAL, budget="$200–$500", style="Modern & Minimal")
+    unlikely = PickRequest(**PARTIAL, budget="Under $200", style="Classic & Timeless")
+
+    async def scenario():
+        started = await speculator.speculate(PARTIAL)
+        in_flight = await speculator.claim(likely, Deadline(5))  # waits for the running generation
+        await asyncio.sleep(0.1)
+        ready = await speculator.claim(runner_up, Deadline(5))
+        miss = await speculator.claim(unlikely, Deadline(5))
+        return started, in_flight, ready, miss
+
+    started, in_flight, ready, miss = asyncio.run(scenario())
+    assert started == {"enabled": True, "started": 2}
+    assert len(calls) == 2
+    assert in_flight[0] == [{"name": "$200–$500 Classic & Timeless"}]
+    assert ready[0] == [{"name": "$200–$500 Modern & Minimal"}]
+    assert miss is None
+    stats = speculator.stats()
+    assert (stats["hits_inflight"], stats["hits_ready"], stats["lookups"]) == (1, 1, 3)
+    assert stats["hit_rate"] == 1.0 and stats["tokens_spent"] == 240
+
+
+def test_speculation_respects_hourly_budget(monkeypatch):
+    monkeypatch.setattr(spec_module.settings, "speculation_completions", 3)
+    monkeypatch.setattr(spec_module.settings, "speculation_min_probability", 0.0)
+    monkeypatch.setattr(spec_module.settings, "speculation_budget_per_hour", 1)
+    speculator, calls = stub_speculator(monkeypatch)
+
+    async def scenario():
+        first = await speculator.speculate(PARTIAL)
+        second = await speculator.speculate({**PARTIAL, "occasion": "Business"})
+        await speculator.stop()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert (first["started"], second["started"]) == (1, 0)
+    assert speculator.stats()["over_budget"] == 2
+
+
+def test_speculation_lookups_are_not_counted_as_cache_traffic(monkeypatch):
+    monkeypatch.setattr(spec_module.settings, "speculation_completions", 1)
+    monkeypatch.setattr(spec_module.settings, "speculation_min_probability", 0.0)
+    speculator, _ = stub_speculator(monkeypatch)
+    lookups, generations = [], []
+
+    async def fake_generate(body, fresh=False, deadline_s=None):
+        generations.append(fresh)
+        return [], GenerationResult(text="[]", provider="stub", parsed=[], usage=Usage(1, 1))
+
+    monkeypatch.setattr(spec_module, "stored_picks", lambda body, record=True: lookups.append(record))
+    monkeypatch.setattr(spec_module, "agenerate_watch_picks", fake_generate)
+
+    async def scenario():
+        await speculator.speculate(PARTIAL)
+        await asyncio.sleep(0.01)
+        await speculator.stop()
+
+    asyncio.run(scenario())
+    assert lookups == [False]
+    assert generations == [True]  # the generation doesn't look the stores up again
@@ -0,0 +1,33 @@
+import asyncio
+import time
+
+from app.ai.ratelimit import ProviderRateLimit, TokenBucket
+
+
+def test_bucket_waits_for_refill():
+    bucket = TokenBucket(per_minute=600)  # 10 per second, burst of 600
+
+    async def run():
+        await bucket.take(600)
+        start = time.perf_counter()
+        waited = await bucket.take(1)
+        return waited, time.perf_counter() - start
+
+    waited, elapsed = asyncio.run(run())
+    assert 0.05 < waited < 0.2
+    assert elapsed >= 0.05
+
+
+def test_token_limit_reserves_estimate_and_settles_actual():
+    limit = ProviderRateLimit(rpm=0, tpm=6000, default_tokens=1000)
+
+    async def run():
+        reserved = await limit.acquire()
+        limit.settle(reserved, 3000)
+        return reserved
+
+    assert asyncio.run(run()) == 1000
+    assert limit.stats()["tokens_per_call_estimate"] == 3000
+    # 6000 - 1000 reserved - 2000 correction = 3000 left, so the next call doesn't wait
+    asyncio.run(limit.acquire())
+    assert limit.throttled == 0
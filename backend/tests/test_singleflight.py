@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.ai.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return ["watch"]
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert calls == 1
+    assert results == [["watch"]] * 10
+    assert flight.stats()["collapsed"] == 9
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_failure_propagates_to_every_caller():
+    flight = SingleFlight()
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", boom) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.stats()["failures"] == 1
+
+
+def test_cancelling_one_caller_does_not_cancel_the_others():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def run():
+        first = asyncio.create_task(flight.do("key", work))
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "ok"
+    assert flight.stats()["cancelled"] == 0
+
+
+def test_upstream_cancelled_when_last_caller_leaves():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(1)
+
+    async def run():
+        caller = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert flight.stats() == {**flight.stats(), "cancelled": 1, "in_flight": 0}
+
+
+def test_caller_after_cancellation_starts_a_new_execution():
+    flight = SingleFlight()
+    started = 0
+
+    async def work():
+        nonlocal started
+        started += 1
+        await asyncio.sleep(0.02)
+        return started
+
+    async def run():
+        caller = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.005)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        # Same tick: the cancelled task hasn't finished yet, but must not be joined
+        return await flight.do("key", work)
+
+    assert asyncio.run(run()) == 2
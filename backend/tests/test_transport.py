@@ -0,0 +1,41 @@
+import asyncio
+import http.server
+import threading
+
+import openai
+
+from app.ai.transport import ConnectionStats, pooled_async_client
+
+
+class _OkHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_pooled_client_reuses_connections():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _OkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stats = ConnectionStats()
+
+    async def run():
+        client = pooled_async_client(openai, stats)
+        for _ in range(5):
+            await client.get(f"http://127.0.0.1:{server.server_port}/")
+        await client.aclose()
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.shutdown()
+
+    assert stats.stats() == {
+        "requests": 5, "new_connections": 1, "tls_handshakes": 0, "reused_connections": 4, "reuse_rate": 0.8,
+    }
@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+from app.ai.base import GenerationResult
+from app.schemas.picks import PickRequest
+from app.services import ai_service
+from app.services.watch_catalog import FORMAT, WatchCatalog, build
+
+RECORDS = [
+    {"id": "cheap-diver", "brand": "Casio", "model": "Duro", "price_min": 50, "price_max": 80,
+     "case_mm": 44, "movement": "quartz", "styles": ["sport"], "tier": "budget", "gender": "men"},
+    {"id": "dress-auto", "brand": "Orient", "model": "Bambino", "price_min": 130, "price_max": 200,
+     "case_mm": 40.5, "movement": "automatic", "styles": ["dress", "classic"], "tier": "budget", "gender": "men"},
+    {"id": "field-manual", "brand": "Hamilton", "model": "Khaki Field", "price_min": 475, "price_max": 550,
+     "case_mm": 38, "movement": "manual", "styles": ["field", "classic"], "tier": "mid", "gender": "unisex"},
+    {"id": "luxury-diver", "brand": "Rolex", "model": "Submariner", "price_min": 10000, "price_max": 12000,
+     "case_mm": 41, "movement": "automatic", "styles": ["sport", "luxury"], "tier": "luxury", "gender": "men"},
+    {"id": "smart", "brand": "Apple", "model": "Watch", "price_min": 400, "price_max": 500,
+     "case_mm": 45, "movement": "smart", "styles": ["modern", "sport"], "tier": "mid", "gender": "unisex"},
+]
+BODY = PickRequest(
+    budget="$200–$500", occasion="Business", style="Classic & Timeless",
+    wristSize="Medium (6.5\"–7.5\")", gender="Men's", brandOpenness="No smartwatches please",
+    movementType="Automatic",
+)
+
+
+def make_catalog(tmp_path, records=RECORDS):
+    build(records, tmp_path / "catalog")
+    return WatchCatalog(tmp_path / "catalog")
+
+
+def test_shortlist_ranks_by_answers(tmp_path):
+    catalog = make_catalog(tmp_path)
+    ids = [r["id"] for r in catalog.shortlist(BODY, 5)]
+    assert ids[0] in ("dress-auto", "field-manual")
+    assert ids[-1] in ("luxury-diver", "smart")  # out of budget / excluded smartwatch
+    assert [r["id"] for r in catalog.shortlist(BODY, 2)] == ids[:2]
+
+
+def test_outdated_build_is_ignored(tmp_path):
+    catalog = make_catalog(tmp_path)
+    manifest_path = tmp_path / "catalog" / "manifest.json"
+    manifest = json.loads(manifest_path.read_text())
+    manifest_path.write_text(json.dumps({**manifest, "format": FORMAT + 1}))
+    assert len(catalog) == 0 and catalog.shortlist(BODY, 3) == []
+
+
+def test_shortlist_prompt_maps_choices_to_catalog(tmp_path, monkeypatch):
+    catalog = make_catalog(tmp_path)
+    monkeypatch.setattr(ai_service, "watch_catalog", catalog)
+    monkeypatch.setattr(ai_service.settings, "watch_catalog_enabled", True)
+    monkeypatch.setattr(ai_service.settings, "pick_catalog_enabled", False)
+    monkeypatch.setattr(ai_service.settings, "pick_cache_enabled", False)
+    monkeypatch.setattr(ai_service.settings, "near_cache_enabled", False)
+
+    prompt = ai_service.build_prompt(BODY)
+    assert prompt.system == ai_service.SHORTLIST_SYSTEM_PROMPT
+    assert "[dress-auto] Orient Bambino | $130–$200 | 40.5mm | automatic" in prompt.user
+
+    answer = json.dumps([
+        ["dress-auto", "Dressy."],
+        ["made-up", "Not on the list."],
+        ["dress-auto", "Twice."],
+        ["field-manual", "Rugged."],
+    ])
+
+    class StubFactory:
+        signature = "stub:model"
+
+        async def agenerate(self, system_prompt, user_message, validate=None, deadline_s=None, schema=None, cascade=None):
+            parsed = validate(answer)
+            return GenerationResult(text=answer, provider="stub", parsed=parsed)
+
+    monkeypatch.setattr(ai_service, "ai_factory", StubFactory())
+    watches, _ = asyncio.run(ai_service.agenerate_watch_picks(BODY))
+    assert [w["name"] for w in watches] == ["Orient Bambino", "Hamilton Khaki Field"]
+    assert watches[0]["price_range"] == "$130–$200" and watches[0]["case_size"] == "40.5mm"
+    assert watches[1]["amazon_url"] == "https://www.amazon.com/s?k=Hamilton%20Khaki%20Field"
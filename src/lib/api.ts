@@ -17,8 +17,12 @@ async function getAuthHeaders(): Promise<Record<string, string>> {
     : { "Content-Type": "application/json" };
 }
 
-export async function apiPost<T = unknown>(path: string, body?: unknown): Promise<T> {
-  const headers = await getAuthHeaders();
+export async function apiPost<T = unknown>(
+  path: string,
+  body?: unknown,
+  extraHeaders?: Record<string, string>,
+): Promise<T> {
+  const headers = { ...(await getAuthHeaders()), ...extraHeaders };
   const res = await fetch(`${API_URL}${path}`, {
     method: "POST",
     headers,
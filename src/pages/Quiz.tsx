@@ -1,4 +1,4 @@
-import { useState, useEffect, useMemo } from "react";
+import { useState, useEffect, useMemo, useRef } from "react";
 import { Link, useNavigate } from "react-router-dom";
 import { motion, AnimatePresence } from "framer-motion";
 import { useTranslation } from "react-i18next";
@@ -27,6 +27,8 @@ const Quiz = () => {
   const [currentStep, setCurrentStep] = useState(0);
   const [budget, setBudget] = useState(2);
   const [answers, setAnswers] = useState<Record<string, string>>({});
+  // One Idempotency-Key per set of answers: double submits and retries don't generate twice
+  const submitKey = useRef<{ inputs: string; key: string } | null>(null);
   const [loading, setLoading] = useState(false);
   const [authChecked, setAuthChecked] = useState(false);
   const { steps, isFromApi } = useQuiz(i18n.language || "en");
@@ -81,14 +83,27 @@ const Quiz = () => {
     setAnswers((prev) => ({ ...prev, [step.key]: optionId }));
   };
 
+  // Lets the backend pre-generate likely picks while the last step is answered
+  const speculate = (known: Record<string, string>) => {
+    const partial = Object.fromEntries(
+      Object.entries(known)
+        .filter(([, optionId]) => optionId)
+        .map(([key, optionId]) => [key, optionToApiValue[optionId] || optionId]),
+    );
+    apiPost("/api/v1/picks/speculate", partial).catch(() => {});
+  };
+
   const handleNext = () => {
+    let known = answers;
     if (step.key === "budget") {
       const opt = budgetOptions[budget];
+      known = { ...answers, budget: opt?.id ?? "" };
       setAnswers((prev) => ({ ...prev, budget: opt?.id ?? "" }));
     }
     if (isLastStep) {
       handleSubmit();
     } else {
+      if (currentStep + 1 === steps.length - 1) speculate(known);
       setCurrentStep((s) => s + 1);
     }
   };
@@ -113,7 +128,11 @@ const Quiz = () => {
     };
 
     try {
-      const data = await apiPost<{ watches: WatchResult[] }>("/api/v1/picks/generate", quizInputs);
+      const inputs = JSON.stringify(quizInputs);
+      if (submitKey.current?.inputs !== inputs) submitKey.current = { inputs, key: crypto.randomUUID() };
+      const data = await apiPost<{ watches: WatchResult[] }>("/api/v1/picks/generate", quizInputs, {
+        "Idempotency-Key": submitKey.current.key,
+      });
 
       if (!data?.watches || data.watches.length === 0) throw new Error("No picks received");
 
@@ -0,0 +1,3 @@
+-- Tokens spent generating each pick (0 when served from the cache / catalog, NULL if the provider didn't report usage)
+ALTER TABLE public.picks
+  ADD COLUMN IF NOT EXISTS tokens_used INTEGER DEFAULT NULL;
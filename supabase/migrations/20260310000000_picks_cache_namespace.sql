@@ -0,0 +1,8 @@
+-- Prompt + model chain a live pick was generated under (NULL for cached / catalog answers),
+-- so the near cache only warms from picks of the current configuration
+ALTER TABLE public.picks
+  ADD COLUMN IF NOT EXISTS cache_namespace TEXT DEFAULT NULL;
+
+CREATE INDEX IF NOT EXISTS picks_cache_namespace_created_at_idx
+  ON public.picks (cache_namespace, created_at DESC)
+  WHERE cache_namespace IS NOT NULL;